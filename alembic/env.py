@@ -21,7 +21,7 @@ import sys
 from os.path import dirname, abspath
 sys.path.insert(0, dirname(dirname(abspath(__file__))))
 from app.database import Base
-from app.models import contests, problems, users, submissions  # Import tất cả các module chứa model
+from app.models import contests, problems, users, submissions, rejudge_jobs  # Import tất cả các module chứa model
 target_metadata = Base.metadata
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -0,0 +1,44 @@
+"""Add output_limit_exceeded status
+
+Revision ID: 3f9c2d81b6a4
+Revises: 7ada63c51881
+Create Date: 2026-10-16 09:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d81b6a4'
+down_revision: Union[str, None] = '7ada63c51881'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('submissions', 'status',
+               existing_type=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error'),
+               type_=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'output_limit_exceeded'),
+               existing_nullable=False,
+               existing_server_default=sa.text("'pending'"))
+    op.alter_column('submission_test_results', 'status',
+               existing_type=mysql.ENUM('accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error'),
+               type_=mysql.ENUM('accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error', 'output_limit_exceeded'),
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('submission_test_results', 'status',
+               existing_type=mysql.ENUM('accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error', 'output_limit_exceeded'),
+               type_=mysql.ENUM('accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error'),
+               existing_nullable=False)
+    op.alter_column('submissions', 'status',
+               existing_type=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'output_limit_exceeded'),
+               type_=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error'),
+               existing_nullable=False,
+               existing_server_default=sa.text("'pending'"))
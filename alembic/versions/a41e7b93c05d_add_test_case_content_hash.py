@@ -0,0 +1,28 @@
+"""Add test_cases.content_hash
+
+Revision ID: a41e7b93c05d
+Revises: 3f9c2d81b6a4
+Create Date: 2026-10-16 10:03:17.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41e7b93c05d'
+down_revision: Union[str, None] = '3f9c2d81b6a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_cases', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_cases', 'content_hash')
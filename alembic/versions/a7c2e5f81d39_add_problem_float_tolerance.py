@@ -0,0 +1,30 @@
+"""Add float tolerance columns to problems
+
+Revision ID: a7c2e5f81d39
+Revises: f3b9d2c6a184
+Create Date: 2026-10-17 02:05:13.660214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e5f81d39'
+down_revision: Union[str, None] = 'f3b9d2c6a184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('float_abs_tolerance', sa.Float(), nullable=True))
+    op.add_column('problems', sa.Column('float_rel_tolerance', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('problems', 'float_rel_tolerance')
+    op.drop_column('problems', 'float_abs_tolerance')
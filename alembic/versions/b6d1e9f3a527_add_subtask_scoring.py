@@ -0,0 +1,32 @@
+"""Add test_cases.subtask, submissions.score and submissions.max_score
+
+Revision ID: b6d1e9f3a527
+Revises: a7c2e5f81d39
+Create Date: 2026-10-17 09:42:09.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1e9f3a527'
+down_revision: Union[str, None] = 'a7c2e5f81d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_cases', sa.Column('subtask', sa.Integer(), nullable=True))
+    op.add_column('submissions', sa.Column('score', sa.Integer(), nullable=True))
+    op.add_column('submissions', sa.Column('max_score', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('submissions', 'max_score')
+    op.drop_column('submissions', 'score')
+    op.drop_column('test_cases', 'subtask')
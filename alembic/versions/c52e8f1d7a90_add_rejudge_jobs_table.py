@@ -0,0 +1,51 @@
+"""Add rejudge_jobs table
+
+Revision ID: c52e8f1d7a90
+Revises: a41e7b93c05d
+Create Date: 2026-10-16 22:41:08.734152
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e8f1d7a90'
+down_revision: Union[str, None] = 'a41e7b93c05d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rejudge_jobs',
+    sa.Column('id', mysql.CHAR(length=36), nullable=False),
+    sa.Column('status', sa.Enum('queued', 'running', 'completed', 'failed', 'cancelled'), nullable=False),
+    sa.Column('problem_id', mysql.CHAR(length=36), nullable=True),
+    sa.Column('contest_id', mysql.CHAR(length=36), nullable=True),
+    sa.Column('filters', mysql.JSON(), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('compiled', sa.Integer(), nullable=False),
+    sa.Column('cursor', mysql.CHAR(length=36), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.String(length=36), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['contest_id'], ['contests.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rejudge_jobs_status', 'rejudge_jobs', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rejudge_jobs_status', table_name='rejudge_jobs')
+    op.drop_table('rejudge_jobs')
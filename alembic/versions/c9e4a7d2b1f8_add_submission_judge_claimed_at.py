@@ -0,0 +1,28 @@
+"""Add submissions.judge_claimed_at
+
+Revision ID: c9e4a7d2b1f8
+Revises: b6d1e9f3a527
+Create Date: 2026-10-18 10:05:51.207334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a7d2b1f8'
+down_revision: Union[str, None] = 'b6d1e9f3a527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('submissions', sa.Column('judge_claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('submissions', 'judge_claimed_at')
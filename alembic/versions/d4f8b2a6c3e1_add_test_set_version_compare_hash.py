@@ -0,0 +1,31 @@
+"""Add test_set_versions.compare_hash
+
+Revision ID: d4f8b2a6c3e1
+Revises: c9e4a7d2b1f8
+Create Date: 2026-10-18 11:20:37.954102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8b2a6c3e1'
+down_revision: Union[str, None] = 'c9e4a7d2b1f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_set_versions', sa.Column('compare_hash', sa.String(length=64), nullable=True))
+    # Không biết các phiên bản đã có dùng cách so sánh nào: gán cho mỗi phiên bản một giá trị
+    # riêng để chấm lại không dùng lại kết quả giữa chúng
+    op.execute("UPDATE test_set_versions SET compare_hash = fingerprint")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_set_versions', 'compare_hash')
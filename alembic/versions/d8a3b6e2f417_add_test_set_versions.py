@@ -0,0 +1,47 @@
+"""Add test_set_versions and submissions.test_set_version_id
+
+Revision ID: d8a3b6e2f417
+Revises: c52e8f1d7a90
+Create Date: 2026-10-16 23:10:52.118094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3b6e2f417'
+down_revision: Union[str, None] = 'c52e8f1d7a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('test_set_versions',
+    sa.Column('id', mysql.CHAR(length=36), nullable=False),
+    sa.Column('problem_id', sa.String(length=36), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('manifest', mysql.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('problem_id', 'version', name='uq_test_set_versions_problem_version'),
+    sa.UniqueConstraint('problem_id', 'fingerprint', name='uq_test_set_versions_problem_fingerprint')
+    )
+    op.add_column('submissions', sa.Column('test_set_version_id', mysql.CHAR(length=36), nullable=True))
+    op.create_foreign_key(
+        'fk_submissions_test_set_version_id', 'submissions', 'test_set_versions',
+        ['test_set_version_id'], ['id'], ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_submissions_test_set_version_id', 'submissions', type_='foreignkey')
+    op.drop_column('submissions', 'test_set_version_id')
+    op.drop_table('test_set_versions')
@@ -0,0 +1,46 @@
+"""Add checker columns to problems and test_set_versions, judge_error submission status
+
+Revision ID: e1f4c7a92b36
+Revises: d8a3b6e2f417
+Create Date: 2026-10-16 23:48:05.412981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f4c7a92b36'
+down_revision: Union[str, None] = 'd8a3b6e2f417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('checker_code', sa.Text(), nullable=True))
+    op.add_column('problems', sa.Column('checker_language', sa.String(length=20), nullable=True))
+    op.add_column('problems', sa.Column('checker_time_limit_ms', sa.Integer(), nullable=True))
+    op.add_column('test_set_versions', sa.Column('checker_hash', sa.String(length=64), nullable=True))
+    # Checker lỗi (hoặc lỗi hệ thống khi chấm) cho kết quả judge_error
+    op.alter_column('submissions', 'status',
+               existing_type=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'output_limit_exceeded'),
+               type_=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error', 'output_limit_exceeded'),
+               existing_nullable=False,
+               existing_server_default=sa.text("'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('submissions', 'status',
+               existing_type=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'judge_error', 'output_limit_exceeded'),
+               type_=mysql.ENUM('pending', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'memory_limit_exceeded', 'runtime_error', 'compilation_error', 'output_limit_exceeded'),
+               existing_nullable=False,
+               existing_server_default=sa.text("'pending'"))
+    op.drop_column('test_set_versions', 'checker_hash')
+    op.drop_column('problems', 'checker_time_limit_ms')
+    op.drop_column('problems', 'checker_language')
+    op.drop_column('problems', 'checker_code')
@@ -0,0 +1,29 @@
+"""Add rejudge_jobs.failed_submission_ids
+
+Revision ID: e7b3a1c5d920
+Revises: d4f8b2a6c3e1
+Create Date: 2026-10-18 14:02:11.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3a1c5d920'
+down_revision: Union[str, None] = 'd4f8b2a6c3e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rejudge_jobs', sa.Column('failed_submission_ids', mysql.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rejudge_jobs', 'failed_submission_ids')
@@ -0,0 +1,28 @@
+"""Add compare_mode to problems
+
+Revision ID: f3b9d2c6a184
+Revises: e1f4c7a92b36
+Create Date: 2026-10-17 01:12:40.228617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d2c6a184'
+down_revision: Union[str, None] = 'e1f4c7a92b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('compare_mode', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('problems', 'compare_mode')
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import users, auth, problems, contests, submissions, test_cases
+from app.api.endpoints import users, auth, problems, contests, submissions, test_cases, judge_servers, rejudge
 
 api_router = APIRouter()
 
@@ -9,4 +9,6 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(problems.router, prefix="/problems", tags=["problems"])
 api_router.include_router(contests.router, prefix="/contests", tags=["contests"])
 api_router.include_router(submissions.router, prefix="/submissions", tags=["submissions"])
-api_router.include_router(test_cases.router, prefix="/problems", tags=["test_cases"])
\ No newline at end of file
+api_router.include_router(test_cases.router, prefix="/problems", tags=["test_cases"])
+api_router.include_router(judge_servers.router, prefix="/judge-servers", tags=["judge_servers"])
+api_router.include_router(rejudge.router, prefix="/rejudge", tags=["rejudge"])
\ No newline at end of file
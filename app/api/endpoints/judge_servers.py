@@ -0,0 +1,100 @@
+from typing import Any, Dict, List
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+from app.services.judge_cluster import verify_request
+from app.services.judge_queue import get_judge_queue
+
+router = APIRouter()
+
+async def read_signed_body(request: Request, db: Session, server_id: str, schema):
+    """Xác thực request do judge node ký bằng secret của nó và đọc nội dung theo schema"""
+    server = crud.judge_servers.get_by_id(db, id=server_id)
+    body = await request.body()
+    if not server or not verify_request(server.secret_key, request.url.path, body, request.headers):
+        raise HTTPException(status_code=401, detail="Chữ ký của judge node không hợp lệ")
+    try:
+        return server, schema.model_validate(json.loads(body))
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/", response_model=List[schemas.JudgeServer])
+def read_judge_servers(
+    db: Session = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Danh sách judge node đã đăng ký.
+    """
+    return crud.judge_servers.get_multi(db, skip=skip, limit=limit)
+
+@router.get("/queue-stats", response_model=Dict[str, Any])
+def read_queue_stats(
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Trạng thái hàng đợi chấm của tiến trình này: chính sách lập lịch, số bài đang
+    chờ/đang chấm và phân vị thời gian chờ theo lớp (contest, practice, rejudge),
+    số bài đang chờ/đang chạy và hiệu suất của giai đoạn biên dịch và giai đoạn chạy test,
+    cùng số lượt chạy thử đang chạy/đang chờ và số workspace còn trống.
+    """
+    return get_judge_queue().stats()
+
+@router.post("/", response_model=schemas.JudgeServerWithSecret)
+def create_judge_server(
+    *,
+    db: Session = Depends(deps.get_db),
+    server_in: schemas.JudgeServerCreate,
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Tạo judge node mới. secret_key chỉ được trả về ở đây, dùng để khởi động node.
+    """
+    if crud.judge_servers.get_by_name(db, name=server_in.name):
+        raise HTTPException(status_code=400, detail="Tên judge node đã tồn tại")
+    return crud.judge_servers.create(db, obj_in=server_in)
+
+@router.delete("/{server_id}", response_model=schemas.Message)
+def delete_judge_server(
+    *,
+    db: Session = Depends(deps.get_db),
+    server_id: str = Path(...),
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Xóa judge node khỏi danh sách.
+    """
+    if not crud.judge_servers.remove(db, id=server_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy judge node")
+    return {"message": "Đã xóa judge node"}
+
+@router.post("/{server_id}/register", response_model=schemas.JudgeServer)
+async def register_judge_server(
+    request: Request,
+    server_id: str = Path(...),
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Judge node gửi địa chỉ và số worker khi khởi động.
+    """
+    server, register_in = await read_signed_body(request, db, server_id, schemas.JudgeServerRegister)
+    return crud.judge_servers.register(db, db_obj=server, obj_in=register_in)
+
+@router.post("/{server_id}/heartbeat", response_model=schemas.JudgeServer)
+async def judge_server_heartbeat(
+    request: Request,
+    server_id: str = Path(...),
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Heartbeat định kỳ của judge node kèm số bài đang chờ hoặc đang chấm.
+    """
+    server, heartbeat_in = await read_signed_body(request, db, server_id, schemas.JudgeServerHeartbeat)
+    return crud.judge_servers.heartbeat(db, db_obj=server, current_workers=heartbeat_in.current_workers)
@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
 from app.schemas.problems import TestCaseUpdate, TestCaseCreate, ProblemCreate, ProblemUpdate
+from app.services.checker import CheckerError, get_checker_cache
+from app.services.test_data_cache import get_test_data_cache
 
 router = APIRouter()
 
@@ -219,6 +221,9 @@ def update_test_case(
     
     # Update test case
     updated_test_case = crud.problems.update_test_case(db, test_case_id=test_case_id, obj_in=test_case_in)
+    
+    # Drop cached judge data for the old content
+    get_test_data_cache().invalidate(test_case_id)
     return updated_test_case
 
 @router.get("/{problem_id}/test-cases", response_model=List[schemas.problems.TestCase])
@@ -246,4 +251,77 @@ def read_test_cases(
     
     # Admins and problem creators can see all test cases
     test_cases = crud.problems.get_test_cases(db, problem_id=problem_id)
-    return test_cases
\ No newline at end of file
+    return test_cases
+
+def get_editable_problem(db: Session, problem_id: str, current_user: models.User) -> models.Problem:
+    problem = crud.problems.get_by_id(db, id=problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    if not current_user.is_admin and problem.created_by != current_user.id:
+        raise HTTPException(status_code=403, detail="You don't have permission to update this problem")
+    return problem
+
+def checker_response(problem: models.Problem) -> schemas.problems.ProblemChecker:
+    return schemas.problems.ProblemChecker(
+        problem_id=problem.id,
+        language=problem.checker_language,
+        code=problem.checker_code,
+        time_limit_ms=problem.checker_time_limit_ms
+    )
+
+@router.get("/{problem_id}/checker", response_model=schemas.problems.ProblemChecker)
+def read_checker(
+    *,
+    db: Session = Depends(deps.get_db),
+    problem_id: str = Path(...),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get the checker (special judge) of a problem.
+    """
+    problem = get_editable_problem(db, problem_id, current_user)
+    if not problem.checker_code:
+        raise HTTPException(status_code=404, detail="Problem has no checker")
+    return checker_response(problem)
+
+@router.put("/{problem_id}/checker", response_model=schemas.problems.ProblemChecker)
+def update_checker(
+    *,
+    db: Session = Depends(deps.get_db),
+    problem_id: str = Path(...),
+    checker_in: schemas.problems.ProblemCheckerUpdate,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Attach a checker to a problem. The checker is compiled here, so a checker
+    that does not compile is rejected and judging never waits for a compile.
+    """
+    problem = get_editable_problem(db, problem_id, current_user)
+    problem.checker_language = checker_in.language
+    problem.checker_code = checker_in.code
+    problem.checker_time_limit_ms = checker_in.time_limit_ms
+    try:
+        get_checker_cache().prepare(problem)
+    except CheckerError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Checker does not compile: {str(e)}")
+    db.commit()
+    db.refresh(problem)
+    return checker_response(problem)
+
+@router.delete("/{problem_id}/checker", response_model=schemas.Message)
+def delete_checker(
+    *,
+    db: Session = Depends(deps.get_db),
+    problem_id: str = Path(...),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Remove the checker of a problem; outputs are compared with the expected output again.
+    """
+    problem = get_editable_problem(db, problem_id, current_user)
+    problem.checker_language = None
+    problem.checker_code = None
+    problem.checker_time_limit_ms = None
+    db.commit()
+    return {"message": "Checker removed"}
@@ -0,0 +1,78 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, HTTPException, Path
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+from app.services.rejudge import get_rejudge_manager
+
+router = APIRouter()
+
+@router.post("/", response_model=schemas.RejudgeJob)
+def create_rejudge_job(
+    *,
+    db: Session = Depends(deps.get_db),
+    rejudge_in: schemas.RejudgeCreate,
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Tạo job chấm lại các bài nộp của một bài toán, một cuộc thi hoặc một danh sách
+    bài nộp (có thể lọc thêm theo người dùng, trạng thái, ngôn ngữ). Job chạy nền
+    với ưu tiên thấp; theo dõi tiến độ qua GET /rejudge/{job_id}.
+    """
+    if not (rejudge_in.problem_id or rejudge_in.contest_id or rejudge_in.submission_ids):
+        raise HTTPException(
+            status_code=400,
+            detail="Cần chỉ định problem_id, contest_id hoặc submission_ids"
+        )
+    if rejudge_in.problem_id and not crud.problems.get_by_id(db, id=rejudge_in.problem_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy bài toán")
+    if rejudge_in.contest_id and not crud.contests.get_by_id(db, id=rejudge_in.contest_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy cuộc thi")
+    
+    job = crud.rejudge_jobs.create(db, obj_in=rejudge_in, created_by=current_user.id)
+    get_rejudge_manager().wake()
+    return job
+
+@router.get("/", response_model=List[schemas.RejudgeJob])
+def read_rejudge_jobs(
+    db: Session = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Danh sách job chấm lại, mới nhất trước.
+    """
+    return crud.rejudge_jobs.get_multi(db, skip=skip, limit=limit)
+
+@router.get("/{job_id}", response_model=schemas.RejudgeJob)
+def read_rejudge_job(
+    *,
+    db: Session = Depends(deps.get_db),
+    job_id: str = Path(...),
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Trạng thái và tiến độ của một job chấm lại.
+    """
+    job = crud.rejudge_jobs.get_by_id(db, id=job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job chấm lại")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=schemas.RejudgeJob)
+def cancel_rejudge_job(
+    *,
+    db: Session = Depends(deps.get_db),
+    job_id: str = Path(...),
+    current_user: models.User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Hủy job chấm lại; các bài nộp đang chấm dở vẫn được chấm xong.
+    """
+    job = crud.rejudge_jobs.get_by_id(db, id=job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job chấm lại")
+    return crud.rejudge_jobs.cancel(db, db_obj=job)
@@ -7,12 +7,61 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
 from app.services import judge
+from app.services.custom_runs import CustomRunBusy, get_custom_run_executor
+from app.services.judge_queue import get_judge_queue
 from app.models.languages import Language
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+BUSY_MESSAGE = "Hệ thống đang có quá nhiều lượt chạy thử, vui lòng thử lại sau"
+
+def get_test_context(db: Session, problem_id: str, language_identifier: str, current_user: models.User):
+    """
+    Lấy ngôn ngữ và bài toán cho một lần chạy thử, kiểm tra quyền truy cập bài toán
+    """
+    # Lấy thông tin ngôn ngữ
+    language = db.query(Language).filter(
+        Language.identifier == language_identifier,
+        Language.is_active == True
+    ).first()
+    
+    if not language:
+        raise HTTPException(
+            status_code=400, 
+            detail="Ngôn ngữ lập trình không được hỗ trợ"
+        )
+    
+    # Lấy thông tin bài toán để kiểm tra quyền truy cập
+    problem = db.query(models.Problem).filter(
+        models.Problem.id == problem_id
+    ).first()
+    
+    if not problem:
+        raise HTTPException(
+            status_code=404, 
+            detail="Không tìm thấy bài toán này"
+        )
+    
+    # Kiểm tra nếu problem là private và user không phải admin hoặc người tạo
+    if not problem.is_public and not current_user.is_admin and problem.created_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="Bạn không có quyền truy cập bài toán này"
+        )
+    return language, problem
+
+def detach(db: Session, *objects) -> None:
+    """
+    Tách các object đã tải khỏi session của request trước khi đưa chúng sang thread của
+    executor chạy thử: session không dùng được từ nhiều thread và có thể đã bị đóng
+    (get_db) khi lần chạy thử bắt đầu.
+    """
+    for obj in objects:
+        db.expunge(obj)
+
 @router.post("/test", response_model=schemas.SubmissionTestResult)
 async def test_submission(
     test_data: schemas.SubmissionTestInput,
@@ -30,44 +79,18 @@ async def test_submission(
                 detail="Thiếu thông tin bắt buộc"
             )
         
-        # Lấy thông tin ngôn ngữ
-        language = db.query(Language).filter(
-            Language.identifier == test_data.language,
-            Language.is_active == True
-        ).first()
-        
-        if not language:
-            raise HTTPException(
-                status_code=400, 
-                detail="Ngôn ngữ lập trình không được hỗ trợ"
-            )
-        
-        # Lấy thông tin bài toán để kiểm tra quyền truy cập
-        problem = db.query(models.Problem).filter(
-            models.Problem.id == test_data.problem_id
-        ).first()
-        
-        if not problem:
-            raise HTTPException(
-                status_code=404, 
-                detail="Không tìm thấy bài toán này"
-            )
+        language, problem = get_test_context(db, test_data.problem_id, test_data.language, current_user)
+        detach(db, language)
         
-        # Kiểm tra nếu problem là private và user không phải admin hoặc người tạo
-        if not problem.is_public and not current_user.is_admin and problem.created_by != current_user.id:
-            raise HTTPException(
-                status_code=403,
-                detail="Bạn không có quyền truy cập bài toán này"
-            )
-        
-        # Gọi service để test code
-        test_result = await judge.test_code(
-            user_id=current_user.id,
-            problem_id=test_data.problem_id,
+        # Gọi service để test code (trong executor chạy thử, không chặn event loop) với
+        # giới hạn của bài toán
+        test_result = await get_custom_run_executor().run(
+            judge.test_code,
             code=test_data.code,
-            language_id=language.id,
+            language=language,
             input=test_data.input,
-            db=db
+            time_limit_ms=problem.time_limit_ms,
+            memory_limit_kb=problem.memory_limit_kb
         )
         
         # Đảm bảo kết quả trả về luôn có trường output theo yêu cầu của schema
@@ -84,6 +107,8 @@ async def test_submission(
         
         return test_result
         
+    except CustomRunBusy:
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE)
     except Exception as e:
         logger.error(f"Error testing submission: {str(e)}")
         # Trả về đối tượng với trường output rỗng thay vì ném ra HTTPException
@@ -95,6 +120,51 @@ async def test_submission(
             "message": f"Lỗi {error_type}: {error_message}"
         }
 
+@router.post("/test/batch", response_model=schemas.SubmissionTestBatchResult)
+async def test_submission_batch(
+    test_data: schemas.SubmissionTestBatchInput,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Chạy thử code với nhiều input và/hoặc mọi test mẫu của bài toán.
+    Code chỉ được biên dịch một lần, các input được chạy song song; mỗi input có
+    output, trạng thái, thời gian chạy và bộ nhớ riêng.
+    """
+    if not test_data.code:
+        raise HTTPException(status_code=400, detail="Thiếu thông tin bắt buộc")
+    
+    language, problem = get_test_context(db, test_data.problem_id, test_data.language, current_user)
+    
+    sample_tests = []
+    if test_data.use_samples:
+        sample_tests = db.query(models.TestCase).filter(
+            models.TestCase.problem_id == problem.id,
+            models.TestCase.is_sample == True
+        ).order_by(models.TestCase.order).all()
+    
+    run_count = len(sample_tests) + len(test_data.inputs)
+    if run_count == 0:
+        raise HTTPException(status_code=400, detail="Không có input nào để chạy")
+    if run_count > settings.JUDGE_CUSTOM_RUN_MAX_INPUTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chỉ được chạy tối đa {settings.JUDGE_CUSTOM_RUN_MAX_INPUTS} input mỗi lần"
+        )
+    detach(db, language, problem, *sample_tests)
+    
+    try:
+        return await get_custom_run_executor().run(
+            judge.test_code_batch,
+            problem=problem,
+            language=language,
+            code=test_data.code,
+            inputs=test_data.inputs,
+            sample_tests=sample_tests
+        )
+    except CustomRunBusy:
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE)
+
 @router.get("/", response_model=List[schemas.SubmissionWithDetails])
 def read_submissions(
     db: Session = Depends(deps.get_db),
@@ -106,7 +176,8 @@ def read_submissions(
     view_mode: Optional[str] = Query(None, enum=["all", "mine"]),
     status: Optional[str] = Query(None, enum=[
         "pending", "accepted", "wrong_answer", "time_limit_exceeded",
-        "memory_limit_exceeded", "runtime_error", "compilation_error"
+        "memory_limit_exceeded", "runtime_error", "compilation_error",
+        "judge_error", "output_limit_exceeded"
     ]),
     language: Optional[str] = Query(None, enum=["cpp", "python"]),
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -202,7 +273,8 @@ def create_submission(
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Tạo bài nộp mới.
+    Tạo bài nộp mới. Bài nộp được trả về ngay với trạng thái pending và được
+    chấm nền bởi hàng đợi chấm bài.
     """
     try:
         # Kiểm tra bài toán tồn tại
@@ -271,54 +343,9 @@ def create_submission(
                     detail="Bài toán này không thuộc cuộc thi",
                 )
         
-        # Tạo bài nộp
+        # Lưu bài nộp với trạng thái pending và đưa vào hàng đợi chấm, không chờ chấm xong
         submission = crud.submissions.create(db, obj_in=submission_in, user_id=current_user.id)
-        
-        # Chấm bài nộp
-        try:
-            judge_result = judge.judge_submission(db, submission)
-            
-            # Cập nhật kết quả chấm
-            update_data = schemas.SubmissionUpdate(
-                status=judge_result["status"],
-                execution_time_ms=judge_result["execution_time_ms"],
-                memory_used_kb=judge_result["memory_used_kb"],
-                details=judge_result.get("details", None)  # Thêm chi tiết kết quả
-            )
-            submission = crud.submissions.update(db, db_obj=submission, obj_in=update_data)
-            
-            # Nếu là bài nộp cuộc thi và được chấp nhận, cập nhật điểm
-            if submission.contest_id and submission.status == "accepted":
-                # Tìm điểm bài toán
-                contest_problem = next(
-                    (cp for cp in contest.problems if cp.problem_id == submission.problem_id), 
-                    None
-                )
-                if contest_problem:
-                    # Cập nhật điểm người tham gia
-                    crud.contests.update_score(
-                        db, 
-                        contest_id=submission.contest_id, 
-                        user_id=current_user.id,
-                        score=contest_problem.points
-                    )
-        except Exception as e:
-            logger.error(f"Lỗi khi chấm bài nộp: {str(e)}")
-            # Ghi lại thông tin lỗi chi tiết
-            error_details = {
-                "error_message": str(e),
-                "error_type": type(e).__name__,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            # Cập nhật trạng thái lỗi và chi tiết
-            update_data = schemas.SubmissionUpdate(
-                status="runtime_error",
-                execution_time_ms=0,
-                memory_used_kb=0,
-                details={"error": str(e), "error_details": error_details}
-            )
-            submission = crud.submissions.update(db, db_obj=submission, obj_in=update_data)
+        get_judge_queue().enqueue(submission.id)
         
         return submission
         
@@ -341,7 +368,7 @@ def read_submission(
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get submission by ID.
+    Get submission by ID, kèm kết quả từng test case (details) nếu đã được chấm.
     """
     # Kiểm tra submission_id có hợp lệ không
     if not submission_id or submission_id == "undefined":
@@ -364,7 +391,11 @@ def read_submission(
             detail="You don't have access to this submission",
         )
     
-    return submission
+    result = schemas.Submission.model_validate(submission)
+    details = crud.submissions.get_details(db, submission=submission)
+    if details:
+        result.details = schemas.SubmissionDetails(**details)
+    return result
 
 @router.delete("/{submission_id}", response_model=schemas.Message)
 def delete_submission(
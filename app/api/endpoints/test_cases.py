@@ -4,8 +4,9 @@ from typing import List
 import uuid
 
 from app.db.session import get_db
-from app import models, schemas
+from app import crud, models, schemas
 from app.api import deps
+from app.services.test_data_cache import get_test_data_cache
 
 router = APIRouter()
 
@@ -80,6 +81,9 @@ async def create_test_case(
     db_test_case = models.TestCase(
         id=str(uuid.uuid4()),
         problem_id=problem_id,
+        content_hash=crud.problems.compute_test_case_hash(
+            test_case_data["input"], test_case_data["expected_output"]
+        ),
         **test_case_data
     )
     
@@ -124,10 +128,14 @@ async def update_test_case(
     update_data = test_case_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(test_case, key, value)
+    test_case.content_hash = crud.problems.compute_test_case_hash(test_case.input, test_case.expected_output)
     
     db.commit()
     db.refresh(test_case)
     
+    # Xóa dữ liệu cũ của test case khỏi cache của judge
+    get_test_data_cache().invalidate(testcase_id)
+    
     return test_case
 
 @router.delete("/{problem_id}/testcases/{testcase_id}", response_model=schemas.Message)
@@ -163,4 +171,56 @@ async def delete_test_case(
     db.delete(test_case)
     db.commit()
     
-    return {"message": "Đã xóa test case thành công"}
\ No newline at end of file
+    # Xóa dữ liệu của test case khỏi cache của judge
+    get_test_data_cache().invalidate(testcase_id)
+    
+    return {"message": "Đã xóa test case thành công"}
+
+@router.get("/{problem_id}/test-set-versions", response_model=List[schemas.TestSetVersion])
+async def get_test_set_versions(
+    problem_id: str = Path(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Lấy các phiên bản bộ test của bài toán (mới nhất trước)
+    """
+    problem = db.query(models.Problem).filter(models.Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bài toán")
+    
+    if not (current_user.is_admin or problem.created_by == current_user.id):
+        raise HTTPException(status_code=403, detail="Không có quyền xem phiên bản bộ test")
+    
+    return crud.problems.get_test_set_versions(db, problem_id=problem_id)
+
+@router.post("/{problem_id}/test-set-versions", response_model=schemas.TestSetVersion)
+async def create_test_set_version(
+    problem_id: str = Path(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Chốt phiên bản bộ test hiện tại của bài toán (trả về phiên bản đã có nếu bộ test không đổi).
+    Phiên bản cũng được tạo tự động khi chấm bài nộp đầu tiên sau khi bộ test thay đổi.
+    """
+    problem = db.query(models.Problem).filter(models.Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bài toán")
+    
+    if not (current_user.is_admin or problem.created_by == current_user.id):
+        raise HTTPException(status_code=403, detail="Không có quyền tạo phiên bản bộ test")
+    
+    test_cases = crud.problems.get_test_cases(db, problem_id=problem_id)
+    if not test_cases:
+        raise HTTPException(status_code=400, detail="Bài toán chưa có test case")
+    
+    for test_case in test_cases:
+        if not test_case.content_hash:
+            test_case.content_hash = crud.problems.compute_test_case_hash(test_case.input, test_case.expected_output)
+    db.commit()
+    
+    version = crud.problems.get_or_create_test_set_version(db, problem=problem, test_cases=test_cases)
+    if not version:
+        raise HTTPException(status_code=409, detail="Không tạo được phiên bản bộ test, hãy thử lại")
+    return version
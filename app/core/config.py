@@ -1,6 +1,8 @@
 from pydantic_settings import BaseSettings
 from typing import Any, Dict, Optional, List
+import os
 import secrets
+import tempfile
 from pydantic import validator
 
 class Settings(BaseSettings):
@@ -16,7 +18,95 @@ class Settings(BaseSettings):
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
-    
+
+    # Judge
+    # Số bài nộp được chấm đồng thời bởi hàng đợi chấm nền (gồm bài đang biên dịch và bài đang chạy test)
+    JUDGE_WORKERS: int = 4
+    # Giai đoạn biên dịch và giai đoạn chạy test có giới hạn đồng thời riêng; JUDGE_WORKERS lớn hơn
+    # JUDGE_RUN_WORKERS để bài sau được biên dịch trong khi bài trước đang chạy test.
+    # Core dành cho mỗi giai đoạn, dạng "0-1" hoặc "2,3" (rỗng: không ghim core)
+    JUDGE_COMPILE_WORKERS: int = 2
+    JUDGE_RUN_WORKERS: int = 2
+    JUDGE_COMPILE_CPUS: str = ""
+    JUDGE_RUN_CPUS: str = ""
+    # Khi khởi động, chấm lại các bài nộp còn pending
+    JUDGE_RECOVER_PENDING: bool = True
+    # Bài nộp được một worker nhận chấm quá số giây này mà vẫn pending (worker đã dừng giữa chừng)
+    # được worker khác nhận lại; phải lớn hơn thời gian chấm lâu nhất của một bài
+    JUDGE_CLAIM_STALE_SECONDS: int = 600
+    # Thứ tự chấm: fifo, fair (contest > practice > rejudge, xoay vòng theo người dùng)
+    # hoặc sjf (như fair, ưu tiên bài có số test x time limit nhỏ)
+    JUDGE_SCHEDULING_POLICY: str = "fair"
+    # Số lần chờ gần nhất của mỗi lớp dùng để tính phân vị thời gian chờ
+    JUDGE_QUEUE_STATS_WINDOW: int = 1000
+    # Chấm lại hàng loạt: số bài chấm lại cùng lúc, kích thước mỗi lô (checkpoint sau mỗi lô)
+    JUDGE_REJUDGE_CONCURRENCY: int = 2
+    JUDGE_REJUDGE_BATCH_SIZE: int = 100
+    JUDGE_REJUDGE_POLL_SECONDS: float = 1.0
+    # Job đang chạy không cập nhật quá số giây này được coi là bị bỏ dở và được chạy tiếp
+    JUDGE_REJUDGE_STALE_SECONDS: int = 60
+    # Bài nộp chưa chấm lại xong sau số giây này được đưa lại vào hàng đợi, tối đa số lần này
+    # (gồm lần đầu); sau đó job bỏ qua nó (xem RejudgeJob.failed_submission_ids)
+    JUDGE_REJUDGE_TIMEOUT_SECONDS: int = 900
+    JUDGE_REJUDGE_MAX_ATTEMPTS: int = 2
+    # Số test case được chạy song song cho một bài nộp (1 = chạy tuần tự)
+    JUDGE_PARALLEL_TESTS: int = 1
+    # Giới hạn thời gian tính theo CPU; thời gian thực tối đa = giới hạn x hệ số này (+0.5s)
+    JUDGE_WALL_TIME_MULTIPLIER: float = 2.0
+    # Giới hạn output của chương trình; vượt quá sẽ bị dừng với kết quả output_limit_exceeded
+    JUDGE_OUTPUT_LIMIT_MB: int = 64
+    JUDGE_STDERR_LIMIT_KB: int = 64
+    # Chạy thử (POST /submissions/test, /test/batch) chạy ngoài event loop: số yêu cầu chạy cùng lúc,
+    # số yêu cầu được chờ (vượt quá sẽ bị từ chối với 503)
+    JUDGE_CUSTOM_RUN_WORKERS: int = 4
+    JUDGE_CUSTOM_RUN_QUEUE: int = 32
+    # Chạy thử nhiều input (POST /submissions/test/batch): số input tối đa mỗi yêu cầu, số input chạy song song
+    JUDGE_CUSTOM_RUN_MAX_INPUTS: int = 20
+    JUDGE_CUSTOM_RUN_PARALLEL: int = 4
+    # Pool thư mục làm việc của judge (mặc định trên tmpfs nếu có): số workspace giữ sẵn mỗi worker,
+    # dung lượng tối đa của mỗi file chương trình ghi ra trong workspace
+    JUDGE_WORKSPACE_DIR: str = os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "judge_workspaces"
+    )
+    JUDGE_WORKSPACE_POOL_SIZE: int = 16
+    JUDGE_WORKSPACE_MAX_MB: int = 256
+    # Launcher đặt giới hạn tài nguyên cho chương trình trước exec (xem services/launcher.py),
+    # được biên dịch một lần vào thư mục này
+    JUDGE_LAUNCHER_DIR: str = os.path.join(tempfile.gettempdir(), "judge_launcher")
+    # Cache file thực thi đã biên dịch
+    COMPILE_CACHE_ENABLED: bool = True
+    COMPILE_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "judge_compile_cache")
+    COMPILE_CACHE_MAX_MB: int = 512
+    # Precompiled header bits/stdc++.h cho C++, build khi worker khởi động; số lần biên dịch bài mẫu
+    # để đo thời gian biên dịch có/không có PCH (0 để bỏ qua)
+    JUDGE_PCH_ENABLED: bool = True
+    JUDGE_PCH_DIR: str = os.path.join(tempfile.gettempdir(), "judge_pch")
+    JUDGE_PCH_BENCHMARK_RUNS: int = 3
+    # Checker (special judge) đã biên dịch, theo hash của code checker; giới hạn mặc định của mỗi lần chạy checker
+    JUDGE_CHECKER_DIR: str = os.path.join(tempfile.gettempdir(), "judge_checkers")
+    JUDGE_CHECKER_TIME_LIMIT_MS: int = 5000
+    JUDGE_CHECKER_COMPILE_TIMEOUT_SECONDS: int = 60
+    # Cache dữ liệu test: test nhỏ giữ trên RAM, test lớn ghi ra đĩa và đọc qua mmap
+    TEST_DATA_CACHE_MEMORY_MB: int = 256
+    TEST_DATA_CACHE_SMALL_KB: int = 64
+    TEST_DATA_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "judge_test_data")
+    TEST_DATA_CACHE_DISK_MB: int = 4096
+    # Chạy bài Python qua zygote (interpreter khởi động sẵn, fork cho mỗi test; chỉ trên Linux)
+    PYTHON_ZYGOTE_ENABLED: bool = True
+    # Cache kết quả chấm theo (code đã chuẩn hóa, ngôn ngữ, bộ test): bài nộp trùng code không phải chấm lại
+    VERDICT_CACHE_ENABLED: bool = True
+    VERDICT_CACHE_MAX_ENTRIES: int = 100000
+    # Chấm phân tán: API không tự chấm mà chuyển bài nộp tới các judge node đã đăng ký
+    JUDGE_DISTRIBUTED: bool = False
+    # Chu kỳ gửi heartbeat của judge node; node im lặng quá JUDGE_NODE_TIMEOUT_SECONDS bị loại khỏi vòng chấm
+    JUDGE_NODE_HEARTBEAT_SECONDS: int = 5
+    JUDGE_NODE_TIMEOUT_SECONDS: int = 20
+    JUDGE_NODE_REQUEST_TIMEOUT_SECONDS: float = 5.0
+    # Node không nhận được số request liên tiếp này bị loại khỏi vòng chấm (đến heartbeat kế tiếp)
+    JUDGE_NODE_MAX_FAILURES: int = 3
+    # Chữ ký của request giữa API và judge node chỉ có hiệu lực trong khoảng thời gian này
+    JUDGE_NODE_SIGNATURE_TTL_SECONDS: int = 60
+
     # Validators
     @validator("BACKEND_CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v: Any) -> List[str]:
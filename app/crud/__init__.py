@@ -1,4 +1,4 @@
-from app.crud import users, problems, contests, submissions
+from app.crud import users, problems, contests, submissions, judge_servers, rejudge_jobs
 
 # Export all CRUD modules
-__all__ = ["users", "problems", "contests", "submissions"]
\ No newline at end of file
+__all__ = ["users", "problems", "contests", "submissions", "judge_servers", "rejudge_jobs"]
\ No newline at end of file
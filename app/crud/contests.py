@@ -154,6 +154,42 @@ def update_score(db: Session, *, contest_id: str, user_id: str, score: int) -> C
     
     return participant
 
+def submission_points(points: int, status: str, score: Optional[int], max_score: Optional[int]) -> int:
+    """
+    Điểm cuộc thi của một bài nộp: points của bài toán nhân tỉ lệ score/max_score
+    (điểm theo subtask). Bài nộp chấm trước khi có điểm subtask (score None) hoặc bài
+    toán có tổng điểm test bằng 0 được toàn bộ points nếu được chấp nhận.
+    """
+    if score is not None and max_score:
+        return points * min(score, max_score) // max_score
+    return points if status == "accepted" else 0
+
+def recalculate_score(db: Session, *, contest_id: str, user_id: str) -> Optional[ContestParticipant]:
+    """
+    Tính lại điểm của người tham gia: với mỗi bài toán của cuộc thi, lấy điểm cao
+    nhất trong các bài nộp của người đó trong cuộc thi (xem submission_points), rồi
+    cộng lại
+    """
+    points = dict(db.query(ContestProblem.problem_id, ContestProblem.points).filter(
+        ContestProblem.contest_id == contest_id
+    ).all())
+    rows = db.query(
+        models.Submission.problem_id,
+        models.Submission.status,
+        models.Submission.score,
+        models.Submission.max_score
+    ).filter(
+        models.Submission.contest_id == contest_id,
+        models.Submission.user_id == user_id,
+        models.Submission.status != "pending"
+    ).all()
+    best: Dict[str, int] = {}
+    for problem_id, status, score, max_score in rows:
+        if problem_id in points:
+            earned = submission_points(points[problem_id] or 0, status, score, max_score)
+            best[problem_id] = max(best.get(problem_id, 0), earned)
+    return update_score(db, contest_id=contest_id, user_id=user_id, score=sum(best.values()))
+
 def get_registration_request(db: Session, contest_id: str, user_id: str):
     """
     Lấy thông tin yêu cầu đăng ký của người dùng cho cuộc thi.
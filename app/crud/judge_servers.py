@@ -0,0 +1,103 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+import secrets
+
+from sqlalchemy.orm import Session
+
+from app.models.judge_servers import JudgeServer
+from app.schemas.judge_servers import JudgeServerCreate, JudgeServerRegister
+
+def get_by_id(db: Session, id: str) -> Optional[JudgeServer]:
+    if not id:
+        return None
+    return db.query(JudgeServer).filter(JudgeServer.id == id).first()
+
+def get_by_name(db: Session, name: str) -> Optional[JudgeServer]:
+    return db.query(JudgeServer).filter(JudgeServer.name == name).first()
+
+def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> List[JudgeServer]:
+    return db.query(JudgeServer).order_by(JudgeServer.name).offset(skip).limit(limit).all()
+
+def create(db: Session, *, obj_in: JudgeServerCreate) -> JudgeServer:
+    """
+    Đăng ký một judge node mới với secret ngẫu nhiên.
+    Node chỉ được đưa vào vòng chấm sau heartbeat đầu tiên.
+    """
+    db_obj = JudgeServer(
+        **obj_in.model_dump(),
+        secret_key=secrets.token_urlsafe(32),
+        is_active=False,
+        current_workers=0
+    )
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def remove(db: Session, *, id: str) -> Optional[JudgeServer]:
+    server = get_by_id(db, id=id)
+    if server:
+        db.delete(server)
+        db.commit()
+    return server
+
+def register(db: Session, *, db_obj: JudgeServer, obj_in: JudgeServerRegister) -> JudgeServer:
+    """Cập nhật địa chỉ và số worker do node gửi lên khi khởi động, đưa node vào vòng chấm"""
+    db_obj.hostname = obj_in.hostname
+    db_obj.port = obj_in.port
+    db_obj.max_workers = max(1, obj_in.max_workers)
+    db_obj.current_workers = 0
+    db_obj.is_active = True
+    db_obj.last_heartbeat = datetime.utcnow()
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def heartbeat(db: Session, *, db_obj: JudgeServer, current_workers: int) -> JudgeServer:
+    db_obj.current_workers = max(0, current_workers)
+    db_obj.is_active = True
+    db_obj.last_heartbeat = datetime.utcnow()
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def get_live(db: Session, *, timeout_seconds: int) -> List[JudgeServer]:
+    """Các node đang hoạt động và gửi heartbeat trong timeout_seconds giây gần nhất"""
+    deadline = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    return db.query(JudgeServer).filter(
+        JudgeServer.is_active == True,
+        JudgeServer.last_heartbeat >= deadline
+    ).all()
+
+def expire_dead(db: Session, *, timeout_seconds: int) -> List[str]:
+    """Loại các node không còn gửi heartbeat khỏi vòng chấm; trả về id của chúng"""
+    deadline = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    dead = db.query(JudgeServer.id).filter(
+        JudgeServer.is_active == True,
+        (JudgeServer.last_heartbeat == None) | (JudgeServer.last_heartbeat < deadline)
+    ).all()
+    ids = [server_id for (server_id,) in dead]
+    if ids:
+        db.query(JudgeServer).filter(JudgeServer.id.in_(ids)).update(
+            {JudgeServer.is_active: False, JudgeServer.current_workers: 0}, synchronize_session=False
+        )
+        db.commit()
+    return ids
+
+def mark_inactive(db: Session, *, id: str) -> None:
+    db.query(JudgeServer).filter(JudgeServer.id == id).update(
+        {JudgeServer.is_active: False, JudgeServer.current_workers: 0}, synchronize_session=False
+    )
+    db.commit()
+
+def add_load(db: Session, *, id: str, count: int = 1) -> None:
+    """
+    Tăng số bài đang chấm của node ngay khi chuyển bài, để các lần chọn node tiếp
+    theo không dồn vào cùng một node trước khi heartbeat kế tiếp cập nhật số thật
+    """
+    db.query(JudgeServer).filter(JudgeServer.id == id).update(
+        {JudgeServer.current_workers: JudgeServer.current_workers + count}, synchronize_session=False
+    )
+    db.commit()
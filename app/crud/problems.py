@@ -1,14 +1,144 @@
 from typing import Any, Dict, Optional, Union, List
-from sqlalchemy import or_
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 from fastapi.encoders import jsonable_encoder
 
-from app.models.problems import Problem, TestCase
+from app.models.problems import Problem, TestCase, TestSetVersion
 from app.models.submissions import Submission
 from app.models.contests import ContestProblem
 from app.schemas.problems import ProblemCreate, ProblemUpdate, TestCaseCreate, TestCaseUpdate
+import hashlib
 import uuid
 
+def compute_test_case_hash(input_text: str, expected_output: str) -> str:
+    """
+    Hash nội dung (input + expected output) của một test case
+    """
+    digest = hashlib.sha256()
+    for part in (input_text.encode("utf-8"), expected_output.encode("utf-8")):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def compute_checker_hash(problem: Problem) -> Optional[str]:
+    """
+    Hash của checker (ngôn ngữ + code); None nếu bài toán không có checker
+    """
+    if not problem.checker_code:
+        return None
+    digest = hashlib.sha256()
+    for part in ((problem.checker_language or "").encode("utf-8"), problem.checker_code.encode("utf-8")):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def compute_compare_hash(problem: Problem) -> Optional[str]:
+    """
+    Hash của cách so sánh output (compare_mode, kèm sai số khi so sánh số thực);
+    None nếu so sánh theo dòng mặc định
+    """
+    if not problem.compare_mode or problem.compare_mode == "lines":
+        return None
+    config = problem.compare_mode
+    if problem.compare_mode == "float":
+        config += f":{problem.float_abs_tolerance}:{problem.float_rel_tolerance}"
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+def compute_test_set_fingerprint(problem: Problem, test_cases: List[TestCase]) -> Optional[str]:
+    """
+    Dấu vân tay của bộ test đang dùng để chấm: giới hạn của bài toán và id, thứ tự,
+    giới hạn, content_hash, score, subtask của từng test case, checker (nếu có), cách
+    so sánh output.
+    None nếu có test case chưa có hash.
+    """
+    if any(not test_case.content_hash for test_case in test_cases):
+        return None
+    digest = hashlib.sha256()
+    digest.update(f"{problem.time_limit_ms}:{problem.memory_limit_kb}\n".encode("utf-8"))
+    checker_hash = compute_checker_hash(problem)
+    if checker_hash:
+        digest.update(f"checker:{checker_hash}\n".encode("utf-8"))
+    if problem.compare_mode and problem.compare_mode != "lines":
+        digest.update(f"compare:{problem.compare_mode}\n".encode("utf-8"))
+    if problem.compare_mode == "float":
+        digest.update(f"tolerance:{problem.float_abs_tolerance}:{problem.float_rel_tolerance}\n".encode("utf-8"))
+    for test_case in sorted(test_cases, key=lambda t: (t.order, t.id)):
+        digest.update(
+            f"{test_case.id}:{test_case.order}:{test_case.time_limit_ms}:"
+            f"{test_case.memory_limit_kb}:{test_case.content_hash}:{test_case.score}:{test_case.subtask}\n".encode("utf-8")
+        )
+    return digest.hexdigest()
+
+def build_test_set_manifest(problem: Problem, test_cases: List[TestCase]) -> List[Dict[str, Any]]:
+    """
+    Danh sách test case của một phiên bản bộ test, với giới hạn thực tế
+    (giới hạn riêng của test case, nếu không có thì của bài toán)
+    """
+    return [
+        {
+            "test_case_id": test_case.id,
+            "order": test_case.order,
+            "content_hash": test_case.content_hash,
+            "time_limit_ms": test_case.time_limit_ms or problem.time_limit_ms,
+            "memory_limit_kb": test_case.memory_limit_kb or problem.memory_limit_kb,
+            "score": test_case.score,
+            "subtask": test_case.subtask,
+            "is_sample": test_case.is_sample
+        }
+        for test_case in sorted(test_cases, key=lambda t: (t.order, t.id))
+    ]
+
+def get_test_set_version(db: Session, *, id: str) -> Optional[TestSetVersion]:
+    if not id:
+        return None
+    return db.query(TestSetVersion).filter(TestSetVersion.id == id).first()
+
+def get_test_set_versions(db: Session, *, problem_id: str) -> List[TestSetVersion]:
+    return db.query(TestSetVersion).filter(
+        TestSetVersion.problem_id == problem_id
+    ).order_by(TestSetVersion.version.desc()).all()
+
+def get_or_create_test_set_version(
+    db: Session, *, problem: Problem, test_cases: List[TestCase]
+) -> Optional[TestSetVersion]:
+    """
+    Phiên bản bộ test ứng với nội dung hiện tại của bài toán; tạo phiên bản mới
+    nếu bộ test đã thay đổi so với mọi phiên bản trước. Phiên bản đã tạo không bao
+    giờ bị sửa. None nếu có test case chưa có content_hash.
+    """
+    fingerprint = compute_test_set_fingerprint(problem, test_cases)
+    if not fingerprint:
+        return None
+    for _ in range(3):
+        version = db.query(TestSetVersion).filter(
+            TestSetVersion.problem_id == problem.id,
+            TestSetVersion.fingerprint == fingerprint
+        ).first()
+        if version:
+            return version
+        latest = db.query(func.max(TestSetVersion.version)).filter(
+            TestSetVersion.problem_id == problem.id
+        ).scalar() or 0
+        version = TestSetVersion(
+            problem_id=problem.id,
+            version=latest + 1,
+            fingerprint=fingerprint,
+            manifest=build_test_set_manifest(problem, test_cases),
+            checker_hash=compute_checker_hash(problem),
+            compare_hash=compute_compare_hash(problem)
+        )
+        db.add(version)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Worker khác vừa tạo phiên bản này (hoặc số phiên bản này): đọc lại
+            db.rollback()
+            continue
+        db.refresh(version)
+        return version
+    return None
+
 def get_by_id(db: Session, id: str) -> Optional[Problem]:
     return db.query(Problem).filter(Problem.id == id).first()
 
@@ -114,6 +244,7 @@ def create_test_case(db: Session, *, obj_in: TestCaseCreate, problem_id: str) ->
     db_obj = TestCase(
         id=test_case_id,
         problem_id=problem_id,
+        content_hash=compute_test_case_hash(obj_in_data["input"], obj_in_data["expected_output"]),
         **obj_in_data
     )
     
@@ -161,6 +292,7 @@ def update_test_case(db: Session, *, test_case_id: str, obj_in: Union[Dict[str,
     for field, value in update_data.items():
         if hasattr(test_case, field):
             setattr(test_case, field, value)
+    test_case.content_hash = compute_test_case_hash(test_case.input, test_case.expected_output)
     
     db.add(test_case)
     db.commit()
@@ -0,0 +1,84 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.rejudge_jobs import RejudgeJob
+from app.models.submissions import Submission
+from app.schemas.rejudge import RejudgeCreate
+
+def get_by_id(db: Session, id: str) -> Optional[RejudgeJob]:
+    return db.query(RejudgeJob).filter(RejudgeJob.id == id).first()
+
+def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> List[RejudgeJob]:
+    return db.query(RejudgeJob).order_by(RejudgeJob.created_at.desc()).offset(skip).limit(limit).all()
+
+def create(db: Session, *, obj_in: RejudgeCreate, created_by: str) -> RejudgeJob:
+    filters = obj_in.model_dump(exclude={"problem_id", "contest_id"}, exclude_none=True)
+    db_obj = RejudgeJob(
+        problem_id=obj_in.problem_id,
+        contest_id=obj_in.contest_id,
+        filters=filters,
+        status="queued",
+        created_by=created_by
+    )
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def cancel(db: Session, *, db_obj: RejudgeJob) -> RejudgeJob:
+    if db_obj.status in ("queued", "running"):
+        db_obj.status = "cancelled"
+        db_obj.finished_at = datetime.utcnow()
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+    return db_obj
+
+def submissions_query(db: Session, job: RejudgeJob):
+    """Các bài nộp thuộc phạm vi của job, sắp theo id (thứ tự dùng cho checkpoint)"""
+    query = db.query(Submission)
+    if job.problem_id:
+        query = query.filter(Submission.problem_id == job.problem_id)
+    if job.contest_id:
+        query = query.filter(Submission.contest_id == job.contest_id)
+    filters = job.filters or {}
+    if filters.get("submission_ids"):
+        query = query.filter(Submission.id.in_(filters["submission_ids"]))
+    if filters.get("user_id"):
+        query = query.filter(Submission.user_id == filters["user_id"])
+    if filters.get("statuses"):
+        query = query.filter(Submission.status.in_(filters["statuses"]))
+    if filters.get("languages"):
+        query = query.filter(Submission.language.in_(filters["languages"]))
+    return query.order_by(Submission.id)
+
+def claim_next(db: Session, *, stale_seconds: int) -> Optional[RejudgeJob]:
+    """
+    Nhận job tiếp theo: job đang chờ, hoặc job đang chạy nhưng tiến trình chạy nó
+    đã dừng (không cập nhật heartbeat_at quá stale_seconds giây). Cập nhật có điều
+    kiện nên nhiều tiến trình không nhận cùng một job.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=stale_seconds)
+    candidates = db.query(RejudgeJob).filter(or_(
+        RejudgeJob.status == "queued",
+        (RejudgeJob.status == "running") & or_(RejudgeJob.heartbeat_at == None, RejudgeJob.heartbeat_at < stale)
+    )).order_by(RejudgeJob.created_at).limit(5).all()
+    for job in candidates:
+        claimed = db.query(RejudgeJob).filter(
+            RejudgeJob.id == job.id,
+            RejudgeJob.status == job.status,
+            or_(RejudgeJob.heartbeat_at == None, RejudgeJob.heartbeat_at == job.heartbeat_at)
+        ).update({
+            RejudgeJob.status: "running",
+            RejudgeJob.heartbeat_at: now,
+            RejudgeJob.started_at: job.started_at or now
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            db.refresh(job)
+            return job
+    return None
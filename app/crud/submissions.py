@@ -1,11 +1,13 @@
 from typing import Any, Dict, Optional, Union, List
-from sqlalchemy import and_
+from datetime import datetime, timedelta
+from sqlalchemy import and_, insert, or_
 from sqlalchemy.orm import Session, joinedload
 from fastapi.encoders import jsonable_encoder
+import uuid
 
-from app.models.submissions import Submission
+from app.models.submissions import Submission, SubmissionTestResult
 from app.models.users import User
-from app.models.problems import Problem
+from app.models.problems import Problem, TestCase, TestSetVersion
 from app.schemas.submissions import SubmissionCreate, SubmissionUpdate
 
 def get_by_id(db: Session, id: str) -> Optional[Submission]:
@@ -149,6 +151,113 @@ def update(
     db.refresh(db_obj)
     return db_obj
 
+def claim_pending(db: Session, *, submission_id: str, stale_seconds: int) -> bool:
+    """
+    Nhận chấm một bài nộp đang pending: chưa worker nào nhận, hoặc worker đã nhận không
+    chấm xong sau stale_seconds giây. Cập nhật có điều kiện nên khi nhiều tiến trình
+    cùng đưa một bài vào hàng đợi (ví dụ recover_pending ở mỗi worker uvicorn), chỉ một
+    tiến trình chấm nó.
+    """
+    now = datetime.utcnow()
+    claimed = db.query(Submission).filter(
+        Submission.id == submission_id,
+        Submission.status == "pending",
+        or_(Submission.judge_claimed_at == None, Submission.judge_claimed_at < now - timedelta(seconds=stale_seconds))
+    ).update({Submission.judge_claimed_at: now}, synchronize_session=False)
+    db.commit()
+    return bool(claimed)
+
+def release_claims(db: Session, *, submission_ids: List[str]) -> None:
+    """Bỏ nhận các bài nộp chưa chấm xong để tiến trình khác chấm được ngay (khi dừng server)"""
+    if not submission_ids:
+        return
+    db.query(Submission).filter(
+        Submission.id.in_(submission_ids), Submission.status == "pending"
+    ).update({Submission.judge_claimed_at: None}, synchronize_session=False)
+    db.commit()
+
+def get_test_results(db: Session, *, submission_id: str) -> List[SubmissionTestResult]:
+    return db.query(SubmissionTestResult).filter(
+        SubmissionTestResult.submission_id == submission_id
+    ).all()
+
+def get_details(db: Session, *, submission: Submission) -> Optional[Dict[str, Any]]:
+    """
+    Kết quả từng test case của submission (dạng SubmissionDetails), theo thứ tự test
+    của phiên bản bộ test đã dùng để chấm. Chỉ dùng hai câu truy vấn: các dòng kết quả
+    (chỉ lấy các cột cần) và manifest của phiên bản bộ test.
+    None nếu submission chưa được chấm.
+    """
+    if submission.status == "pending":
+        return None
+    rows = db.query(
+        SubmissionTestResult.test_case_id,
+        SubmissionTestResult.status,
+        SubmissionTestResult.execution_time_ms,
+        SubmissionTestResult.memory_used_kb,
+        SubmissionTestResult.output_diff
+    ).filter(
+        SubmissionTestResult.submission_id == submission.id
+    ).all()
+    manifest = []
+    if submission.test_set_version_id:
+        manifest = db.query(TestSetVersion.manifest).filter(
+            TestSetVersion.id == submission.test_set_version_id
+        ).scalar() or []
+    entries = {entry["test_case_id"]: entry for entry in manifest}
+    
+    test_results = [
+        {
+            "test_case_id": row.test_case_id,
+            "test_case_order": entries.get(row.test_case_id, {}).get("order"),
+            "subtask": entries.get(row.test_case_id, {}).get("subtask"),
+            "status": row.status,
+            "execution_time_ms": row.execution_time_ms,
+            "memory_used_kb": row.memory_used_kb,
+            "message": row.output_diff
+        }
+        for row in rows
+    ]
+    # Test case không còn trong manifest (không xảy ra với dữ liệu mới) xếp cuối
+    test_results.sort(key=lambda result: (result["test_case_order"] is None, result["test_case_order"] or 0))
+    passed = sum(1 for result in test_results if result["status"] == "accepted")
+    return {
+        "total_test_cases": len(manifest) or len(test_results),
+        "passed_test_cases": passed,
+        "failed_test_cases": len(test_results) - passed,
+        "test_results": test_results
+    }
+
+def replace_test_results(db: Session, *, submission_id: str, results: List[Dict[str, Any]]) -> None:
+    """
+    Thay kết quả từng test case của submission bằng kết quả của lần chấm mới
+    (ghi bằng một câu lệnh insert cho cả submission).
+    """
+    db.query(SubmissionTestResult).filter(
+        SubmissionTestResult.submission_id == submission_id
+    ).delete(synchronize_session=False)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "submission_id": submission_id,
+            "test_case_id": result["test_case_id"],
+            "status": result["status"],
+            "execution_time_ms": result.get("execution_time_ms") or 0,
+            "memory_used_kb": result.get("memory_used_kb") or 0,
+            "output_diff": result.get("message") or None
+        }
+        for result in results
+    ]
+    if rows:
+        db.execute(insert(SubmissionTestResult), rows)
+    db.commit()
+
+def delete_test_results(db: Session, *, submission_id: str) -> None:
+    db.query(SubmissionTestResult).filter(
+        SubmissionTestResult.submission_id == submission_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
 def remove(db: Session, *, id: str) -> Submission:
     """
     Xóa một submission.
@@ -213,7 +322,8 @@ def get_user_statistics(db: Session, *, user_id: str) -> Dict[str, Any]:
     
     by_status = {}
     statuses = ["accepted", "wrong_answer", "time_limit_exceeded", 
-                "memory_limit_exceeded", "runtime_error", "compilation_error", "pending"]
+                "memory_limit_exceeded", "runtime_error", "compilation_error",
+                "judge_error", "output_limit_exceeded", "pending"]
     
     for status in statuses:
         count = db.query(Submission).filter(
@@ -273,4 +383,4 @@ def get_user_statistics(db: Session, *, user_id: str) -> Dict[str, Any]:
         "execution_time_avg": round(execution_time_avg, 2),
         "memory_used_avg": round(memory_used_avg, 2),
         "latest_submission": latest_submission_info
-    }
\ No newline at end of file
+    }
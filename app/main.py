@@ -4,6 +4,8 @@ import uvicorn
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.services.judge_queue import get_judge_queue
+from app.services.rejudge import get_rejudge_manager
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -23,6 +25,21 @@ if settings.BACKEND_CORS_ORIGINS:
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+def start_judge_queue():
+    judge_queue = get_judge_queue()
+    judge_queue.start()
+    if settings.JUDGE_RECOVER_PENDING:
+        # Các bài nộp còn pending từ lần chạy trước (server dừng giữa chừng)
+        judge_queue.recover_pending()
+    # Tiếp tục các job chấm lại bị dừng giữa chừng
+    get_rejudge_manager().start()
+
+@app.on_event("shutdown")
+def stop_judge_queue():
+    get_rejudge_manager().shutdown()
+    get_judge_queue().shutdown(wait=False)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Coding Platform API"}
@@ -1,9 +1,10 @@
 from app.models.users import User
-from app.models.problems import Problem, TestCase
+from app.models.problems import Problem, TestCase, TestSetVersion
 from app.models.contests import Contest, ContestProblem, ContestParticipant
 from app.models.submissions import Submission
 from app.models.languages import Language
 from app.models.judge_servers import JudgeServer
+from app.models.rejudge_jobs import RejudgeJob
 
 
 # Export tất cả models
@@ -11,10 +12,12 @@ __all__ = [
     "User",
     "Problem",
     "TestCase",
+    "TestSetVersion",
     "Contest",
     "ContestProblem",
     "ContestParticipant",
     "Submission",
     "Language",
-    "JudgeServer"
+    "JudgeServer",
+    "RejudgeJob"
 ]
\ No newline at end of file
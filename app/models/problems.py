@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, Enum, Boolean, ForeignKey, func
+from sqlalchemy import Column, String, Text, DateTime, Integer, Float, Enum, Boolean, ForeignKey, UniqueConstraint, func
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -22,10 +22,20 @@ class Problem(Base):
     is_public = Column(Boolean, default=True)
     time_limit_ms = Column(Integer, default=1000)
     memory_limit_kb = Column(Integer, default=262144)
+    # Checker (special judge) cho bài có nhiều đáp án đúng, xem services/checker.py
+    checker_code = Column(Text, nullable=True)
+    checker_language = Column(String(20), nullable=True)
+    checker_time_limit_ms = Column(Integer, nullable=True)
+    # Cách so sánh output khi không có checker: exact, lines, tokens, float (None = lines), xem services/comparator.py
+    compare_mode = Column(String(20), nullable=True)
+    # Sai số cho phép ở chế độ float (None = mặc định 1e-6)
+    float_abs_tolerance = Column(Float, nullable=True)
+    float_rel_tolerance = Column(Float, nullable=True)
 
     # Relationships
     creator = relationship("User", back_populates="problems")
     test_cases = relationship("TestCase", back_populates="problem", cascade="all, delete-orphan")
+    test_set_versions = relationship("TestSetVersion", back_populates="problem", cascade="all, delete-orphan")
     submissions = relationship("Submission", back_populates="problem")
     contests = relationship("ContestProblem", back_populates="problem")
 
@@ -44,5 +54,38 @@ class TestCase(Base):
     time_limit_ms = Column(Integer, nullable=True)
     memory_limit_kb = Column(Integer, nullable=True)
     score = Column(Integer, default=100)
+    # Nhóm (subtask) của test case: điểm của nhóm chỉ được tính khi mọi test trong nhóm đều đúng,
+    # xem services/scoring.py. None = nhóm chung của các test không chia subtask
+    subtask = Column(Integer, nullable=True)
+    # sha256 của input + expected_output, dùng làm key cho cache dữ liệu test
+    content_hash = Column(String(64), nullable=True)
     
-    problem = relationship("Problem", back_populates="test_cases")
\ No newline at end of file
+    problem = relationship("Problem", back_populates="test_cases")
+
+
+class TestSetVersion(Base):
+    """
+    Phiên bản bất biến của bộ test một bài toán, được tạo khi bộ test thay đổi.
+    manifest là danh sách các test case lúc đó: test_case_id, order, content_hash,
+    giới hạn thời gian/bộ nhớ thực tế (đã tính giới hạn của bài toán), score, subtask,
+    is_sample.
+    Đổi checker hoặc cách so sánh output cũng tạo phiên bản mới.
+    """
+    __tablename__ = "test_set_versions"
+    __table_args__ = (
+        UniqueConstraint("problem_id", "version", name="uq_test_set_versions_problem_version"),
+        UniqueConstraint("problem_id", "fingerprint", name="uq_test_set_versions_problem_fingerprint"),
+    )
+
+    id = Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    problem_id = Column(String(36), ForeignKey("problems.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    manifest = Column(JSON, nullable=False)
+    # Hash của checker dùng ở phiên bản này (None nếu so sánh output mặc định)
+    checker_hash = Column(String(64), nullable=True)
+    # Hash của cách so sánh output ở phiên bản này (None nếu so sánh theo dòng mặc định)
+    compare_hash = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    problem = relationship("Problem", back_populates="test_set_versions")
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, Enum, ForeignKey
+from sqlalchemy.dialects.mysql import JSON, CHAR
+from app.database import Base
+import uuid
+from datetime import datetime
+
+class RejudgeJob(Base):
+    __tablename__ = "rejudge_jobs"
+
+    id = Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(Enum('queued', 'running', 'completed', 'failed', 'cancelled'), nullable=False, default='queued')
+    # Phạm vi chấm lại: bài toán, cuộc thi và/hoặc bộ lọc (submission_ids, user_id, statuses, languages)
+    problem_id = Column(CHAR(36), ForeignKey("problems.id", ondelete="CASCADE"), nullable=True)
+    contest_id = Column(CHAR(36), ForeignKey("contests.id", ondelete="CASCADE"), nullable=True)
+    filters = Column(JSON, nullable=True)
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    compiled = Column(Integer, nullable=False, default=0)
+    # Checkpoint: mọi bài nộp có id <= cursor đã được chấm lại xong
+    cursor = Column(CHAR(36), nullable=True)
+    # Bài nộp job ngừng chờ vì không chấm lại xong sau JUDGE_REJUDGE_MAX_ATTEMPTS lần thử
+    failed_submission_ids = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Tiến trình đang chạy job cập nhật định kỳ; job bị bỏ dở (tiến trình chết) được tiến trình khác nhận lại
+    heartbeat_at = Column(DateTime, nullable=True)
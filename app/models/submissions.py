@@ -21,11 +21,20 @@ class Submission(Base):
         'time_limit_exceeded',
         'memory_limit_exceeded',
         'runtime_error',
-        'compilation_error'
+        'compilation_error',
+        'judge_error',
+        'output_limit_exceeded'
     ), nullable=False, default='pending')
     execution_time_ms = Column(Integer, nullable=True)
     memory_used_kb = Column(Integer, nullable=True)
     submitted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Phiên bản bộ test được dùng ở lần chấm gần nhất
+    test_set_version_id = Column(CHAR(36), ForeignKey("test_set_versions.id", ondelete="SET NULL"), nullable=True)
+    # Điểm đạt được theo subtask và tổng điểm của bộ test (None nếu chưa chấm hoặc chấm trước khi có điểm)
+    score = Column(Integer, nullable=True)
+    max_score = Column(Integer, nullable=True)
+    # Thời điểm một worker nhận chấm bài nộp đang pending (None nếu chưa có worker nào nhận)
+    judge_claimed_at = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="submissions")
     problem = relationship("Problem", back_populates="submissions")
@@ -45,7 +54,8 @@ class SubmissionTestResult(Base):
         "memory_limit_exceeded",
         "runtime_error",
         "compilation_error",
-        "judge_error"
+        "judge_error",
+        "output_limit_exceeded"
     ), nullable=False)
     execution_time_ms = Column(Integer, nullable=False)
     memory_used_kb = Column(Integer, nullable=False)
@@ -2,9 +2,15 @@ from app.schemas.users import User, UserCreate, UserUpdate, Token, TokenPayload
 from app.schemas.problems import Problem, ProblemCreate, ProblemUpdate, TestCase as ProblemTestCase, TestCaseCreate as ProblemTestCaseCreate, ProblemWithTestCases
 from app.schemas.contests import Contest, ContestCreate, ContestUpdate, ContestDetail, ContestProblemDetail, RegistrationStatusResponse, ContestProblem, ContestParticipant  # Thêm ContestParticipant vào đây
 from app.schemas.submissions import (
-    Submission, SubmissionCreate, SubmissionUpdate, SubmissionWithDetails, SubmissionTestInput, SubmissionTestResult
+    Submission, SubmissionCreate, SubmissionUpdate, SubmissionWithDetails, SubmissionTestInput, SubmissionTestResult,
+    SubmissionTestBatchInput, SubmissionTestRunResult, SubmissionTestBatchResult, SubmissionTestCaseResult,
+    SubmissionDetails
 )
-from app.schemas.test_cases import TestCase, TestCaseCreate, Message
+from app.schemas.test_cases import TestCase, TestCaseCreate, TestSetVersion, Message
+from app.schemas.judge_servers import (
+    JudgeServer, JudgeServerCreate, JudgeServerWithSecret, JudgeServerRegister, JudgeServerHeartbeat
+)
+from app.schemas.rejudge import RejudgeCreate, RejudgeJob
 
 # Export tất cả schemas
 __all__ = [
@@ -12,5 +18,9 @@ __all__ = [
     "Problem", "ProblemCreate", "ProblemUpdate", "ProblemTestCase", "ProblemTestCaseCreate", "ProblemWithTestCases",
     "Contest", "ContestCreate", "ContestUpdate", "ContestProblem", "ContestParticipant", "ContestDetail",
     "Submission", "SubmissionCreate", "SubmissionUpdate", "SubmissionWithDetails", "SubmissionTestInput", "SubmissionTestResult",
-    "TestCase", "TestCaseCreate", "Message"
+    "SubmissionTestBatchInput", "SubmissionTestRunResult", "SubmissionTestBatchResult", "SubmissionTestCaseResult",
+    "SubmissionDetails",
+    "TestCase", "TestCaseCreate", "TestSetVersion", "Message",
+    "JudgeServer", "JudgeServerCreate", "JudgeServerWithSecret", "JudgeServerRegister", "JudgeServerHeartbeat",
+    "RejudgeCreate", "RejudgeJob"
 ]
\ No newline at end of file
@@ -0,0 +1,34 @@
+from typing import Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+class JudgeServerBase(BaseModel):
+    name: str
+    hostname: str
+    port: int
+    max_workers: int = 4
+
+class JudgeServerCreate(JudgeServerBase):
+    pass
+
+class JudgeServer(JudgeServerBase):
+    id: str
+    is_active: bool = True
+    last_heartbeat: Optional[datetime] = None
+    current_workers: int = 0
+
+    class Config:
+        from_attributes = True
+
+class JudgeServerWithSecret(JudgeServer):
+    # Chỉ trả về một lần khi tạo, judge node dùng để ký request
+    secret_key: str
+
+# Judge node gửi khi khởi động để cập nhật địa chỉ và số worker của nó
+class JudgeServerRegister(BaseModel):
+    hostname: str
+    port: int
+    max_workers: int
+
+class JudgeServerHeartbeat(BaseModel):
+    current_workers: int
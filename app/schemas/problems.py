@@ -12,6 +12,7 @@ class TestCaseBase(BaseModel):
     memory_limit_kb: Optional[int] = None
     is_hidden: Optional[bool] = False
     score: Optional[int] = None
+    subtask: Optional[int] = None
 
 class TestCaseCreate(TestCaseBase):
     pass
@@ -25,6 +26,7 @@ class TestCaseUpdate(BaseModel):
     memory_limit_kb: Optional[int] = None
     is_hidden: Optional[bool] = None
     score: Optional[int] = None
+    subtask: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -51,6 +53,11 @@ class ProblemBase(BaseModel):
     is_public: Optional[bool] = True
     time_limit_ms: Optional[int] = 1000
     memory_limit_kb: Optional[int] = 262144
+    # Cách so sánh output: exact (từng byte), lines (bỏ whitespace cuối dòng, mặc định), tokens,
+    # float (token là số được so sánh với sai số tuyệt đối/tương đối cho phép)
+    compare_mode: Optional[Literal['exact', 'lines', 'tokens', 'float']] = None
+    float_abs_tolerance: Optional[float] = Field(None, ge=0)
+    float_rel_tolerance: Optional[float] = Field(None, ge=0)
     
     @validator('title')
     def title_not_empty(cls, v):
@@ -79,6 +86,8 @@ class ProblemInDBBase(ProblemBase):
     id: str
     created_at: datetime
     created_by: Optional[str] = None
+    # Ngôn ngữ của checker nếu bài được chấm bằng checker (special judge)
+    checker_language: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -86,5 +95,16 @@ class ProblemInDBBase(ProblemBase):
 class Problem(ProblemInDBBase):
     pass
 
+class ProblemCheckerUpdate(BaseModel):
+    language: Literal['cpp', 'python']
+    code: str
+    time_limit_ms: Optional[int] = Field(None, gt=0)
+
+class ProblemChecker(BaseModel):
+    problem_id: str
+    language: str
+    code: str
+    time_limit_ms: Optional[int] = None
+
 class ProblemWithTestCases(Problem):
     test_cases: List[TestCase] = []
\ No newline at end of file
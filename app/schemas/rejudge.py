@@ -0,0 +1,34 @@
+from typing import List, Optional, Literal, Dict, Any
+from pydantic import BaseModel
+from datetime import datetime
+
+class RejudgeCreate(BaseModel):
+    # Cần ít nhất một trong problem_id, contest_id, submission_ids
+    problem_id: Optional[str] = None
+    contest_id: Optional[str] = None
+    submission_ids: Optional[List[str]] = None
+    user_id: Optional[str] = None
+    statuses: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    # Chỉ chạy các test case đã thêm/sửa so với phiên bản bộ test đã chấm;
+    # False để chấm lại mọi test case (ví dụ sau khi sửa lỗi của judge)
+    delta: bool = True
+
+class RejudgeJob(BaseModel):
+    id: str
+    status: Literal['queued', 'running', 'completed', 'failed', 'cancelled']
+    problem_id: Optional[str] = None
+    contest_id: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None
+    total: int = 0
+    processed: int = 0
+    compiled: int = 0
+    failed_submission_ids: Optional[List[str]] = None
+    error: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
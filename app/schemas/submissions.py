@@ -24,10 +24,15 @@ class SubmissionUpdate(BaseModel):
         'memory_limit_exceeded',
         'runtime_error',
         'compilation_error',
-        'judge_error'  # Thêm giá trị này
+        'judge_error',  # Thêm giá trị này
+        'output_limit_exceeded'
     ]] = None
     execution_time_ms: Optional[int] = None
     memory_used_kb: Optional[int] = None
+    test_set_version_id: Optional[str] = None
+    score: Optional[int] = None
+    max_score: Optional[int] = None
+    judge_claimed_at: Optional[datetime] = None
 
 class SubmissionInDBBase(SubmissionBase):
     id: str
@@ -39,10 +44,16 @@ class SubmissionInDBBase(SubmissionBase):
         'time_limit_exceeded',
         'memory_limit_exceeded',
         'runtime_error',
-        'compilation_error'
+        'compilation_error',
+        'judge_error',
+        'output_limit_exceeded'
     ] = 'pending'
     execution_time_ms: Optional[int] = None
     memory_used_kb: Optional[int] = None
+    test_set_version_id: Optional[str] = None
+    # Điểm đạt được theo subtask / tổng điểm của bộ test
+    score: Optional[int] = None
+    max_score: Optional[int] = None
     submitted_at: datetime
     
     class Config:
@@ -72,11 +83,46 @@ class SubmissionTestResult(BaseModel):
     class Config:
         from_attributes = True
 
+class SubmissionTestBatchInput(BaseModel):
+    problem_id: str
+    code: str
+    language: Literal['c', 'cpp', 'python', 'pascal']
+    inputs: List[str] = []
+    # Chạy thêm mọi test mẫu của bài (trước các input tùy chỉnh)
+    use_samples: bool = False
+
+class SubmissionTestRunResult(SubmissionTestResult):
+    # Thứ tự của lần chạy trong yêu cầu (test mẫu trước, input tùy chỉnh sau)
+    index: int
+    # Chỉ có với test mẫu: output mong đợi và output có đúng không
+    test_case_id: Optional[str] = None
+    expected_output: Optional[str] = None
+    passed: Optional[bool] = None
+
+class SubmissionTestBatchResult(BaseModel):
+    # success, hoặc compilation_error (khi đó không có lần chạy nào)
+    status: str = "success"
+    message: Optional[str] = None
+    results: List[SubmissionTestRunResult] = []
+
+class SubmissionTestCaseResult(BaseModel):
+    # Kết quả chấm của một test case (lưu trong submission_test_results)
+    test_case_id: str
+    test_case_order: Optional[int] = None
+    subtask: Optional[int] = None
+    status: str
+    execution_time_ms: int
+    memory_used_kb: int
+    message: Optional[str] = None
+
 class SubmissionDetails(BaseModel):
+    # Số test case của phiên bản bộ test đã dùng để chấm
     total_test_cases: int
     passed_test_cases: int
     failed_test_cases: int
-    test_results: List[SubmissionTestResult]
+    # Các test case đã chạy (hoặc lấy lại từ lần chấm trước) theo thứ tự; test bị bỏ qua sau
+    # test sai (cùng subtask, hoặc khi không còn điểm để lấy) không có mặt
+    test_results: List[SubmissionTestCaseResult]
     error: Optional[str] = None
 
 class Submission(SubmissionInDBBase):
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
+from datetime import datetime
 
 class TestCaseBase(BaseModel):
     input: str
@@ -10,6 +11,8 @@ class TestCaseBase(BaseModel):
     time_limit_ms: Optional[int] = None
     memory_limit_kb: Optional[int] = None
     score: int = 100
+    # Nhóm (subtask) của test case, None nếu bài toán không chia subtask
+    subtask: Optional[int] = None
 
 class TestCaseCreate(TestCaseBase):
     pass
@@ -21,5 +24,17 @@ class TestCase(TestCaseBase):
     class Config:
         from_attributes = True  # Thay thế cho orm_mode trong pydantic v2
 
+class TestSetVersion(BaseModel):
+    id: str
+    problem_id: str
+    version: int
+    fingerprint: str
+    # Các test case của phiên bản: test_case_id, order, content_hash, giới hạn, score, subtask, is_sample
+    manifest: List[Dict[str, Any]]
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 class Message(BaseModel):
     message: str
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Checker (special judge) cho các bài có nhiều đáp án đúng.
+
+Bài toán có thể gắn một chương trình checker viết bằng C++ hoặc Python
+(Problem.checker_code, checker_language). Checker được gọi với 3 đường dẫn:
+
+    checker <input> <expected_output> <contestant_output>
+
+và trả về exit code 0 nếu output đúng, 1 (hoặc 2) nếu sai; mọi trường hợp khác
+(exit code khác, bị kill, quá checker_time_limit_ms) là lỗi của checker và bài
+nộp nhận judge_error. stdout/stderr của checker được dùng làm thông báo.
+
+Checker được biên dịch một lần cho mỗi phiên bản (hash của ngôn ngữ + code, là
+một phần của fingerprint bộ test) vào JUDGE_CHECKER_DIR và giữ trong
+CheckerCache của worker. Việc biên dịch diễn ra khi người ra đề lưu checker và
+khi hàng đợi chấm khởi động (warm_checkers), không nằm trên đường chấm bài;
+worker chỉ tự biên dịch nếu chưa từng thấy phiên bản checker đó (ví dụ judge
+node khởi động trước khi checker được lưu), và chỉ một lần.
+"""
+from typing import Dict, List, Optional
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.problems import compute_checker_hash
+from app.database import SessionLocal
+from app.models.problems import Problem
+from app.services.spawn import spawn, wait_for_process, CappedPipeReader
+
+logger = logging.getLogger(__name__)
+
+CHECKER_LANGUAGES = ("cpp", "python")
+CPP_COMPILER_PATH = os.environ.get("CPP_COMPILER_PATH", "g++")
+PYTHON_INTERPRETER = "python"
+
+class CheckerError(Exception):
+    """Không biên dịch được checker (thông báo là output của trình biên dịch)"""
+
+class CompiledChecker:
+    def __init__(self, key: str, argv: List[str], time_limit_ms: int):
+        self.key = key
+        self.argv = argv
+        self.time_limit_ms = time_limit_ms
+
+    def check(self, run_dir: str, input_path: str, expected_path: str, output_path: str) -> Dict[str, str]:
+        """Chạy checker trên một test; trả về status (accepted/wrong_answer/judge_error) và message"""
+        process = spawn(
+            self.argv + [input_path, expected_path, output_path],
+            cwd=run_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cpu_time_limit_ms=self.time_limit_ms
+        )
+        stdout_reader = CappedPipeReader(process.stdout, settings.JUDGE_STDERR_LIMIT_KB * 1024)
+        stderr_reader = CappedPipeReader(process.stderr, settings.JUDGE_STDERR_LIMIT_KB * 1024)
+        usage = wait_for_process(process, max(1, self.time_limit_ms / 1000 * settings.JUDGE_WALL_TIME_MULTIPLIER + 0.5))
+        message = (stdout_reader.read() + stderr_reader.read()).decode("utf-8", errors="replace").strip()
+
+        if usage["timed_out"] or usage["cpu_time_ms"] > self.time_limit_ms:
+            logger.error(f"Checker {self.key[:12]} timed out after {self.time_limit_ms}ms")
+            return {"status": "judge_error", "message": "Checker chạy quá thời gian"}
+        if process.returncode == 0:
+            return {"status": "accepted", "message": message}
+        if process.returncode in (1, 2):
+            return {"status": "wrong_answer", "message": message}
+        logger.error(f"Checker {self.key[:12]} failed with return code {process.returncode}: {message[:200]}")
+        return {"status": "judge_error", "message": f"Checker lỗi (exit code {process.returncode})"}
+
+class CheckerCache:
+    """Checker đã biên dịch theo key (hash của ngôn ngữ + code), dùng chung cho mọi thread của worker"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._entries: Dict[str, CompiledChecker] = {}
+        # Checker lỗi biên dịch -> output của trình biên dịch, để không biên dịch lại ở mỗi bài nộp
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.compiles = 0
+
+    def get(self, problem: Problem) -> Optional[CompiledChecker]:
+        """Checker của bài toán khi chấm; None nếu bài không có checker"""
+        key = compute_checker_hash(problem)
+        if key and key not in self._entries and key not in self._errors:
+            logger.warning(f"Checker {key[:12]} of problem {problem.id} was not prepared, compiling now")
+        return self.prepare(problem)
+
+    def prepare(self, problem: Problem) -> Optional[CompiledChecker]:
+        """Biên dịch sẵn checker của bài toán (nếu chưa có); ném CheckerError nếu checker lỗi biên dịch"""
+        key = compute_checker_hash(problem)
+        if not key:
+            return None
+        checker = self._entries.get(key)
+        if checker is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+            with lock:
+                if key in self._errors:
+                    raise CheckerError(self._errors[key])
+                checker = self._entries.get(key)
+                if checker is None:
+                    try:
+                        checker = self._prepare(key, problem.checker_language, problem.checker_code)
+                    except CheckerError as e:
+                        self._errors[key] = str(e)
+                        raise
+        time_limit_ms = problem.checker_time_limit_ms or settings.JUDGE_CHECKER_TIME_LIMIT_MS
+        if checker.time_limit_ms != time_limit_ms:
+            # Giới hạn thời gian không ảnh hưởng tới file đã biên dịch
+            checker = CompiledChecker(key, checker.argv, time_limit_ms)
+        return checker
+
+    def _prepare(self, key: str, language: str, code: str) -> CompiledChecker:
+        if language not in CHECKER_LANGUAGES:
+            raise CheckerError(f"Ngôn ngữ checker không được hỗ trợ: {language}")
+        entry_dir = os.path.join(self.root, key)
+        if language == "cpp":
+            exe_path = os.path.join(entry_dir, "checker")
+            argv = [exe_path]
+        else:
+            exe_path = os.path.join(entry_dir, "checker.py")
+            argv = [PYTHON_INTERPRETER, exe_path]
+
+        if not os.path.exists(exe_path):
+            # Biên dịch trong thư mục tạm rồi đổi tên, để process khác không thấy checker dở dang
+            work_dir = tempfile.mkdtemp(prefix="checker_", dir=self.root)
+            try:
+                self._compile(work_dir, language, code)
+                try:
+                    os.rename(work_dir, entry_dir)
+                except OSError:
+                    # Process khác đã biên dịch xong trước
+                    shutil.rmtree(work_dir, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                raise
+            self.compiles += 1
+            logger.info(f"Compiled {language} checker {key[:12]}")
+
+        checker = CompiledChecker(key, argv, settings.JUDGE_CHECKER_TIME_LIMIT_MS)
+        self._entries[key] = checker
+        return checker
+
+    def _compile(self, work_dir: str, language: str, code: str) -> None:
+        if language == "cpp":
+            source_path = os.path.join(work_dir, "checker.cpp")
+            argv = [CPP_COMPILER_PATH, "-std=c++17", "-O2", "-o", os.path.join(work_dir, "checker"), source_path]
+        else:
+            source_path = os.path.join(work_dir, "checker.py")
+            argv = [PYTHON_INTERPRETER, "-m", "py_compile", source_path]
+        with open(source_path, "w", encoding="utf-8") as f:
+            f.write(code)
+        process = spawn(argv, cwd=work_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = process.communicate(timeout=settings.JUDGE_CHECKER_COMPILE_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise CheckerError("Biên dịch checker quá thời gian")
+        if process.returncode != 0:
+            raise CheckerError((stderr or stdout).decode("utf-8", errors="replace") or "Lỗi biên dịch checker")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "errors": len(self._errors), "compiles": self.compiles}
+
+def warm_checkers(db: Optional[Session] = None) -> int:
+    """Biên dịch sẵn checker của mọi bài toán (khi worker khởi động); trả về số checker đã sẵn sàng"""
+    own_session = db is None
+    db = db or SessionLocal()
+    ready = 0
+    try:
+        problems = db.query(Problem).filter(Problem.checker_code != None).all()
+        cache = get_checker_cache()
+        for problem in problems:
+            try:
+                cache.prepare(problem)
+                ready += 1
+            except CheckerError as e:
+                logger.error(f"Checker of problem {problem.id} does not compile: {str(e)[:200]}")
+    except Exception as e:
+        logger.error(f"Cannot prepare checkers: {str(e)}", exc_info=True)
+    finally:
+        if own_session:
+            db.close()
+    if ready:
+        logger.info(f"Prepared {ready} checkers")
+    return ready
+
+_cache: Optional[CheckerCache] = None
+_cache_guard = threading.Lock()
+
+def get_checker_cache() -> CheckerCache:
+    global _cache
+    with _cache_guard:
+        if _cache is None:
+            _cache = CheckerCache(settings.JUDGE_CHECKER_DIR)
+        return _cache
@@ -0,0 +1,484 @@
+"""
+So sánh output của chương trình với output mong đợi, trên bytes.
+
+Các chế độ so sánh (Problem.compare_mode):
+- exact: giống hệt từng byte
+- lines: so sánh từng dòng sau khi bỏ whitespace cuối dòng, bỏ qua whitespace
+  và dòng trống ở cuối output (mặc định, như trước đây)
+- tokens: so sánh dãy token, mọi dãy whitespace (kể cả xuống dòng) là như nhau
+- float: như tokens nhưng token là số được so sánh với sai số tuyệt đối/tương đối
+  (Problem.float_abs_tolerance, float_rel_tolerance), xem compare_floats
+
+Output được đưa vào từng chunk ngay khi chương trình in ra (StreamingComparator),
+nhờ đó judge có thể dừng chương trình ngay khi phát hiện sai thay vì chờ chạy
+xong rồi mới so sánh; compare() so sánh hai output có sẵn.
+
+Hai phía không bị tách thành danh sách dòng/token. Output của chương trình được
+xét theo từng block (tối đa BLOCK_SIZE, cắt ở cuối dòng hoặc ở whitespace); chừng
+nào output còn giống hệt từng byte với output mong đợi, mỗi block chỉ tốn một
+phép memcmp. Từ chỗ khác nhau đầu tiên, hai phía được chuẩn hóa theo từng block
+bằng các thao tác bytes của C (block không cần chuẩn hóa được dùng nguyên, không
+sao chép) rồi so sánh bằng memcmp với bước tăng dần. Chỉ khi có chỗ sai mới duyệt
+lại block chứa nó để tính vị trí byte và số dòng của chỗ sai đầu tiên.
+
+Chế độ float không so sánh theo luồng: toàn bộ output được đọc thành mảng
+float64 bằng NumPy (parser C, một lần gọi cho cả output) và so sánh vector hóa.
+
+Output mong đợi có thể là bytes hoặc mmap (từ cache dữ liệu test), output của
+chương trình là bytes, bytearray hoặc memoryview.
+"""
+from typing import List, Optional
+import math
+import re
+import warnings
+
+try:
+    import numpy as np
+except ImportError:  # Không có NumPy: chế độ float so sánh từng token bằng Python
+    np = None
+
+COMPARE_MODES = ("exact", "lines", "tokens", "float")
+# Các chế độ so sánh được theo luồng trong lúc chương trình chạy
+STREAMING_MODES = ("exact", "lines", "tokens")
+DEFAULT_COMPARE_MODE = "lines"
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+BLOCK_SIZE = 1 << 20
+
+WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+_LINE_WHITESPACE = (b" ", b"\t", b"\r", b"\x0b", b"\x0c")
+_TO_SPACE = bytes.maketrans(b"\t\n\r\x0b\x0c", b"     ")
+_TRAILING_WHITESPACE = re.compile(rb"[ \t\r\x0b\x0c]+\n")
+_WHITESPACE_RUN = re.compile(rb"[ \t\n\r\x0b\x0c]+")
+_NON_WHITESPACE = re.compile(rb"[^ \t\n\r\x0b\x0c]")
+_TOKEN = re.compile(rb"[^ \t\n\r\x0b\x0c]+")
+
+def rstripped_length(data) -> int:
+    """Độ dài của data sau khi bỏ whitespace ở cuối, không tạo bản sao"""
+    end = len(data)
+    while end > 0 and data[end - 1] in WHITESPACE:
+        end -= 1
+    return end
+
+def normalize_lines(block: bytes) -> bytes:
+    """Bỏ whitespace ở cuối mỗi dòng; trả về chính block nếu không có gì để bỏ"""
+    for _ in range(4):
+        changed = False
+        for whitespace in _LINE_WHITESPACE:
+            pattern = whitespace + b"\n"
+            # Tìm một byte (memchr) nhanh hơn nhiều so với tìm chuỗi hai byte
+            if whitespace in block and pattern in block:
+                block = block.replace(pattern, b"\n")
+                changed = True
+        if not changed:
+            return block
+    # Dòng có rất nhiều whitespace ở cuối
+    return _TRAILING_WHITESPACE.sub(b"\n", block)
+
+def normalize_tokens(block: bytes) -> bytes:
+    """Thay mỗi dãy whitespace bằng một dấu cách"""
+    block = block.translate(_TO_SPACE)
+    for _ in range(6):
+        if b"  " not in block:
+            return block
+        block = block.replace(b"  ", b" ")
+    return _WHITESPACE_RUN.sub(b" ", block)
+
+def _last_whitespace(block) -> int:
+    return max(block.rfind(whitespace) for whitespace in (b" ", b"\n", b"\t", b"\r", b"\x0b", b"\x0c"))
+
+def _block_end(mode: str, raw, final: bool) -> int:
+    """Độ dài phần đầu của raw có thể chuẩn hóa độc lập: cắt ở cuối dòng (lines) hoặc sau whitespace (tokens)"""
+    if mode == "exact" or final:
+        return len(raw)
+    if mode == "lines":
+        return raw.rfind(b"\n") + 1
+    return _last_whitespace(raw) + 1
+
+def _equal(a, a_pos: int, b, b_pos: int, length: int) -> bool:
+    # bytes.startswith với memoryview là memcmp, không sao chép
+    if isinstance(a, (bytes, bytearray)):
+        return a.startswith(memoryview(b)[b_pos:b_pos + length], a_pos)
+    if isinstance(b, (bytes, bytearray)):
+        return b.startswith(memoryview(a)[a_pos:a_pos + length], b_pos)
+    return memoryview(a)[a_pos:a_pos + length] == memoryview(b)[b_pos:b_pos + length]
+
+def common_prefix_length(a, a_pos: int, b, b_pos: int) -> int:
+    """Số byte giống nhau liên tiếp của a từ a_pos và b từ b_pos"""
+    limit = min(len(a) - a_pos, len(b) - b_pos)
+    matched = 0
+    step = 256
+    while matched < limit:
+        size = min(step, limit - matched)
+        if _equal(a, a_pos + matched, b, b_pos + matched, size):
+            matched += size
+            step = min(step * 4, BLOCK_SIZE)
+            continue
+        # Chỗ khác nằm trong đoạn này: tìm nhị phân
+        low, high = 0, size
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _equal(a, a_pos + matched, b, b_pos + matched, middle):
+                low = middle
+            else:
+                high = middle
+        return matched + low
+    return matched
+
+class _Side:
+    """Một phía của phép so sánh: block gốc đang xét và bản chuẩn hóa của nó"""
+
+    def __init__(self):
+        self.raw = b""
+        self.data = b""
+        self.pos = 0
+        self.raw_start = 0
+        self.lines_before = 0
+        # tokens: block trước kết thúc bằng dấu cách (hoặc chưa có block nào)
+        self.after_space = True
+
+    @property
+    def exhausted(self) -> bool:
+        return self.pos >= len(self.data)
+
+    def set_block(self, mode: str, raw, final: bool) -> int:
+        """Chuẩn hóa phần đầu của raw làm block mới; trả về số byte gốc đã dùng"""
+        self.raw_start += len(self.raw)
+        self.lines_before += self.raw.count(b"\n")
+        if isinstance(raw, memoryview):
+            raw = raw.tobytes()
+        cut = _block_end(mode, raw, final)
+        block = raw if cut == len(raw) else raw[:cut]
+        if mode == "exact" or not cut:
+            data = block
+        elif mode == "lines":
+            data = normalize_lines(block)
+        else:
+            data = normalize_tokens(block)
+            if data.startswith(b" ") and self.after_space:
+                data = data[1:]
+            if data:
+                self.after_space = data.endswith(b" ")
+        self.raw, self.data, self.pos = block, data, 0
+        return cut
+
+    def skip(self, raw) -> None:
+        """Bỏ qua raw (đã khớp từng byte với output mong đợi) mà không chuẩn hóa"""
+        self.raw_start += len(self.raw)
+        self.lines_before += self.raw.count(b"\n")
+        self.raw, self.data, self.pos = raw, raw, len(raw)
+        self.after_space = True
+
+    def raw_position(self, mode: str) -> int:
+        """Vị trí trong raw ứng với self.pos trong bản chuẩn hóa"""
+        if mode == "exact" or self.data is self.raw:
+            return self.pos
+        if mode == "lines":
+            line = self.data.count(b"\n", 0, self.pos)
+            line_start = self.data.rfind(b"\n", 0, self.pos) + 1
+            raw_line_start = 0
+            for _ in range(line):
+                raw_line_start = self.raw.find(b"\n", raw_line_start) + 1
+            return raw_line_start + (self.pos - line_start)
+        token = self.data.count(b" ", 0, self.pos)
+        offset = self.pos - (self.data.rfind(b" ", 0, self.pos) + 1)
+        for index, match in enumerate(_TOKEN.finditer(self.raw)):
+            if index == token:
+                return match.start() + min(offset, match.end() - match.start())
+        return len(self.raw)
+
+class Comparison:
+    def __init__(self, matches: bool, position: Optional[int] = None, line: Optional[int] = None,
+                 detail: Optional[str] = None):
+        self.matches = matches
+        # Vị trí byte (từ 0) và dòng (từ 1) của chỗ sai trong output của chương trình:
+        # chỗ sai đầu tiên, hoặc token sai nhiều nhất ở chế độ float
+        self.position = position
+        self.line = line
+        # Mô tả chỗ sai (chế độ float)
+        self.detail = detail
+
+    def __bool__(self) -> bool:
+        return self.matches
+
+    def __repr__(self) -> str:
+        if self.matches:
+            return "Comparison(matches=True)"
+        return f"Comparison(matches=False, position={self.position}, line={self.line})"
+
+class StreamingComparator:
+    def __init__(self, expected, mode: Optional[str] = None):
+        self.mode = mode or DEFAULT_COMPARE_MODE
+        if self.mode not in STREAMING_MODES:
+            raise ValueError(f"Compare mode {self.mode} cannot be streamed")
+        self._expected = expected
+        self._expected_end = len(expected) if self.mode == "exact" else rstripped_length(expected)
+        self._expected_pos = 0
+        self._exp = _Side()
+        self._act = _Side()
+        self._carry = b""
+        self._carry_pos = 0
+        # Toàn bộ output đã nhận giống hệt từng byte với phần đầu output mong đợi
+        self._identical = True
+        self.mismatch_position: Optional[int] = None
+        self.mismatch_line: Optional[int] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.mismatch_position is not None
+
+    def _load_expected(self) -> bool:
+        """Chuẩn hóa block tiếp theo của output mong đợi; False nếu đã hết"""
+        size = BLOCK_SIZE
+        while self._expected_pos < self._expected_end:
+            end = min(self._expected_pos + size, self._expected_end)
+            raw = self._expected[self._expected_pos:end]
+            used = self._exp.set_block(self.mode, raw, final=end == self._expected_end)
+            if used:
+                self._expected_pos += used
+                if not self._exp.exhausted:
+                    return True
+            else:
+                # Một dòng/token dài hơn block: lấy block lớn hơn
+                size *= 2
+        return False
+
+    def _load_actual(self, final: bool) -> bool:
+        """Chuẩn hóa block tiếp theo từ phần output đã nhận; False nếu cần thêm dữ liệu"""
+        while self._carry_pos < len(self._carry):
+            available = len(self._carry) - self._carry_pos
+            if self.mode == "exact" or available <= BLOCK_SIZE:
+                raw = self._carry if self._carry_pos == 0 else memoryview(self._carry)[self._carry_pos:]
+                last = True
+            else:
+                raw = memoryview(self._carry)[self._carry_pos:self._carry_pos + BLOCK_SIZE]
+                last = False
+            if self._identical and self._skip_identical(raw, final and last):
+                continue
+            used = self._act.set_block(self.mode, raw, final=final and last)
+            if not used:
+                if last:
+                    return False
+                # Một dòng/token dài hơn block: chờ đủ dữ liệu rồi chuẩn hóa cả dòng
+                used = self._act.set_block(
+                    self.mode, memoryview(self._carry)[self._carry_pos:], final=final
+                )
+                if not used:
+                    return False
+            self._identical = False
+            self._carry_pos += used
+            if not self._act.exhausted:
+                return True
+        return False
+
+    def _skip_identical(self, raw, final: bool) -> bool:
+        """Bỏ qua phần đầu của raw nếu nó giống hệt output mong đợi ở cùng vị trí"""
+        if isinstance(raw, memoryview):
+            raw = raw.tobytes()
+        cut = _block_end(self.mode, raw, final)
+        if not cut:
+            return False
+        end = self._expected_pos + cut
+        if end <= self._expected_end and _equal(raw, 0, self._expected, self._expected_pos, cut):
+            # Cả hai phía đều dừng ở cuối dòng/sau whitespace nên có thể chuẩn hóa tiếp từ đây
+            if end == self._expected_end or _block_end(self.mode, self._expected[end - 1:end], False):
+                self._act.skip(raw if cut == len(raw) else raw[:cut])
+                self._expected_pos = end
+                self._carry_pos += cut
+                return True
+        self._identical = False
+        return False
+
+    def _mismatch(self) -> None:
+        raw_pos = self._act.raw_position(self.mode)
+        self.mismatch_position = self._act.raw_start + raw_pos
+        self.mismatch_line = self._act.lines_before + self._act.raw.count(b"\n", 0, raw_pos) + 1
+
+    def _advance(self, final: bool) -> None:
+        while not self.failed:
+            if self._act.exhausted and not self._load_actual(final):
+                return
+            if self._exp.exhausted and not self._load_expected():
+                # Hết output mong đợi: phần còn lại chỉ được là whitespace (trừ chế độ exact)
+                if self.mode == "exact":
+                    self._mismatch()
+                    return
+                match = _NON_WHITESPACE.search(self._act.data, self._act.pos)
+                if match:
+                    self._act.pos = match.start()
+                    self._mismatch()
+                    return
+                self._act.pos = len(self._act.data)
+                continue
+            matched = common_prefix_length(self._act.data, self._act.pos, self._exp.data, self._exp.pos)
+            self._act.pos += matched
+            self._exp.pos += matched
+            if not self._act.exhausted and not self._exp.exhausted:
+                self._mismatch()
+
+    def feed(self, chunk) -> bool:
+        """Đưa thêm output vào; trả về False ngay khi phát hiện sai"""
+        if self.failed:
+            return False
+        if self._carry_pos < len(self._carry):
+            # Phần cuối chưa trọn dòng/token của chunk trước được nối với chunk mới
+            carry = bytearray(memoryview(self._carry)[self._carry_pos:])
+            carry += chunk
+            self._carry = carry
+        else:
+            self._carry = chunk
+        self._carry_pos = 0
+        self._advance(final=False)
+        return not self.failed
+
+    def finish(self) -> bool:
+        """Kết thúc output; trả về True nếu toàn bộ output khớp"""
+        if self.failed:
+            return False
+        self._advance(final=True)
+        if self.failed:
+            return False
+        if not self._exp.exhausted or self._load_expected():
+            # Output của chương trình ngắn hơn output mong đợi
+            self._act.pos = len(self._act.data)
+            self._mismatch()
+            return False
+        return True
+
+    def result(self) -> Comparison:
+        return Comparison(not self.failed, self.mismatch_position, self.mismatch_line)
+
+def _parse_floats(data):
+    """Đọc mọi token của data thành mảng float64; None nếu có token không phải số"""
+    if not _NON_WHITESPACE.search(data):
+        # fromstring đọc chuỗi chỉ có whitespace thành [-1.0]
+        return np.empty(0)
+    if not isinstance(data, bytes):
+        data = bytes(data)
+    with warnings.catch_warnings():
+        # NumPy cũ chỉ cảnh báo (và trả về phần đã đọc được) khi gặp token không phải số
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(data, dtype=np.float64, sep=" ")
+        except (ValueError, DeprecationWarning):
+            return None
+
+def _token_position(data, index: int, numeric: bool = False) -> int:
+    """Vị trí byte của token thứ index (từ 0) trong data; len(data) nếu không có token đó"""
+    if numeric:
+        # Mọi token của data đã đọc được thành số: byte <= 0x20 chỉ có thể là whitespace
+        body = np.frombuffer(data, dtype=np.uint8) > 0x20
+        starts = body.copy()
+        starts[1:] &= ~body[:-1]
+        positions = np.flatnonzero(starts)
+        return int(positions[index]) if index < len(positions) else len(data)
+    for token_index, match in enumerate(_TOKEN.finditer(data)):
+        if token_index == index:
+            return match.start()
+    return len(data)
+
+def _float_mismatch(actual, index: int, detail: str, numeric: bool = False) -> Comparison:
+    position = _token_position(actual, index, numeric)
+    return Comparison(False, position, actual.count(b"\n", 0, position) + 1, detail)
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+def _compare_float_arrays(expected_values, actual_values, actual, abs_tolerance: float,
+                          rel_tolerance: float) -> Comparison:
+    expected_count, actual_count = len(expected_values), len(actual_values)
+    count = min(expected_count, actual_count)
+    expected_values = expected_values[:count]
+    actual_values = actual_values[:count]
+    with np.errstate(invalid="ignore", over="ignore"):
+        deviation = np.abs(actual_values - expected_values)
+        allowed = np.maximum(abs_tolerance, rel_tolerance * np.abs(expected_values))
+        ok = (deviation <= allowed) | (actual_values == expected_values)
+        ok |= np.isnan(actual_values) & np.isnan(expected_values)
+    if not ok.all():
+        deviation = np.where(ok, -1.0, np.where(np.isnan(deviation), np.inf, deviation))
+        worst = int(np.argmax(deviation))
+        return _float_mismatch(
+            actual, worst,
+            f"token thứ {worst + 1}: mong đợi {_format_float(expected_values[worst])}, "
+            f"nhận được {_format_float(actual_values[worst])} (sai số {deviation[worst]:.3g})",
+            numeric=True
+        )
+    if expected_count != actual_count:
+        return _float_mismatch(
+            actual, count, f"mong đợi {expected_count} token, nhận được {actual_count} token", numeric=True
+        )
+    return Comparison(True)
+
+def _token_float(token: bytes) -> Optional[float]:
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+def _compare_float_tokens(expected_tokens: List[bytes], actual_tokens: List[bytes], actual,
+                          abs_tolerance: float, rel_tolerance: float) -> Comparison:
+    worst, worst_deviation, detail = None, -1.0, ""
+    for index, (expected_token, actual_token) in enumerate(zip(expected_tokens, actual_tokens)):
+        if expected_token == actual_token:
+            continue
+        expected_value, actual_value = _token_float(expected_token), _token_float(actual_token)
+        if expected_value is None or actual_value is None:
+            deviation = math.inf
+        else:
+            if actual_value == expected_value or (math.isnan(actual_value) and math.isnan(expected_value)):
+                continue
+            deviation = abs(actual_value - expected_value)
+            if deviation <= max(abs_tolerance, rel_tolerance * abs(expected_value)):
+                continue
+            if math.isnan(deviation):
+                deviation = math.inf
+        if deviation > worst_deviation:
+            worst, worst_deviation = index, deviation
+            detail = (
+                f"token thứ {index + 1}: mong đợi {expected_token.decode('utf-8', errors='replace')[:50]}, "
+                f"nhận được {actual_token.decode('utf-8', errors='replace')[:50]}"
+            )
+            if math.isfinite(deviation):
+                detail += f" (sai số {deviation:.3g})"
+    if worst is not None:
+        return _float_mismatch(actual, worst, detail)
+    if len(expected_tokens) != len(actual_tokens):
+        return _float_mismatch(
+            actual, min(len(expected_tokens), len(actual_tokens)),
+            f"mong đợi {len(expected_tokens)} token, nhận được {len(actual_tokens)} token"
+        )
+    return Comparison(True)
+
+def compare_floats(expected, actual, abs_tolerance: Optional[float] = None,
+                   rel_tolerance: Optional[float] = None) -> Comparison:
+    """
+    So sánh hai output theo từng token: token là số được chấp nhận nếu sai số tuyệt đối
+    không quá abs_tolerance hoặc sai số tương đối không quá rel_tolerance, token khác
+    phải giống hệt. Khi sai, kết quả chỉ ra token có sai số lớn nhất.
+    """
+    abs_tolerance = DEFAULT_FLOAT_TOLERANCE if abs_tolerance is None else abs_tolerance
+    rel_tolerance = DEFAULT_FLOAT_TOLERANCE if rel_tolerance is None else rel_tolerance
+    if isinstance(actual, memoryview):
+        actual = actual.tobytes()
+    # Output giống hệt từng byte (thường gặp khi in cùng độ chính xác): không cần đọc số
+    if len(actual) == len(expected) and _equal(actual, 0, expected, 0, len(actual)):
+        return Comparison(True)
+    if np is not None:
+        expected_values = _parse_floats(expected)
+        if expected_values is not None:
+            actual_values = _parse_floats(actual)
+            if actual_values is not None:
+                return _compare_float_arrays(expected_values, actual_values, actual, abs_tolerance, rel_tolerance)
+    # Có token không phải số (hoặc không có NumPy): so sánh từng token
+    return _compare_float_tokens(bytes(expected).split(), bytes(actual).split(), actual, abs_tolerance, rel_tolerance)
+
+def compare(expected, actual, mode: Optional[str] = None, abs_tolerance: Optional[float] = None,
+            rel_tolerance: Optional[float] = None) -> Comparison:
+    """So sánh hai output có sẵn (tolerance chỉ dùng cho chế độ float)"""
+    if mode == "float":
+        return compare_floats(expected, actual, abs_tolerance, rel_tolerance)
+    comparator = StreamingComparator(expected, mode)
+    if comparator.feed(actual):
+        comparator.finish()
+    return comparator.result()
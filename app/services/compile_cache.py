@@ -0,0 +1,207 @@
+"""
+Cache trên đĩa cho file thực thi đã biên dịch.
+
+Mỗi entry được định danh bằng sha256 của (source code, định danh ngôn ngữ,
+lệnh biên dịch dạng template, định danh trình biên dịch: đường dẫn thật, mtime,
+--version). Nâng cấp trình biên dịch cho key mới, nên file thực thi và lỗi biên
+dịch của compiler cũ không bao giờ được dùng lại. Cache có giới hạn dung lượng và loại bỏ các
+entry ít được dùng gần đây nhất (LRU theo mtime). Lỗi biên dịch cũng được
+lưu lại (negative cache) để code lỗi giống hệt trả về CE ngay lập tức.
+
+Nhiều worker (thread hoặc process) có thể dùng chung một thư mục cache:
+entry được ghi ra file tạm rồi os.replace, và việc biên dịch cùng một key
+được tuần tự hóa bằng file lock để chỉ một worker biên dịch.
+"""
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import threading
+import uuid
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có file lock, chỉ dùng lock trong process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def make_key(source: bytes, language_identifier: str, compile_command: str, compiler: str = "") -> str:
+    """
+    Tạo key của cache từ nội dung source, ngôn ngữ, lệnh biên dịch và định danh
+    trình biên dịch (CompilerIdentity.fingerprint)
+    """
+    digest = hashlib.sha256()
+    parts = (source, language_identifier.encode("utf-8"), compile_command.encode("utf-8"), compiler.encode("utf-8"))
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+class CompileCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bin_dir = os.path.join(root, "bin")
+        self.error_dir = os.path.join(root, "ce")
+        self.lock_dir = os.path.join(root, "locks")
+        for path in (self.bin_dir, self.error_dir, self.lock_dir):
+            os.makedirs(path, exist_ok=True)
+        # Lock trong process theo tên, kèm số thread đang dùng (xóa khi không còn ai dùng)
+        self._thread_locks: Dict[str, List[Any]] = {}
+        self._thread_locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _executable_path(self, key: str) -> str:
+        return os.path.join(self.bin_dir, key)
+
+    def _error_path(self, key: str) -> str:
+        return os.path.join(self.error_dir, key + ".txt")
+
+    def _lock_path(self, name: str) -> str:
+        return os.path.join(self.lock_dir, name + ".lock")
+
+    @contextmanager
+    def _file_lock(self, name: str):
+        with self._thread_locks_guard:
+            entry = self._thread_locks.setdefault(name, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if fcntl is None:
+                    yield
+                    return
+                with open(self._lock_path(name), "a") as lock_file:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            with self._thread_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._thread_locks[name]
+
+    @contextmanager
+    def lock(self, key: str):
+        """
+        Khóa theo key để chỉ một worker biên dịch cùng một source tại một thời điểm.
+        Mỗi key có file lock riêng (được xóa khi entry bị evict), nên các source khác
+        nhau không bao giờ chờ nhau.
+        """
+        with self._file_lock(key):
+            yield
+
+    def lookup(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Tìm entry trong cache. Trả về {"executable": path} hoặc {"error": output},
+        None nếu không có.
+        """
+        for kind, path in (("executable", self._executable_path(key)), ("error", self._error_path(key))):
+            try:
+                # Cập nhật mtime để đánh dấu entry vừa được dùng (LRU)
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            self.hits += 1
+            if kind == "executable":
+                return {"executable": path}
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    return {"error": f.read()}
+            except FileNotFoundError:
+                # Entry vừa bị evict bởi worker khác
+                break
+        self.misses += 1
+        return None
+
+    def materialize(self, cached_path: str, exe_path: str) -> bool:
+        """
+        Sao chép file thực thi trong cache ra thư mục chấm bài.
+        Dùng bản sao thay cho hard link để bài nộp không thể sửa entry trong cache.
+        """
+        try:
+            shutil.copyfile(cached_path, exe_path)
+            os.chmod(exe_path, stat.S_IRWXU)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _atomic_write(self, target: str, write) -> None:
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store_executable(self, key: str, exe_path: str) -> None:
+        def write(tmp_path):
+            shutil.copyfile(exe_path, tmp_path)
+            os.chmod(tmp_path, stat.S_IRWXU)
+        self._atomic_write(self._executable_path(key), write)
+        self._evict()
+
+    def store_error(self, key: str, output: str) -> None:
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(output)
+        self._atomic_write(self._error_path(key), write)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Xóa các entry cũ nhất cho đến khi tổng dung lượng nằm trong giới hạn"""
+        with self._file_lock("_evict"):
+            entries = []
+            total = 0
+            for directory in (self.bin_dir, self.error_dir):
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.name.endswith(".tmp"):
+                            continue
+                        try:
+                            info = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((info.st_mtime, info.st_size, entry.path))
+                        total += info.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f"Evicted compile cache entry: {os.path.basename(path)}")
+                except FileNotFoundError:
+                    pass
+                # Lock của key không còn entry: nếu có worker đang giữ nó thì cùng lắm hai
+                # worker biên dịch cùng một source, kết quả vẫn được ghi nguyên tử
+                key = os.path.basename(path).split(".", 1)[0]
+                try:
+                    os.remove(self._lock_path(key))
+                except FileNotFoundError:
+                    pass
+
+_cache: Optional[CompileCache] = None
+_cache_guard = threading.Lock()
+
+def get_compile_cache() -> Optional[CompileCache]:
+    """Trả về cache dùng chung của worker, None nếu cache bị tắt"""
+    global _cache
+    if not settings.COMPILE_CACHE_ENABLED:
+        return None
+    with _cache_guard:
+        if _cache is None:
+            _cache = CompileCache(settings.COMPILE_CACHE_DIR, settings.COMPILE_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
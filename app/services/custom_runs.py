@@ -0,0 +1,91 @@
+"""
+Executor riêng cho các lần chạy thử (POST /submissions/test, /submissions/test/batch).
+
+Chạy thử gồm biên dịch và chạy chương trình, đều là thao tác blocking có thể kéo
+dài nhiều giây. Các endpoint này là async nên nếu gọi thẳng judge.test_code thì
+event loop của uvicorn bị chặn và mọi request khác của worker phải chờ. Thay vào
+đó, chạy thử được giao cho một thread pool có giới hạn: tối đa
+JUDGE_CUSTOM_RUN_WORKERS lần chạy cùng lúc và JUDGE_CUSTOM_RUN_QUEUE lần chạy chờ;
+khi đầy, yêu cầu mới bị từ chối ngay (CustomRunBusy) thay vì dồn ứ vô hạn.
+
+Slot của một lần chạy chỉ được trả khi thread thực sự chạy xong, kể cả khi client
+đã ngắt kết nối, để số tiến trình chạy thử không bao giờ vượt giới hạn.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CustomRunBusy(Exception):
+    """Đã có quá nhiều lần chạy thử đang chạy hoặc đang chờ"""
+
+class CustomRunExecutor:
+    def __init__(self, max_workers: int, max_queued: int):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="custom-run")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Chạy fn(*args, **kwargs) trong thread pool mà không chặn event loop"""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queued:
+                self.rejected += 1
+                raise CustomRunBusy()
+            self._in_flight += 1
+        queued_at = time.monotonic()
+
+        def call():
+            with self._lock:
+                self._running += 1
+            wait_ms = (time.monotonic() - queued_at) * 1000
+            if wait_ms > 1000:
+                logger.info(f"Custom run waited {wait_ms:.0f}ms for a free worker")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        def release(_):
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+
+        try:
+            future = self._executor.submit(call)
+        except Exception:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "waiting": self._in_flight - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+_executor: Optional[CustomRunExecutor] = None
+_executor_guard = threading.Lock()
+
+def get_custom_run_executor() -> CustomRunExecutor:
+    global _executor
+    with _executor_guard:
+        if _executor is None:
+            _executor = CustomRunExecutor(settings.JUDGE_CUSTOM_RUN_WORKERS, settings.JUDGE_CUSTOM_RUN_QUEUE)
+        return _executor
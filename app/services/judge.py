@@ -1,13 +1,13 @@
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
-import random
+from typing import Dict, Any, Optional, List, Tuple
+from sqlalchemy.orm import Session, defer
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import time
 import os
-import tempfile
 import subprocess
-import shutil
 import platform
+import signal
 import sys
+import threading
 from datetime import datetime
 import uuid
 import logging
@@ -18,6 +18,22 @@ from app.models.problems import Problem, TestCase
 from app.models.languages import Language
 from app.models.judge_servers import JudgeServer
 from app.crud import problems as problems_crud
+from app.crud import submissions as submissions_crud
+from app.core.config import settings
+from app.services.compile_cache import get_compile_cache, make_key as make_compile_cache_key
+from app.services.spawn import (
+    render_argv, spawn, wait_for_process, kill_process,
+    CappedPipeReader
+)
+from app.services.comparator import StreamingComparator, compare
+from app.services.test_data_cache import TestData, TestDataMissing, get_test_data_cache, PIPE_INPUT_LIMIT
+from app.services.zygote import get_python_zygote, ZygoteError
+from app.services.verdict_cache import get_verdict_cache, make_key as make_verdict_key
+from app.services.checker import CheckerError, get_checker_cache
+from app.services.workspace_pool import get_workspace_pool
+from app.services.pch import compiler_identity, get_pch_cache
+from app.services.scoring import ScoringPlan
+from app.services.judge_stages import get_compile_stage, get_run_stage
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +41,8 @@ logger = logging.getLogger(__name__)
 # Sử dụng biến môi trường hoặc đường dẫn mặc định
 CPP_COMPILER_PATH = os.environ.get("CPP_COMPILER_PATH", "g++")
 PYTHON_INTERPRETER = "python"
+# Cờ biên dịch C++; precompiled header được build với đúng bộ cờ này
+CPP_COMPILE_FLAGS = ("-std=c++17", "-O2")
 
 def get_language_config(db: Session, language_identifier: str):
     """Lấy cấu hình ngôn ngữ từ database"""
@@ -34,8 +52,8 @@ def get_language_config(db: Session, language_identifier: str):
     return language
 
 def prepare_code_file(code: str, language_config):
-    """Tạo file code tạm thời"""
-    tmp_dir = tempfile.mkdtemp(prefix="judge_")
+    """Lấy một workspace từ pool và ghi file code vào đó (trả lại bằng release_code_file)"""
+    tmp_dir = get_workspace_pool().checkout()
     file_name = f"main.{language_config.file_extension}"
     file_path = os.path.join(tmp_dir, file_name)
     
@@ -51,6 +69,13 @@ def prepare_code_file(code: str, language_config):
         "file_name": file_name
     }
 
+def release_code_file(code_info) -> None:
+    """Dọn workspace của prepare_code_file và trả nó về pool"""
+    try:
+        get_workspace_pool().release(code_info["dir"])
+    except Exception as e:
+        logger.error(f"Error releasing workspace {code_info['dir']}: {str(e)}")
+
 def compile_code(code_info, language_config):
     """Biên dịch code nếu cần"""
     if not language_config.compile_command:
@@ -62,19 +87,97 @@ def compile_code(code_info, language_config):
     if platform.system() == "Windows" and language_config.identifier == 'cpp':
         exe_path += ".exe"
     
-    # Xử lý lệnh biên dịch tùy thuộc vào ngôn ngữ
+    # Xử lý lệnh biên dịch tùy thuộc vào ngôn ngữ (dạng template, chưa thay đường dẫn)
     if language_config.identifier == 'cpp':
         # Sử dụng lệnh biên dịch cụ thể cho C++
-        compile_command = f'"{CPP_COMPILER_PATH}" -std=c++17 -O2 -o "{exe_path}" "{code_info["file_path"]}"'
+        command_template = f'"{CPP_COMPILER_PATH}" {" ".join(CPP_COMPILE_FLAGS)} -o "{{exe_path}}" "{{file_path}}"'
     else:
         # Sử dụng lệnh biên dịch từ database
-        compile_command = language_config.compile_command
-        compile_command = compile_command.replace("{file_path}", code_info["file_path"])
-        compile_command = compile_command.replace("{exe_path}", exe_path)
-        compile_command = compile_command.replace("{dir_path}", code_info["dir"])
+        command_template = language_config.compile_command
+    compile_argv = render_argv(
+        command_template,
+        file_path=code_info["file_path"],
+        exe_path=exe_path,
+        dir_path=code_info["dir"]
+    )
+    
+    source = None
+    if os.path.exists(code_info["file_path"]):
+        with open(code_info["file_path"], "rb") as f:
+            source = f.read()
+    
+    if language_config.identifier == 'cpp' and source is not None:
+        # Dùng precompiled header nếu source include bits/stdc++.h. Chỉ thêm vào lệnh thực
+        # thi, không vào template: file thực thi giống hệt nên dùng chung entry compile cache
+        pch = get_pch_cache()
+        include_dir = pch.include_dir(CPP_COMPILE_FLAGS, source) if pch else None
+        if include_dir:
+            compile_argv = compile_argv[:1] + ["-I", include_dir] + compile_argv[1:]
     
+    cache = get_compile_cache()
+    if not cache or source is None:
+        return _run_compiler(code_info, compile_argv, exe_path)
+    
+    # Key gồm cả định danh trình biên dịch: nâng cấp compiler không dùng lại kết quả cũ
+    identity = compiler_identity(compile_argv[0])
+    cache_key = make_compile_cache_key(
+        source, language_config.identifier, command_template, identity.fingerprint() if identity else ""
+    )
+    
+    # Chỉ một worker biên dịch cùng một source, các worker khác chờ và dùng kết quả trong cache
+    with cache.lock(cache_key):
+        cached = cache.lookup(cache_key)
+        if cached and "error" in cached:
+            logger.info(f"Compile cache hit (compilation error): {cache_key}")
+            return {
+                "success": False,
+                "message": "Lỗi biên dịch",
+                "output": cached["error"]
+            }
+        if cached and cache.materialize(cached["executable"], exe_path):
+            logger.info(f"Compile cache hit: {cache_key}")
+            return {
+                "success": True,
+                "message": "Biên dịch thành công",
+                "executable": exe_path
+            }
+        
+        result = _run_compiler(code_info, compile_argv, exe_path)
+        try:
+            if result["success"]:
+                cache.store_executable(cache_key, exe_path)
+            elif "returncode" in result:
+                # Chỉ lưu lỗi do trình biên dịch báo, không lưu timeout hay lỗi hệ thống
+                cache.store_error(cache_key, result["output"])
+        except Exception as e:
+            logger.error(f"Error storing compile cache entry: {str(e)}")
+        return result
+
+def warm_precompiled_headers() -> None:
+    """Build sẵn precompiled header cho cờ biên dịch C++ của judge (khi worker khởi động)"""
+    pch = get_pch_cache()
+    if pch:
+        pch.warm([CPP_COMPILE_FLAGS])
+
+def precompile(code: str, language_config) -> bool:
+    """
+    Biên dịch sẵn một source vào compile cache mà không chạy test nào, để các lần
+    chấm sau của cùng source (ví dụ khi chấm lại hàng loạt) lấy thẳng từ cache.
+    Trả về False nếu ngôn ngữ không cần biên dịch hoặc cache bị tắt.
+    """
+    if not language_config.compile_command or not get_compile_cache():
+        return False
+    code_info = prepare_code_file(code, language_config)
+    try:
+        compile_code(code_info, language_config)
+        return True
+    finally:
+        release_code_file(code_info)
+
+def _run_compiler(code_info, compile_argv, exe_path):
+    """Chạy lệnh biên dịch và kiểm tra file thực thi được tạo ra"""
     # Log thông tin để debug
-    logger.info(f"Compile command: {compile_command}")
+    logger.info(f"Compile command: {compile_argv}")
     logger.info(f"Working directory: {code_info['dir']}")
     
     try:
@@ -95,19 +198,22 @@ def compile_code(code_info, language_config):
         except Exception as e:
             logger.error(f"Error reading source file: {str(e)}")
         
-        # Thực thi lệnh biên dịch
-        process = subprocess.Popen(
-            compile_command,
-            shell=True,
-            cwd=code_info["dir"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            errors='replace'  # Tránh lỗi Unicode
-        )
-        
-        # Lấy output của quá trình biên dịch
-        stdout, stderr = process.communicate(timeout=20)
+        # Thực thi lệnh biên dịch (không qua shell)
+        # Chỉ JUDGE_COMPILE_WORKERS trình biên dịch chạy cùng lúc, trên các core của giai đoạn compile
+        compile_stage = get_compile_stage()
+        with compile_stage.slot():
+            process = spawn(
+                compile_argv,
+                cwd=code_info["dir"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cpus=compile_stage.cpus
+            )
+            
+            # Lấy output của quá trình biên dịch
+            stdout, stderr = process.communicate(timeout=20)
+        stdout = stdout.decode("utf-8", errors="replace")  # Tránh lỗi Unicode
+        stderr = stderr.decode("utf-8", errors="replace")
         
         # Log output của quá trình biên dịch
         logger.info(f"Compile process return code: {process.returncode}")
@@ -120,7 +226,8 @@ def compile_code(code_info, language_config):
             return {
                 "success": False,
                 "message": "Lỗi biên dịch",
-                "output": stderr or "Unknown compilation error"
+                "output": stderr or "Unknown compilation error",
+                "returncode": process.returncode
             }
         
         # Kiểm tra file thực thi đã được tạo
@@ -140,11 +247,9 @@ def compile_code(code_info, language_config):
         }
         
     except subprocess.TimeoutExpired:
-        # Nếu quá trình biên dịch bị timeout
-        try:
-            process.kill()
-        except:
-            pass
+        # Nếu quá trình biên dịch bị timeout (kill cả nhóm: launcher, trình biên dịch và tiến trình con của nó)
+        kill_process(process)
+        process.communicate()
         
         logger.error("Compilation process timed out")
         return {
@@ -161,40 +266,127 @@ def compile_code(code_info, language_config):
             "output": str(e)
         }
 
-def run_code_with_input(code_info, language_config, input_text, time_limit_ms=1000):
-    """Chạy code với input cụ thể"""
+class CancelToken:
+    """Cho phép hủy một lần chạy test case đang chờ hoặc đang thực thi"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._process = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def bind(self, process) -> None:
+        """Gắn tiến trình đang chạy; kill ngay nếu đã bị hủy trước đó"""
+        with self._lock:
+            self._process = process
+            if self._cancelled:
+                self._kill()
+
+    def unbind(self) -> None:
+        with self._lock:
+            self._process = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            self._kill()
+
+    def _kill(self) -> None:
+        if self._process is not None:
+            kill_process(self._process)
+
+def open_stdin(input_file: Optional[str], input_bytes: Optional[bytes]) -> int:
+    """
+    Trả về file descriptor dùng làm stdin: mở file input, hoặc tạo pipe đã chứa
+    sẵn toàn bộ input (input nhỏ hơn dung lượng pipe nên ghi không bị block).
+    """
+    if input_file is not None:
+        return os.open(input_file, os.O_RDONLY)
+    read_fd, write_fd = os.pipe()
+    try:
+        view = memoryview(input_bytes)
+        while view:
+            written = os.write(write_fd, view)
+            view = view[written:]
+    finally:
+        os.close(write_fd)
+    return read_fd
+
+def run_code_with_input(code_info, language_config, input_text, time_limit_ms=1000, cancel_token=None,
+                        expected_output=None, input_file=None, compare_mode=None):
+    """
+    Chạy code với input cụ thể.
+    
+    Input là input_text (str hoặc bytes) hoặc đường dẫn input_file có sẵn (từ cache
+    dữ liệu test) được mở trực tiếp làm stdin. Input nhỏ được ghi thẳng vào pipe
+    stdin thay vì ghi ra file.
+    
+    Nếu có expected_output, stdout được so sánh theo luồng trong lúc chương trình
+    chạy (theo compare_mode của bài) và chương trình bị dừng ngay ở chỗ sai đầu
+    tiên; kết quả khi đó có thêm trường "output_matches" (và "mismatch_line" nếu sai).
+    """
     # Xác định đường dẫn file thực thi
     exe_path = os.path.join(code_info["dir"], "main")
     if platform.system() == "Windows" and language_config.identifier == 'cpp':
         exe_path += ".exe"
     
+    # Thư mục làm việc của lần chạy (mỗi test case có thể có thư mục riêng)
+    run_dir = code_info.get("run_dir", code_info["dir"])
+    
     # Xử lý lệnh chạy tùy thuộc vào ngôn ngữ
     if language_config.identifier == 'cpp':
-        if platform.system() == "Windows":
-            # Trên Windows, chạy trực tiếp file thực thi
-            run_command = f'"{exe_path}"'
-        else:
-            # Trên Unix, thêm ./ phía trước
-            run_command = f'"./{exe_path}"'
+        # exe_path là đường dẫn tuyệt đối nên chạy trực tiếp trên mọi hệ điều hành
+        run_template = '"{exe_path}"'
     elif language_config.identifier == 'python':
         # Đối với Python, sử dụng trực tiếp interpreter
-        run_command = f'{PYTHON_INTERPRETER} "{code_info["file_path"]}"'
+        run_template = f'{PYTHON_INTERPRETER} "{{file_path}}"'
     else:
         # Sử dụng lệnh chạy từ database
-        run_command = language_config.run_command
-        run_command = run_command.replace("{file_path}", code_info["file_path"])
-        run_command = run_command.replace("{exe_path}", exe_path)
-        run_command = run_command.replace("{dir_path}", code_info["dir"])
+        run_template = language_config.run_command
+    run_argv = render_argv(
+        run_template,
+        file_path=code_info["file_path"],
+        exe_path=exe_path,
+        dir_path=code_info["dir"]
+    )
     
-    # Log thông tin để debug
-    logger.info(f"Run command: {run_command}")
-    logger.info(f"Working directory: {code_info['dir']}")
-    logger.info(f"Input (first 100 chars): {input_text[:100]}...")
+    # Python chạy qua zygote: interpreter đã khởi động sẵn chỉ fork và chạy bytecode của bài
+    zygote = get_python_zygote(PYTHON_INTERPRETER) if language_config.identifier == 'python' else None
+    bytecode_path = None
+    if zygote:
+        try:
+            bytecode_path, syntax_error = zygote.ensure_bytecode(code_info["file_path"])
+        except Exception as e:
+            logger.error(f"Python zygote unavailable, falling back to interpreter: {str(e)}")
+            zygote = None
+        else:
+            if syntax_error:
+                logger.error(f"Python syntax error: {syntax_error}")
+                return {
+                    "success": False,
+                    "status": "runtime_error",
+                    "message": "Lỗi runtime",
+                    "output": syntax_error,
+                    "execution_time_ms": 0,
+                    "memory_used_kb": 0
+                }
     
-    # Ghi input vào file
-    input_file = os.path.join(code_info["dir"], "input.txt")
-    with open(input_file, "w", encoding="utf-8") as f:
-        f.write(input_text)
+    # Log thông tin để debug
+    logger.info(f"Run command: {run_argv}" + (" (via Python zygote)" if zygote else ""))
+    logger.info(f"Working directory: {run_dir}")
+    if input_file is None:
+        input_bytes = input_text.encode("utf-8") if isinstance(input_text, str) else (input_text or b"")
+        logger.info(f"Input (first 100 bytes): {input_bytes[:100]!r}...")
+        if len(input_bytes) > PIPE_INPUT_LIMIT:
+            # Input lớn: ghi vào file rồi dùng làm stdin
+            input_file = os.path.join(run_dir, "input.txt")
+            with open(input_file, "wb") as f:
+                f.write(input_bytes)
+    else:
+        logger.info(f"Input file: {input_file}")
     
     try:
         # Kiểm tra file thực thi tồn tại (chỉ với các ngôn ngữ biên dịch)
@@ -208,43 +400,132 @@ def run_code_with_input(code_info, language_config, input_text, time_limit_ms=10
                 "memory_used_kb": 0
             }
         
-        start_time = time.time()
+        output_limit = settings.JUDGE_OUTPUT_LIMIT_MB * 1024 * 1024
+        comparator = StreamingComparator(expected_output, compare_mode) if expected_output is not None else None
+        captured = bytearray()
+        stream_state = {"size": 0, "output_limit_exceeded": False}
         
-        # Mở file input để đọc
-        with open(input_file, "r", encoding="utf-8") as f:
-            # Thực thi lệnh chạy
-            process = subprocess.Popen(
-                run_command,
-                shell=True,
-                cwd=code_info["dir"],
-                stdin=f,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                errors='replace'  # Tránh lỗi Unicode
-            )
-            
-            # Lấy output với timeout
-            timeout_seconds = max(1, time_limit_ms / 1000 + 0.5)  # Tối thiểu 1 giây
-            stdout, stderr = process.communicate(timeout=timeout_seconds)
+        # Giới hạn dung lượng file chương trình ghi vào workspace; chạy trên các core của
+        # giai đoạn run, tách khỏi trình biên dịch
+        file_size_limit = settings.JUDGE_WORKSPACE_MAX_MB * 1024 * 1024
+        run_cpus = get_run_stage().cpus
+        
+        # Mở stdin (file input hoặc pipe); stdout được đọc theo từng chunk, stderr bị giới hạn kích thước
+        try:
+            stdin_fd = open_stdin(input_file, input_bytes if input_file is None else None)
+        except FileNotFoundError:
+            # Không phải lỗi của bài nộp: nơi gọi lấy lại dữ liệu test và chạy lại
+            raise TestDataMissing(input_file)
+        try:
+            if zygote:
+                try:
+                    # Tiến trình con của zygote tự đặt giới hạn và ghim core ngay sau fork
+                    process = zygote.run(
+                        code_info["file_path"], bytecode_path, run_dir, stdin_fd, time_limit_ms,
+                        file_size_limit=file_size_limit, cpus=run_cpus
+                    )
+                except ZygoteError as e:
+                    logger.error(f"Python zygote unavailable, falling back to interpreter: {str(e)}")
+                    zygote = None
+            if not zygote:
+                # Thực thi trực tiếp file thực thi/interpreter, không qua shell. Giới hạn thời gian
+                # CPU (thời gian thực chỉ dùng làm chốt chặn), dung lượng file ghi vào workspace và
+                # core của giai đoạn run được đặt trước exec
+                process = spawn(
+                    run_argv, cwd=run_dir, stdin=stdin_fd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    cpu_time_limit_ms=time_limit_ms, file_size_limit=file_size_limit, cpus=run_cpus
+                )
+        finally:
+            os.close(stdin_fd)
+        stderr_reader = CappedPipeReader(process.stderr, settings.JUDGE_STDERR_LIMIT_KB * 1024)
+        if cancel_token:
+            cancel_token.bind(process)
         
-        end_time = time.time()
-        execution_time_ms = int((end_time - start_time) * 1000)
+        def read_stdout():
+            fd = process.stdout.fileno()
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                stream_state["size"] += len(chunk)
+                if stream_state["size"] > output_limit:
+                    stream_state["output_limit_exceeded"] = True
+                    kill_process(process)
+                    break
+                if comparator:
+                    if not comparator.feed(chunk):
+                        # Sai ngay từ dòng này, không cần chờ chương trình chạy xong
+                        kill_process(process)
+                        break
+                else:
+                    captured.extend(chunk)
+        
+        wall_timeout = max(1, time_limit_ms / 1000 * settings.JUDGE_WALL_TIME_MULTIPLIER + 0.5)
+        try:
+            usage = wait_for_process(process, wall_timeout, on_running=read_stdout)
+        finally:
+            if cancel_token:
+                cancel_token.unbind()
+            process.stdout.close()
+        
+        # Output giữ nguyên dạng bytes, chỉ decode stderr để hiển thị thông báo lỗi
+        stdout = bytes(captured)
+        stderr = stderr_reader.read().decode("utf-8", errors="replace")
+        
+        execution_time_ms = usage["cpu_time_ms"]
+        memory_used_kb = usage["memory_used_kb"]
         
         # Log output của quá trình chạy
         logger.info(f"Run process return code: {process.returncode}")
-        logger.info(f"Run stdout: {stdout}")
+        logger.info(f"Run stdout (first 100 bytes): {stdout[:100]!r}")
         logger.info(f"Run stderr: {stderr}")
-        logger.info(f"Execution time: {execution_time_ms}ms")
+        logger.info(
+            f"Execution time: {execution_time_ms}ms CPU, {usage['wall_time_ms']}ms wall, "
+            f"peak memory: {memory_used_kb}KB, output: {stream_state['size']} bytes"
+        )
         
-        # Đo bộ nhớ sử dụng (giả lập)
-        memory_used_kb = random.randint(1000, 10000)
+        # Quá thời gian: vượt giới hạn CPU, bị kill bởi RLIMIT_CPU hoặc bởi chốt chặn thời gian thực
+        if usage["timed_out"] or execution_time_ms > time_limit_ms or process.returncode == -signal.SIGXCPU:
+            logger.error(f"Execution timed out after {time_limit_ms}ms")
+            return {
+                "success": False,
+                "status": "time_limit_exceeded",
+                "message": "Quá thời gian thực thi",
+                "output": "Quá trình thực thi bị timeout",
+                "execution_time_ms": max(execution_time_ms, time_limit_ms) if usage["timed_out"] else execution_time_ms,
+                "memory_used_kb": memory_used_kb
+            }
+        
+        if stream_state["output_limit_exceeded"]:
+            logger.error(f"Output limit exceeded: more than {output_limit} bytes")
+            return {
+                "success": False,
+                "status": "output_limit_exceeded",
+                "message": "Vượt quá giới hạn output",
+                "output": f"Output vượt quá {settings.JUDGE_OUTPUT_LIMIT_MB}MB",
+                "execution_time_ms": execution_time_ms,
+                "memory_used_kb": memory_used_kb
+            }
+        
+        # Chương trình bị dừng sớm vì output sai
+        if comparator and comparator.failed:
+            logger.info(f"Output mismatch at line {comparator.mismatch_line}, process stopped early")
+            return {
+                "success": True,
+                "message": "Thực thi thành công",
+                "output": stdout,
+                "output_matches": False,
+                "mismatch_line": comparator.mismatch_line,
+                "execution_time_ms": execution_time_ms,
+                "memory_used_kb": memory_used_kb
+            }
         
         # Kiểm tra kết quả chạy
         if process.returncode != 0:
             logger.error(f"Runtime error with return code {process.returncode}")
             return {
                 "success": False,
+                "status": "runtime_error",
                 "message": "Lỗi runtime",
                 "output": stderr or "Unknown runtime error",
                 "execution_time_ms": execution_time_ms,
@@ -252,29 +533,20 @@ def run_code_with_input(code_info, language_config, input_text, time_limit_ms=10
             }
         
         logger.info(f"Execution successful in {execution_time_ms}ms")
-        return {
+        result = {
             "success": True,
             "message": "Thực thi thành công",
             "output": stdout,
             "execution_time_ms": execution_time_ms,
             "memory_used_kb": memory_used_kb
         }
+        if comparator:
+            result["output_matches"] = comparator.finish()
+            result["mismatch_line"] = comparator.mismatch_line
+        return result
         
-    except subprocess.TimeoutExpired:
-        # Nếu quá trình chạy bị timeout
-        try:
-            process.kill()
-        except:
-            pass
-        
-        logger.error(f"Execution timed out after {time_limit_ms}ms")
-        return {
-            "success": False,
-            "message": "Quá thời gian thực thi",
-            "output": "Quá trình thực thi bị timeout",
-            "execution_time_ms": time_limit_ms,
-            "memory_used_kb": memory_used_kb
-        }
+    except TestDataMissing:
+        raise
     except Exception as e:
         # Xử lý các lỗi khác
         logger.error(f"Exception during execution: {str(e)}", exc_info=True)
@@ -286,37 +558,491 @@ def run_code_with_input(code_info, language_config, input_text, time_limit_ms=10
             "memory_used_kb": 0
         }
 
-def is_output_correct(expected: str, actual: str) -> bool:
-    """Kiểm tra output có đúng không, bỏ qua whitespace ở cuối"""
-    # Chuẩn hóa chuỗi để so sánh
-    expected_lines = expected.rstrip().split("\n")
-    actual_lines = actual.rstrip().split("\n")
+class TestDataLoader:
+    """
+    Lấy dữ liệu của từng test case ngay trước khi chạy test đó: từ cache của worker,
+    hoặc đọc riêng test case đó từ database nếu chưa có trong cache. Không giữ lại
+    dữ liệu nào sau khi trả về, nên bộ nhớ chỉ phụ thuộc vào các test đang chạy chứ
+    không phụ thuộc vào cả bộ test. Dùng được từ nhiều thread (truy cập session
+    được tuần tự hóa).
+    """
+
+    def __init__(self, db: Session):
+        self._db = db
+        self._lock = threading.Lock()
+        self.cached = 0
+        self.loaded = 0
+
+    def _read(self, test_case: TestCase) -> Tuple[str, str]:
+        with self._lock:
+            row = self._db.query(TestCase.input, TestCase.expected_output).filter(
+                TestCase.id == test_case.id
+            ).first()
+            self.loaded += 1
+        if row is None:
+            raise LookupError(f"Test case {test_case.id} no longer exists")
+        return row
     
-    # Kiểm tra số dòng
-    if len(expected_lines) != len(actual_lines):
-        logger.info(f"Output line count mismatch: expected {len(expected_lines)}, got {len(actual_lines)}")
-        return False
+    def load(self, test_case: TestCase) -> TestData:
+        """Dữ liệu của test case; dữ liệu trên đĩa được giữ cho tới khi TestData được close()"""
+        cache = get_test_data_cache()
+        if test_case.content_hash:
+            data = cache.get(test_case.id, test_case.content_hash)
+            if data is not None:
+                with self._lock:
+                    self.cached += 1
+                return data
+        input_text, expected_output = self._read(test_case)
+        if not test_case.content_hash:
+            # Chưa có hash (backfill_content_hashes lỗi): không cache được
+            return TestData(input_bytes=input_text.encode("utf-8"), expected_output=expected_output.encode("utf-8"))
+        return cache.put(test_case.id, test_case.content_hash, input_text, expected_output)
+    
+    def load_from_database(self, test_case: TestCase) -> TestData:
+        """Dữ liệu của test case đọc thẳng từ database vào bộ nhớ, không qua cache"""
+        input_text, expected_output = self._read(test_case)
+        return TestData(input_bytes=input_text.encode("utf-8"), expected_output=expected_output.encode("utf-8"))
+
+def backfill_content_hashes(db: Session, test_cases: List[TestCase]) -> None:
+    """Tính và lưu content_hash cho các test case cũ chưa có hash"""
+    missing = [test_case for test_case in test_cases if not test_case.content_hash]
+    if not missing:
+        return
+    # Đọc từng test case một để không giữ dữ liệu của cả bộ test trong bộ nhớ; test_cases
+    # đã tách khỏi session (xem judge_submission) nên hash được ghi bằng câu lệnh update
+    for test_case in missing:
+        row = db.query(TestCase.input, TestCase.expected_output).filter(TestCase.id == test_case.id).first()
+        if row is not None:
+            test_case.content_hash = problems_crud.compute_test_case_hash(*row)
+            db.query(TestCase).filter(TestCase.id == test_case.id).update(
+                {TestCase.content_hash: test_case.content_hash}, synchronize_session=False
+            )
+    db.commit()
+    logger.info(f"Backfilled content hash of {len(missing)} test cases")
+
+def run_checker(checker, run_dir: str, test_data: TestData, output: bytes) -> Dict[str, str]:
+    """Ghi input/expected/output của test ra file (nếu chưa có) và chạy checker của bài toán"""
+    paths = {}
+    for name, path, content in (
+        ("input", test_data.input_path, test_data.input_bytes),
+        ("expected", test_data.expected_path, test_data.expected_output),
+        ("output", None, output),
+    ):
+        if path is None:
+            path = os.path.join(run_dir, f"checker_{name}.txt")
+            with open(path, "wb") as f:
+                f.write(content or b"")
+        paths[name] = path
+    return checker.check(run_dir, paths["input"], paths["expected"], paths["output"])
+
+def evaluate_test_case(code_info, language_config, problem, test_case, cancel_token=None, test_data=None,
+                       checker=None) -> Dict[str, Any]:
+    """
+    Chạy một test case và trả về kết quả chấm của test đó.
+    test_data là dữ liệu của test (TestDataLoader.load); nếu không có thì dùng input/output của test_case.
+    checker (nếu có) quyết định output đúng hay sai thay cho việc so sánh với expected output.
+    """
+    logger.info(f"Running test case #{test_case.order}")
+    result = {
+        "test_case_id": test_case.id,
+        "test_case_order": test_case.order,
+        "status": "accepted",
+        "execution_time_ms": 0,
+        "memory_used_kb": 0,
+        "message": ""
+    }
+    
+    if cancel_token and cancel_token.cancelled:
+        result["status"] = "cancelled"
+        return result
+    
+    # Xác định giới hạn thời gian
+    time_limit = getattr(test_case, 'time_limit_ms', None) or problem.time_limit_ms
+    
+    if test_data is None:
+        test_data = TestData(
+            input_bytes=test_case.input.encode("utf-8"),
+            expected_output=test_case.expected_output.encode("utf-8")
+        )
     
-    # So sánh từng dòng
-    for i in range(len(expected_lines)):
-        if expected_lines[i].rstrip() != actual_lines[i].rstrip():
-            logger.info(f"Output mismatch at line {i+1}:")
-            logger.info(f"Expected: '{expected_lines[i].rstrip()}'")
-            logger.info(f"Actual: '{actual_lines[i].rstrip()}'")
-            return False
+    # Chạy code với input của test case; khi có checker hoặc so sánh số thực (không so sánh
+    # theo luồng được), cần giữ lại toàn bộ output
+    streaming = not checker and problem.compare_mode != "float"
+    run_result = run_code_with_input(
+        code_info,
+        language_config,
+        test_data.input_bytes,
+        time_limit,
+        cancel_token=cancel_token,
+        expected_output=test_data.expected_output if streaming else None,
+        input_file=test_data.input_path,
+        compare_mode=problem.compare_mode
+    )
+    result["execution_time_ms"] = run_result.get("execution_time_ms", 0)
+    result["memory_used_kb"] = run_result.get("memory_used_kb", 0)
     
-    logger.info("Output matches expected result")
-    return True
+    if cancel_token and cancel_token.cancelled:
+        result["status"] = "cancelled"
+        return result
+    
+    # Xử lý kết quả chạy
+    if not run_result["success"]:
+        # Xác định loại lỗi
+        status = run_result.get("status") or (
+            "time_limit_exceeded" if "thời gian" in run_result.get("message", "").lower() else "runtime_error"
+        )
+        logger.info(f"Test case #{test_case.order} failed: {status}")
+        result["status"] = status
+        result["message"] = f"{run_result.get('message', '')} ở test case #{test_case.order}"
+        return result
+    
+    if checker:
+        verdict = run_checker(checker, code_info.get("run_dir", code_info["dir"]), test_data, run_result["output"])
+        if verdict["status"] != "accepted":
+            logger.info(f"Test case #{test_case.order} failed: {verdict['status']} (checker)")
+            result["status"] = verdict["status"]
+            if verdict["status"] == "wrong_answer":
+                # Thông báo của checker (ví dụ lý do sai) được giữ lại, tối đa 200 ký tự
+                detail = f": {verdict['message'][:200]}" if verdict["message"] else ""
+                result["message"] = f"Kết quả sai ở test case #{test_case.order}{detail}"
+            else:
+                result["message"] = f"{verdict['message']} ở test case #{test_case.order}"
+            return result
+        output_matches = True
+    else:
+        # So sánh output với expected output (đã được so sánh theo luồng khi chạy)
+        output_matches = run_result.get("output_matches")
+        mismatch_line = run_result.get("mismatch_line")
+        mismatch_detail = None
+        if output_matches is None:
+            comparison = compare(
+                test_data.expected_output,
+                run_result["output"],
+                problem.compare_mode,
+                abs_tolerance=problem.float_abs_tolerance,
+                rel_tolerance=problem.float_rel_tolerance
+            )
+            output_matches, mismatch_line, mismatch_detail = comparison.matches, comparison.line, comparison.detail
+    if not output_matches:
+        logger.info(f"Test case #{test_case.order} failed: wrong_answer at line {mismatch_line}")
+        result["status"] = "wrong_answer"
+        result["message"] = f"Kết quả sai ở test case #{test_case.order}"
+        if mismatch_line:
+            result["message"] += f" (dòng {mismatch_line})"
+        if mismatch_detail:
+            result["message"] += f": {mismatch_detail}"
+        return result
+    
+    # Kiểm tra memory limit
+    memory_limit = getattr(test_case, 'memory_limit_kb', None) or problem.memory_limit_kb
+    if run_result["memory_used_kb"] > memory_limit:
+        logger.info(f"Test case #{test_case.order} failed: memory_limit_exceeded")
+        result["status"] = "memory_limit_exceeded"
+        result["message"] = f"Vượt quá giới hạn bộ nhớ ở test case #{test_case.order}"
+        return result
+    
+    logger.info(f"Test case #{test_case.order} passed")
+    return result
+
+def evaluate_loaded_test_case(code_info, language_config, problem, test_case, loader=None, cancel_token=None,
+                              checker=None) -> Dict[str, Any]:
+    """
+    evaluate_test_case với dữ liệu lấy qua loader (nếu có), giữ entry của cache trên đĩa
+    trong lúc chạy. Nếu file dữ liệu vẫn không còn khi chạy, test được chạy lại với dữ
+    liệu đọc từ database thay vì bị tính là lỗi của bài nộp.
+    """
+    if loader is None:
+        return evaluate_test_case(code_info, language_config, problem, test_case, cancel_token=cancel_token, checker=checker)
+    with loader.load(test_case) as test_data:
+        try:
+            return evaluate_test_case(
+                code_info, language_config, problem, test_case, cancel_token=cancel_token,
+                test_data=test_data, checker=checker
+            )
+        except TestDataMissing as e:
+            logger.warning(f"Cached test data {e} is gone, reading test case #{test_case.order} from the database")
+    return evaluate_test_case(
+        code_info, language_config, problem, test_case, cancel_token=cancel_token,
+        test_data=loader.load_from_database(test_case), checker=checker
+    )
 
-def judge_submission(db: Session, submission: Submission) -> Dict[str, Any]:
+def run_test_cases_sequential(code_info, language_config, problem, test_cases, loader=None, checker=None,
+                              plan=None):
     """
-    Chấm điểm một bài nộp thực tế bằng cách chạy code qua từng test case
+    Chạy lần lượt các test case, bỏ qua các test mà plan không còn cần (các test sau
+    test sai trong cùng subtask, hoặc mọi test sau test sai khi không còn điểm để lấy).
+    Dữ liệu của mỗi test được lấy qua loader ngay trước khi chạy và bỏ đi sau đó.
+    Trả về (danh sách kết quả đã chạy, kết quả của test case sai có thứ tự nhỏ nhất hoặc None)
+    """
+    plan = plan or ScoringPlan(test_cases)
+    results, first_failure = [], None
+    for test_case in test_cases:
+        if plan.should_skip(test_case):
+            continue
+        result = evaluate_loaded_test_case(code_info, language_config, problem, test_case, loader=loader, checker=checker)
+        results.append(result)
+        if result["status"] != "accepted":
+            plan.record(test_case.id, test_case.order, result["status"])
+            if first_failure is None or test_case.order < first_failure["test_case_order"]:
+                first_failure = result
+    return results, first_failure
+
+def run_test_cases_parallel(code_info, language_config, problem, test_cases, max_workers, loader=None,
+                            checker=None, plan=None):
+    """
+    Chạy song song tối đa max_workers test case từ cùng một file thực thi,
+    mỗi test case trong một thư mục làm việc riêng.
+    
+    Giữ nguyên ngữ nghĩa của chế độ tuần tự: mỗi khi có test sai, các test mà plan
+    không còn cần bị hủy ngay, và kết quả trả về là kết quả của test case sai có
+    thứ tự nhỏ nhất. Mỗi thread chỉ lấy dữ liệu của test nó đang chạy, nên tối đa
+    max_workers test nằm trong bộ nhớ cùng lúc.
+    """
+    plan = plan or ScoringPlan(test_cases)
+    count = len(test_cases)
+    tokens = [CancelToken() for _ in test_cases]
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    wall_times = [0.0] * count
+    skipped = [False] * count
+    
+    def run_one(index):
+        run_dir = os.path.join(code_info["dir"], f"test_{index}")
+        os.makedirs(run_dir, exist_ok=True)
+        run_info = dict(code_info, run_dir=run_dir)
+        started = time.time()
+        try:
+            if tokens[index].cancelled:
+                # Không đọc dữ liệu của test đã bị hủy
+                return evaluate_test_case(run_info, language_config, problem, test_cases[index], cancel_token=tokens[index])
+            return evaluate_loaded_test_case(
+                run_info, language_config, problem, test_cases[index], loader=loader,
+                cancel_token=tokens[index], checker=checker
+            )
+        finally:
+            wall_times[index] = time.time() - started
+    
+    started_at = time.time()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="judge-test")
+    try:
+        futures = {executor.submit(run_one, index): index for index in range(count)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                if future.cancelled():
+                    continue
+                result = future.result()
+                results[index] = result
+                if result["status"] in ("accepted", "cancelled") or skipped[index]:
+                    continue
+                plan.record(test_cases[index].id, test_cases[index].order, result["status"])
+                # Hủy các test case không còn ảnh hưởng tới kết quả lẫn điểm
+                for other in range(count):
+                    if results[other] is None and not skipped[other] and plan.should_skip(test_cases[other]):
+                        skipped[other] = True
+                        tokens[other].cancel()
+                for other in pending:
+                    if skipped[futures[other]]:
+                        other.cancel()
+            
+            # Kết quả đã chắc chắn khi mọi test case chưa bị hủy đều đã xong
+            if all(results[i] is not None or skipped[i] for i in range(count)):
+                break
+    finally:
+        # Đảm bảo không còn tiến trình nào chạy khi rời khỏi hàm
+        for token in tokens:
+            token.cancel()
+        executor.shutdown(wait=True)
+    
+    elapsed = time.time() - started_at
+    busy = sum(wall_times)
+    speedup = busy / elapsed if elapsed > 0 else 1.0
+    logger.info(
+        f"Parallel judging: {sum(1 for r in results if r is not None)}/{count} test cases "
+        f"with {max_workers} workers in {elapsed * 1000:.0f}ms "
+        f"(sequential estimate {busy * 1000:.0f}ms, speedup x{speedup:.2f})"
+    )
+    
+    # Bỏ cả kết quả của các test xong cùng lúc với một test sai đứng trước nó trong cùng subtask
+    finished = [
+        result for index, result in enumerate(results)
+        if result is not None and not skipped[index] and result["status"] != "cancelled"
+        and not plan.failed_before(test_cases[index])
+    ]
+    failures = [result for result in finished if result["status"] != "accepted"]
+    return finished, min(failures, key=lambda r: r["test_case_order"]) if failures else None
+
+def reusable_test_results(db: Session, submission: Submission, version) -> Dict[str, Dict[str, Any]]:
+    """
+    Kết quả đã lưu của lần chấm trước còn dùng được với phiên bản bộ test mới:
+    test case vẫn còn, cùng nội dung và cùng giới hạn như ở phiên bản đã chấm, với
+    cùng checker và cùng cách so sánh output.
+    """
+    if not submission.test_set_version_id:
+        return {}
+    previous = problems_crud.get_test_set_version(db, id=submission.test_set_version_id)
+    if not previous or previous.checker_hash != version.checker_hash:
+        # Đổi checker: mọi kết quả cũ đều có thể sai
+        return {}
+    if previous.compare_hash != version.compare_hash:
+        # Đổi compare_mode hoặc sai số số thực: output cũ có thể đúng/sai theo cách khác
+        return {}
+    old_entries = {entry["test_case_id"]: entry for entry in previous.manifest}
+    new_entries = {entry["test_case_id"]: entry for entry in version.manifest}
+    fields = ("content_hash", "time_limit_ms", "memory_limit_kb")
+    reused = {}
+    for row in submissions_crud.get_test_results(db, submission_id=submission.id):
+        old, new = old_entries.get(row.test_case_id), new_entries.get(row.test_case_id)
+        if not old or not new or any(old[field] != new[field] for field in fields):
+            continue
+        reused[row.test_case_id] = {
+            "test_case_id": row.test_case_id,
+            "test_case_order": new["order"],
+            "status": row.status,
+            "execution_time_ms": row.execution_time_ms,
+            "memory_used_kb": row.memory_used_kb,
+            "message": row.output_diff or ""
+        }
+    return reused
+
+def run_judging(db: Session, submission: Submission, problem: Problem, language_config, test_cases: List[TestCase],
+                reused: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Biên dịch và chạy bài nộp trên các test case (theo thứ tự của danh sách), trả về
+    kết quả chấm kèm điểm theo subtask (score, max_score, xem services/scoring.py).
+    Kết quả và điểm không phụ thuộc thứ tự của danh sách.
+    reused là kết quả của các test case không đổi từ lần chấm trước (theo test_case_id):
+    các test sai trong reused được ghi nhận trước, rồi chỉ các test case còn lại vẫn
+    ảnh hưởng tới kết quả hoặc điểm mới được chạy.
+    """
+    reused = reused or {}
+    plan = ScoringPlan(test_cases)
+    for test_case in test_cases:
+        previous = reused.get(test_case.id)
+        if previous is not None:
+            plan.record(test_case.id, test_case.order, previous["status"])
+    to_run = [
+        test_case for test_case in test_cases
+        if test_case.id not in reused and not plan.should_skip(test_case)
+    ]
+    if reused:
+        logger.info(f"Delta judging: {len(reused)} reusable test results, running {len(to_run)} test cases")
+    
+    results = []
+    if to_run:
+        results, failed = run_test_cases(db, submission, problem, language_config, to_run, plan=plan)
+        if failed and "test_case_order" not in failed:
+            # Lỗi trước khi chạy test nào (biên dịch, checker)
+            return dict(failed, test_results=[], score=0, max_score=plan.max_score)
+    # Bỏ các kết quả cũ đứng sau một test sai trong cùng subtask (kể cả test vừa chạy)
+    kept = [
+        reused[test_case.id] for test_case in test_cases
+        if test_case.id in reused and not plan.failed_before(test_case)
+    ]
+    results = sorted(kept + results, key=lambda r: r["test_case_order"])
+    failures = [r for r in results if r["status"] != "accepted"]
+    score, max_score = plan.score, plan.max_score
+    
+    if failures:
+        failed = failures[0]
+        logger.info(f"Score: {score}/{max_score}, first failure at test case #{failed['test_case_order']}")
+        return {
+            "status": failed["status"],
+            "execution_time_ms": failed["execution_time_ms"],
+            "memory_used_kb": failed["memory_used_kb"],
+            "message": failed["message"],
+            "score": score,
+            "max_score": max_score,
+            "test_results": results
+        }
+    
+    # Tất cả test case đều đúng
+    logger.info(f"All test cases passed: {len(test_cases)}/{len(test_cases)}")
+    return {
+        "status": "accepted",
+        "execution_time_ms": max(r["execution_time_ms"] for r in results),
+        "memory_used_kb": max(r["memory_used_kb"] for r in results),
+        "message": "Tất cả test case đều đúng",
+        "score": score,
+        "max_score": max_score,
+        "test_results": results
+    }
+
+def run_test_cases(db: Session, submission: Submission, problem: Problem, language_config,
+                   test_cases: List[TestCase], plan: Optional[ScoringPlan] = None):
+    """
+    Biên dịch bài nộp và chạy các test case; trả về (kết quả đã chạy, kết quả sai đầu tiên
+    hoặc None). plan quyết định test nào được bỏ qua sau khi có test sai.
+    Lỗi biên dịch được trả về như một kết quả sai với status compilation_error,
+    checker không dùng được với status judge_error.
+    """
+    try:
+        checker = get_checker_cache().get(problem)
+    except CheckerError as e:
+        logger.error(f"Checker of problem {problem.id} does not compile: {str(e)[:200]}")
+        return [], {
+            "status": "judge_error",
+            "execution_time_ms": 0,
+            "memory_used_kb": 0,
+            "message": "Checker của bài toán bị lỗi biên dịch"
+        }
+    
+    # Chuẩn bị file code
+    code_info = prepare_code_file(submission.code, language_config)
+    
+    try:
+        # Biên dịch code nếu cần
+        if language_config.compile_command:
+            logger.info(f"Compiling code for language: {language_config.name}")
+            compile_result = compile_code(code_info, language_config)
+            
+            if not compile_result["success"]:
+                logger.error(f"Compilation failed: {compile_result['message']}")
+                return [], {
+                    "status": "compilation_error",
+                    "execution_time_ms": 0,
+                    "memory_used_kb": 0,
+                    "message": compile_result.get("output", "Lỗi biên dịch")
+                }
+            logger.info("Compilation successful")
+        
+        # Dữ liệu test được lấy lần lượt khi chạy từng test, không tải trước cả bộ test
+        loader = TestDataLoader(db)
+        
+        # Chờ slot của giai đoạn run (slot compile đã được trả khi biên dịch xong), rồi chạy
+        # các test case (tuần tự hoặc song song tùy cấu hình)
+        parallelism = max(1, settings.JUDGE_PARALLEL_TESTS)
+        with get_run_stage().slot():
+            if parallelism > 1 and len(test_cases) > 1:
+                outcome = run_test_cases_parallel(
+                    code_info, language_config, problem, test_cases, parallelism, loader=loader, checker=checker,
+                    plan=plan
+                )
+            else:
+                outcome = run_test_cases_sequential(
+                    code_info, language_config, problem, test_cases, loader=loader, checker=checker, plan=plan
+                )
+        logger.info(f"Test data: {loader.cached} cached, {loader.loaded} loaded from database")
+        return outcome
+    
+    finally:
+        # Trả workspace về pool
+        release_code_file(code_info)
+
+def judge_submission(db: Session, submission: Submission, use_verdict_cache: bool = True) -> Dict[str, Any]:
+    """
+    Chấm điểm một bài nộp thực tế bằng cách chạy code qua từng test case.
+    Bài nộp trùng code với một bài đã chấm trên cùng bộ test nhận lại kết quả cũ
+    mà không chạy gì (trừ khi use_verdict_cache=False, ví dụ khi chấm lại).
+    Kết quả có test_set_version_id (phiên bản bộ test đã dùng) và test_results
+    (kết quả từng test case đã chạy hoặc lấy lại từ lần chấm trước).
     """
     logger.info(f"Starting judging submission ID: {submission.id}")
     
     try:
-        # Lấy bài toán và các test case
-        problem = problems_crud.get_by_id_with_test_cases(db, id=submission.problem_id)
+        # Lấy bài toán (không kèm test case, dữ liệu test được lấy khi chạy từng test)
+        problem = problems_crud.get_by_id(db, id=submission.problem_id)
         if not problem:
             logger.error(f"Problem not found: {submission.problem_id}")
             return {
@@ -339,135 +1065,51 @@ def judge_submission(db: Session, submission: Submission) -> Dict[str, Any]:
         
         logger.info(f"Judging submission for problem: {problem.title}, language: {language_config.name}")
         
-        # Chuẩn bị file code
-        code_info = prepare_code_file(submission.code, language_config)
+        # Lấy thông tin của các test case (không kèm input/output, dữ liệu lấy qua TestDataLoader).
+        # Tách chúng khỏi session: mỗi lần commit trong lúc chấm sẽ expire các object trong
+        # session, và lần truy cập sau sẽ tải lại cả các cột input/output đã defer.
+        test_cases = db.query(TestCase).options(
+            defer(TestCase.input), defer(TestCase.expected_output)
+        ).filter(
+            TestCase.problem_id == problem.id
+        ).order_by(TestCase.order).all()
+        for test_case in test_cases:
+            db.expunge(test_case)
         
-        try:
-            # Biên dịch code nếu cần
-            if language_config.compile_command:
-                logger.info(f"Compiling code for language: {language_config.name}")
-                compile_result = compile_code(code_info, language_config)
-                
-                if not compile_result["success"]:
-                    logger.error(f"Compilation failed: {compile_result['message']}")
-                    return {
-                        "status": "compilation_error",
-                        "execution_time_ms": 0,
-                        "memory_used_kb": 0,
-                        "message": compile_result.get("output", "Lỗi biên dịch")
-                    }
-                logger.info("Compilation successful")
-            
-            # Lấy các test case
-            test_cases = db.query(TestCase).filter(
-                TestCase.problem_id == problem.id
-            ).order_by(TestCase.order).all()
-            
-            if not test_cases:
-                logger.error(f"No test cases found for problem: {problem.id}")
-                return {
-                    "status": "judge_error",
-                    "execution_time_ms": 0,
-                    "memory_used_kb": 0,
-                    "message": "Không có test case nào cho bài toán này"
-                }
-            
-            logger.info(f"Found {len(test_cases)} test cases")
-            
-            # Chạy từng test case
-            results = []
-            max_execution_time = 0
-            max_memory_used = 0
-            
-            for test_case in test_cases:
-                logger.info(f"Running test case #{test_case.order}")
-                
-                # Xác định giới hạn thời gian
-                time_limit = getattr(test_case, 'time_limit_ms', None) or problem.time_limit_ms
-                
-                # Chạy code với input của test case
-                run_result = run_code_with_input(
-                    code_info,
-                    language_config,
-                    test_case.input,
-                    time_limit
-                )
-                
-                # Xử lý kết quả chạy
-                if not run_result["success"]:
-                    # Xác định loại lỗi
-                    status = "time_limit_exceeded" if "thời gian" in run_result.get("message", "").lower() else "runtime_error"
-                    
-                    # Lưu kết quả test case - bỏ qua nếu không có model SubmissionTestResult
-                    logger.info(f"Test case #{test_case.order} failed: {status}")
-                    
-                    # Trả về kết quả lỗi
-                    return {
-                        "status": status,
-                        "execution_time_ms": run_result.get("execution_time_ms", 0),
-                        "memory_used_kb": run_result.get("memory_used_kb", 0),
-                        "message": f"{run_result.get('message', '')} ở test case #{test_case.order}"
-                    }
-                
-                # So sánh output với expected output
-                if not is_output_correct(test_case.expected_output, run_result["output"]):
-                    # Lưu kết quả test case sai - bỏ qua nếu không có model SubmissionTestResult
-                    logger.info(f"Test case #{test_case.order} failed: wrong_answer")
-                    
-                    # Trả về kết quả wrong answer
-                    return {
-                        "status": "wrong_answer",
-                        "execution_time_ms": run_result["execution_time_ms"],
-                        "memory_used_kb": run_result["memory_used_kb"],
-                        "message": f"Kết quả sai ở test case #{test_case.order}"
-                    }
-                
-                # Kiểm tra memory limit
-                memory_limit = getattr(test_case, 'memory_limit_kb', None) or problem.memory_limit_kb
-                if run_result["memory_used_kb"] > memory_limit:
-                    # Lưu kết quả test case vượt bộ nhớ - bỏ qua nếu không có model SubmissionTestResult
-                    logger.info(f"Test case #{test_case.order} failed: memory_limit_exceeded")
-                    
-                    # Trả về kết quả memory limit exceeded
-                    return {
-                        "status": "memory_limit_exceeded",
-                        "execution_time_ms": run_result["execution_time_ms"],
-                        "memory_used_kb": run_result["memory_used_kb"],
-                        "message": f"Vượt quá giới hạn bộ nhớ ở test case #{test_case.order}"
-                    }
-                
-                # Lưu kết quả test case thành công - bỏ qua nếu không có model SubmissionTestResult
-                logger.info(f"Test case #{test_case.order} passed")
-                
-                # Cập nhật thời gian và bộ nhớ max
-                max_execution_time = max(max_execution_time, run_result["execution_time_ms"])
-                max_memory_used = max(max_memory_used, run_result["memory_used_kb"])
-                
-                # Thêm kết quả vào danh sách
-                results.append({
-                    "test_case_id": test_case.id,
-                    "test_case_order": test_case.order,
-                    "status": "accepted",
-                    "execution_time_ms": run_result["execution_time_ms"],
-                    "memory_used_kb": run_result["memory_used_kb"]
-                })
-            
-            # Tất cả test case đều đúng
-            logger.info(f"All test cases passed: {len(test_cases)}/{len(test_cases)}")
+        if not test_cases:
+            logger.error(f"No test cases found for problem: {problem.id}")
             return {
-                "status": "accepted",
-                "execution_time_ms": max_execution_time,
-                "memory_used_kb": max_memory_used,
-                "message": "Tất cả test case đều đúng"
+                "status": "judge_error",
+                "execution_time_ms": 0,
+                "memory_used_kb": 0,
+                "message": "Không có test case nào cho bài toán này"
             }
         
-        finally:
-            # Dọn dẹp tài nguyên
-            try:
-                logger.info(f"Cleaning up temporary directory: {code_info['dir']}")
-                shutil.rmtree(code_info["dir"])
-            except Exception as e:
-                logger.error(f"Error cleaning up temp directory: {str(e)}")
+        logger.info(f"Found {len(test_cases)} test cases")
+        
+        # Ghim bài nộp vào phiên bản bộ test hiện tại (tạo phiên bản mới nếu bộ test đã đổi)
+        backfill_content_hashes(db, test_cases)
+        version = problems_crud.get_or_create_test_set_version(db, problem=problem, test_cases=test_cases)
+        
+        # Tra cache kết quả chấm trước khi biên dịch; khi chấm lại chỉ ghi đè kết quả mới vào cache
+        verdict_cache = get_verdict_cache()
+        verdict_key = None
+        if verdict_cache and version:
+            verdict_key = make_verdict_key(submission.code, language_config, version.fingerprint)
+            cached = verdict_cache.get(verdict_key) if use_verdict_cache else None
+            if cached:
+                logger.info(f"Verdict cache hit for submission {submission.id}: {cached['status']}")
+                return cached
+        
+        # Khi chấm lại, chỉ chạy các test case đã thêm hoặc đã sửa so với phiên bản đã chấm
+        reused = reusable_test_results(db, submission, version) if version else {}
+        
+        started = time.time()
+        result = run_judging(db, submission, problem, language_config, test_cases, reused=reused)
+        result["test_set_version_id"] = version.id if version else None
+        if verdict_key:
+            verdict_cache.put(verdict_key, result, int((time.time() - started) * 1000))
+        return result
     
     except Exception as e:
         logger.error(f"Error in judge_submission: {str(e)}", exc_info=True)
@@ -478,56 +1120,53 @@ def judge_submission(db: Session, submission: Submission) -> Dict[str, Any]:
             "message": f"Lỗi hệ thống: {str(e)}"
         }
 
-async def test_code(
-    user_id: str,
-    problem_id: str,
+def test_code(
     code: str,
-    language_id: str,
+    language: Language,
     input: str,
-    db: Session
+    time_limit_ms: int,
+    memory_limit_kb: int
 ) -> Dict[str, Any]:
     """
-    Test code với input tùy chỉnh.
+    Test code với input tùy chỉnh, với giới hạn thời gian và bộ nhớ của bài toán.
+    Hàm blocking (biên dịch và chạy code): endpoint gọi qua executor chạy thử
+    (services/custom_runs.py), không gọi trực tiếp trên event loop. language đã được
+    tách khỏi session của request; hàm này không dùng database.
     """
     try:
-        # Lấy thông tin ngôn ngữ
-        language = db.query(Language).filter(Language.id == language_id).first()
-        if not language:
-            return {
-                "error": "Ngôn ngữ không tồn tại",
-                "error_type": "configuration_error"
-            }
-        
         # Chuẩn bị code file
         code_info = prepare_code_file(code, language)
-        
-        # Biên dịch code nếu cần
-        if language.compile_command:
-            compile_result = compile_code(code_info, language)
-            if not compile_result["success"]:
-                return {
-                    "error": compile_result["message"],
-                    "error_type": "compilation_error"
-                }
-        
-        # Chạy code với input
-        run_result = run_code_with_input(code_info, language, input)
-        
-        # Dọn dẹp thư mục tạm
         try:
-            shutil.rmtree(code_info["dir"])
-        except:
-            pass
+            # Biên dịch code nếu cần
+            if language.compile_command:
+                compile_result = compile_code(code_info, language)
+                if not compile_result["success"]:
+                    return {
+                        "error": compile_result["message"],
+                        "error_type": "compilation_error"
+                    }
+            
+            # Chạy code với input
+            run_result = run_code_with_input(code_info, language, input, time_limit_ms)
+        finally:
+            # Trả workspace về pool (kể cả khi lỗi biên dịch)
+            release_code_file(code_info)
+        
+        if run_result["success"] and run_result["memory_used_kb"] > memory_limit_kb:
+            return {
+                "error": "Vượt quá giới hạn bộ nhớ",
+                "error_type": "memory_limit_exceeded"
+            }
         
         # Nếu chạy thành công, trả về output
         if run_result["success"]:
             return {
-                "output": run_result["output"]
+                "output": run_result["output"].decode("utf-8", errors="replace")
             }
         # Nếu có lỗi, trả về thông báo lỗi
         else:
             # Xác định loại lỗi
-            error_type = "runtime_error"
+            error_type = run_result.get("status", "runtime_error")
             if "thời gian" in run_result.get("message", "").lower():
                 error_type = "time_limit_exceeded"
             elif "bộ nhớ" in run_result.get("message", "").lower():
@@ -550,4 +1189,102 @@ async def test_code(
         return {
             "error": error_message,
             "error_type": error_type
-        }
\ No newline at end of file
+        }
+def custom_run_result(run_result: Dict[str, Any], memory_limit_kb: int) -> Dict[str, Any]:
+    """Kết quả của một lần chạy thử: output, trạng thái, thời gian và bộ nhớ"""
+    result = {
+        "output": "",
+        "status": "success",
+        "message": None,
+        "execution_time_ms": run_result.get("execution_time_ms", 0),
+        "memory_used_kb": run_result.get("memory_used_kb", 0)
+    }
+    if run_result["success"]:
+        result["output"] = run_result["output"].decode("utf-8", errors="replace")
+        if result["memory_used_kb"] > memory_limit_kb:
+            result["status"] = "memory_limit_exceeded"
+            result["message"] = "Vượt quá giới hạn bộ nhớ"
+        return result
+    result["status"] = run_result.get("status") or (
+        "time_limit_exceeded" if "thời gian" in run_result.get("message", "").lower() else "runtime_error"
+    )
+    result["message"] = run_result.get("message")
+    if result["status"] == "runtime_error" and run_result.get("output"):
+        # stderr của chương trình giúp người dùng tìm lỗi
+        result["message"] = f"{result['message']}\n{str(run_result['output'])[:1000]}"
+    return result
+
+def test_code_batch(
+    problem: Problem,
+    language: Language,
+    code: str,
+    inputs: List[str],
+    sample_tests: Optional[List[TestCase]] = None
+) -> Dict[str, Any]:
+    """
+    Chạy thử code với nhiều input: biên dịch một lần rồi chạy song song các input
+    (tối đa JUDGE_CUSTOM_RUN_PARALLEL cùng lúc), mỗi input trong một thư mục làm
+    việc riêng. Test mẫu (sample_tests) được chạy trước các input tùy chỉnh và
+    output của chúng được chấm như khi nộp bài (so sánh output hoặc checker).
+    Hàm blocking như test_code, được gọi qua executor chạy thử.
+    """
+    runs = [(test_case.input, test_case) for test_case in sample_tests or []]
+    runs += [(input_text, None) for input_text in inputs]
+    code_info = prepare_code_file(code, language)
+    try:
+        if language.compile_command:
+            compile_result = compile_code(code_info, language)
+            if not compile_result["success"]:
+                return {
+                    "status": "compilation_error",
+                    "message": compile_result.get("output") or compile_result["message"],
+                    "results": []
+                }
+        
+        checker = None
+        if sample_tests:
+            try:
+                checker = get_checker_cache().get(problem)
+            except CheckerError as e:
+                logger.error(f"Checker of problem {problem.id} does not compile: {str(e)[:200]}")
+        
+        def run_one(index):
+            input_text, test_case = runs[index]
+            run_dir = os.path.join(code_info["dir"], f"run_{index}")
+            os.makedirs(run_dir, exist_ok=True)
+            time_limit = (test_case and test_case.time_limit_ms) or problem.time_limit_ms
+            memory_limit = (test_case and test_case.memory_limit_kb) or problem.memory_limit_kb
+            run_result = run_code_with_input(dict(code_info, run_dir=run_dir), language, input_text, time_limit)
+            result = custom_run_result(run_result, memory_limit)
+            result["index"] = index
+            if test_case is None:
+                return result
+            
+            result["test_case_id"] = test_case.id
+            result["expected_output"] = test_case.expected_output
+            if result["status"] != "success":
+                result["passed"] = False
+            elif checker:
+                test_data = TestData(
+                    input_bytes=input_text.encode("utf-8"),
+                    expected_output=test_case.expected_output.encode("utf-8")
+                )
+                result["passed"] = run_checker(checker, run_dir, test_data, run_result["output"])["status"] == "accepted"
+            elif not problem.checker_code:
+                result["passed"] = compare(
+                    test_case.expected_output.encode("utf-8"),
+                    run_result["output"],
+                    problem.compare_mode,
+                    abs_tolerance=problem.float_abs_tolerance,
+                    rel_tolerance=problem.float_rel_tolerance
+                ).matches
+            return result
+        
+        started_at = time.time()
+        workers = max(1, min(settings.JUDGE_CUSTOM_RUN_PARALLEL, len(runs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="custom-run") as executor:
+            results = list(executor.map(run_one, range(len(runs))))
+        logger.info(f"Custom run: {len(runs)} inputs with {workers} workers in {(time.time() - started_at) * 1000:.0f}ms")
+        return {"status": "success", "message": None, "results": results}
+    finally:
+        release_code_file(code_info)
@@ -0,0 +1,271 @@
+"""
+Chấm phân tán qua các judge node đã đăng ký trong bảng judge_servers.
+
+Khi JUDGE_DISTRIBUTED bật, tiến trình API không tự chấm: JudgeDispatcher chọn
+node còn sống có tải thấp nhất (current_workers / max_workers) và gửi id bài nộp
+cho node đó (xem judge_node.py). Node dùng chung database với API, tự chấm và
+ghi kết quả như hàng đợi chấm cục bộ.
+
+Mọi request giữa API và node đều được ký bằng HMAC-SHA256 với secret_key riêng
+của node, chữ ký gồm thời điểm gửi, đường dẫn và nội dung request.
+
+Bài nộp được gửi từ thread nền của dispatcher, không phải từ request tạo bài nộp:
+enqueue chỉ ghi nhận bài nộp và đánh thức thread này.
+
+Node không gửi heartbeat quá JUDGE_NODE_TIMEOUT_SECONDS, hoặc không nhận được
+JUDGE_NODE_MAX_FAILURES request liên tiếp, bị loại khỏi vòng chấm; các bài nộp đã
+gửi cho nó mà còn pending được chuyển sang node khác.
+"""
+from typing import Any, Dict, Mapping, Optional
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import judge_servers as judge_servers_crud
+from app.database import SessionLocal
+from app.models.submissions import Submission
+
+logger = logging.getLogger(__name__)
+
+SERVER_HEADER = "X-Judge-Server"
+TIMESTAMP_HEADER = "X-Judge-Timestamp"
+SIGNATURE_HEADER = "X-Judge-Signature"
+
+class JudgeNodeError(Exception):
+    """Không gửi được request tới judge node (hoặc tới API từ judge node)"""
+
+def compute_signature(secret: str, timestamp: str, path: str, body: bytes) -> str:
+    message = timestamp.encode("utf-8") + b"\n" + path.encode("utf-8") + b"\n" + body
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def sign_request(server_id: str, secret: str, path: str, body: bytes) -> Dict[str, str]:
+    """Tạo các header xác thực cho một request"""
+    timestamp = str(int(time.time()))
+    return {
+        SERVER_HEADER: server_id,
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: compute_signature(secret, timestamp, path, body)
+    }
+
+def verify_request(secret: str, path: str, body: bytes, headers: Mapping[str, str]) -> bool:
+    """Kiểm tra chữ ký và thời điểm gửi của request"""
+    timestamp = headers.get(TIMESTAMP_HEADER)
+    signature = headers.get(SIGNATURE_HEADER)
+    if not timestamp or not signature:
+        return False
+    try:
+        skew = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    if skew > settings.JUDGE_NODE_SIGNATURE_TTL_SECONDS:
+        return False
+    return hmac.compare_digest(compute_signature(secret, timestamp, path, body), signature)
+
+def post_signed(base_url: str, path: str, server_id: str, secret: str, payload: Dict[str, Any],
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Gửi request POST JSON đã ký, trả về JSON của response"""
+    body = json.dumps(payload).encode("utf-8")
+    url = base_url.rstrip("/") + path
+    headers = {"Content-Type": "application/json"}
+    headers.update(sign_request(server_id, secret, urllib.parse.urlsplit(url).path, body))
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout or settings.JUDGE_NODE_REQUEST_TIMEOUT_SECONDS) as response:
+            data = response.read()
+    except (urllib.error.URLError, OSError) as e:
+        raise JudgeNodeError(f"POST {url} failed: {e}")
+    return json.loads(data) if data else {}
+
+def node_url(server) -> str:
+    return f"http://{server.hostname}:{server.port}"
+
+def load_ratio(server) -> float:
+    return (server.current_workers or 0) / max(1, server.max_workers or 1)
+
+class JudgeDispatcher:
+    """
+    Thay cho JudgeQueue ở tiến trình API khi chấm phân tán (cùng giao diện
+    start/enqueue/recover_pending/size/shutdown).
+    """
+
+    def __init__(self):
+        # Bài nộp đã gửi đi -> id của node đang chấm nó
+        self._assigned: Dict[str, str] = {}
+        # Bài nộp chưa gửi (mới nhận hoặc chưa có node nào nhận), theo thứ tự nhận
+        self._waiting: Dict[str, None] = {}
+        # Lớp ưu tiên do người gọi chỉ định (ví dụ rejudge), node dùng để lập lịch
+        self._job_classes: Dict[str, str] = {}
+        # Số request liên tiếp không gửi được tới mỗi node
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Đánh thức thread nền khi có bài nộp mới cần gửi
+        self._wakeup = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._monitor is None:
+                self._stop.clear()
+                self._monitor = threading.Thread(target=self._monitor_loop, name="judge-dispatch", daemon=True)
+                self._monitor.start()
+                logger.info("Distributed judging enabled, dispatching submissions to judge nodes")
+
+    def enqueue(self, submission_id: str, job_class: Optional[str] = None) -> bool:
+        """
+        Đưa bài nộp vào danh sách chờ gửi cho node có tải thấp nhất (thread nền gửi đi,
+        không chờ request tới node); trả về False nếu bài nộp đã được nhận trước đó
+        """
+        self.start()
+        with self._lock:
+            if submission_id in self._assigned or submission_id in self._waiting:
+                return False
+            self._waiting[submission_id] = None
+            if job_class:
+                self._job_classes[submission_id] = job_class
+        self._wakeup.set()
+        return True
+
+    def _dispatch(self, db: Session, submission_id: str) -> bool:
+        servers = judge_servers_crud.get_live(db, timeout_seconds=settings.JUDGE_NODE_TIMEOUT_SECONDS)
+        with self._lock:
+            payload = {"submission_id": submission_id, "job_class": self._job_classes.get(submission_id)}
+        for server in sorted(servers, key=lambda s: (load_ratio(s), s.current_workers or 0)):
+            try:
+                post_signed(node_url(server), "/judge", server.id, server.secret_key, payload)
+            except JudgeNodeError as e:
+                self._record_failure(db, server, e)
+                continue
+            self._failures.pop(server.id, None)
+            judge_servers_crud.add_load(db, id=server.id)
+            with self._lock:
+                self._waiting.pop(submission_id, None)
+                self._assigned[submission_id] = server.id
+            logger.info(
+                f"Dispatched submission {submission_id} to judge node {server.name} "
+                f"({server.current_workers}/{server.max_workers} busy)"
+            )
+            return True
+        logger.warning(f"No live judge node for submission {submission_id}, will retry")
+        return False
+
+    def _record_failure(self, db: Session, server, error: JudgeNodeError) -> None:
+        """
+        Một lần lỗi (timeout, node đang khởi động lại...) chưa đủ để loại node: chỉ loại
+        sau JUDGE_NODE_MAX_FAILURES lần lỗi liên tiếp, còn lại để heartbeat quyết định
+        """
+        failures = self._failures.get(server.id, 0) + 1
+        if failures < settings.JUDGE_NODE_MAX_FAILURES:
+            self._failures[server.id] = failures
+            logger.warning(f"Judge node {server.name} unreachable ({failures} consecutive failures): {str(error)}")
+            return
+        self._failures.pop(server.id, None)
+        logger.error(f"Judge node {server.name} unreachable, taking it out of rotation: {str(error)}")
+        judge_servers_crud.mark_inactive(db, id=server.id)
+
+    def _dispatch_waiting(self, db: Session) -> None:
+        """Gửi các bài nộp đang chờ theo thứ tự nhận, dừng khi không còn node nào nhận"""
+        with self._lock:
+            waiting = list(self._waiting)
+        for submission_id in waiting:
+            if not self._dispatch(db, submission_id):
+                break
+
+    def _monitor_loop(self) -> None:
+        """
+        Thread nền: gửi bài nộp mới ngay khi được đánh thức, và mỗi
+        JUDGE_NODE_HEARTBEAT_SECONDS kiểm tra các node và các bài đã gửi
+        """
+        next_check = time.monotonic() + settings.JUDGE_NODE_HEARTBEAT_SECONDS
+        while not self._stop.is_set():
+            self._wakeup.wait(max(0.0, next_check - time.monotonic()))
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            db = SessionLocal()
+            try:
+                if time.monotonic() >= next_check:
+                    next_check = time.monotonic() + settings.JUDGE_NODE_HEARTBEAT_SECONDS
+                    self._check(db)
+                else:
+                    self._dispatch_waiting(db)
+            except Exception as e:
+                logger.error(f"Judge dispatcher check failed: {str(e)}", exc_info=True)
+                db.rollback()
+            finally:
+                db.close()
+
+    def _check(self, db: Session) -> None:
+        """Loại node chết, bỏ các bài đã chấm xong và gửi lại các bài bị treo"""
+        dead = set(judge_servers_crud.expire_dead(db, timeout_seconds=settings.JUDGE_NODE_TIMEOUT_SECONDS))
+        if dead:
+            logger.warning(f"Judge nodes stopped sending heartbeats: {', '.join(sorted(dead))}")
+        with self._lock:
+            tracked = list(self._assigned) + list(self._waiting)
+        if not tracked:
+            return
+        pending = {
+            submission_id for (submission_id,) in db.query(Submission.id).filter(
+                Submission.id.in_(tracked), Submission.status == "pending"
+            ).all()
+        }
+        live = {
+            server.id for server in judge_servers_crud.get_live(db, timeout_seconds=settings.JUDGE_NODE_TIMEOUT_SECONDS)
+        }
+        with self._lock:
+            for submission_id, server_id in list(self._assigned.items()):
+                if submission_id not in pending:
+                    del self._assigned[submission_id]
+                elif server_id not in live:
+                    # Node chấm bài này đã chết: gửi lại cho node khác
+                    del self._assigned[submission_id]
+                    self._waiting[submission_id] = None
+            for submission_id in list(self._waiting):
+                if submission_id not in pending:
+                    del self._waiting[submission_id]
+            for submission_id in list(self._job_classes):
+                if submission_id not in pending:
+                    del self._job_classes[submission_id]
+        self._dispatch_waiting(db)
+
+    def recover_pending(self) -> int:
+        """Gửi lại các bài nộp còn pending (ví dụ khi API khởi động lại giữa chừng)"""
+        db = SessionLocal()
+        try:
+            rows = db.query(Submission.id).filter(
+                Submission.status == "pending"
+            ).order_by(Submission.submitted_at).all()
+        finally:
+            db.close()
+        count = sum(1 for (submission_id,) in rows if self.enqueue(submission_id))
+        if count:
+            logger.info(f"Re-dispatched {count} pending submissions")
+        return count
+
+    @property
+    def size(self) -> int:
+        """Số bài nộp đang chờ gửi hoặc đang được các node chấm"""
+        with self._lock:
+            return len(self._assigned) + len(self._waiting)
+
+    def stats(self) -> Dict[str, Any]:
+        """Thứ tự chấm do từng node lập lịch (xem /health của node); ở đây chỉ có số bài đang theo dõi"""
+        with self._lock:
+            return {"policy": "distributed", "assigned": len(self._assigned), "waiting": len(self._waiting)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            monitor, self._monitor = self._monitor, None
+        self._stop.set()
+        self._wakeup.set()
+        if monitor is not None and wait:
+            monitor.join()
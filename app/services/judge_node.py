@@ -0,0 +1,132 @@
+"""
+Judge node: tiến trình chấm bài chạy tách khỏi API (xem judge_cluster.py).
+
+Node được tạo trước bằng POST /judge-servers/ (admin) để lấy id và secret_key.
+Khi khởi động, node gửi địa chỉ và số worker của nó lên API (register), sau đó
+gửi heartbeat định kỳ kèm số bài đang chờ hoặc đang chấm. API gửi id bài nộp
+tới POST /judge của node; node đưa bài vào hàng đợi chấm cục bộ (JudgeQueue)
+và ghi kết quả thẳng vào database dùng chung.
+
+Chạy nhiều node trên cùng một máy bằng các port khác nhau:
+    python -m app.services.judge_node --server-id <id> --secret <secret> --port 9001 \\
+        --api-url http://localhost:8000/api/v1
+"""
+from typing import Optional
+import argparse
+import logging
+import socket
+import threading
+
+from fastapi import FastAPI, HTTPException, Request
+import uvicorn
+
+from app.core.config import settings
+from app.services.judge_cluster import JudgeNodeError, post_signed, verify_request
+from app.services.judge_queue import JudgeQueue
+
+logger = logging.getLogger(__name__)
+
+class JudgeNode:
+    def __init__(self, server_id: str, secret: str, api_url: str, hostname: str, port: int, max_workers: int):
+        self.server_id = server_id
+        self.secret = secret
+        self.api_url = api_url
+        self.hostname = hostname
+        self.port = port
+        self.max_workers = max(1, max_workers)
+        self.queue = JudgeQueue(self.max_workers)
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._registered = False
+
+    def _post(self, path: str, payload) -> None:
+        post_signed(self.api_url, f"/judge-servers/{self.server_id}{path}", self.server_id, self.secret, payload)
+
+    def register(self) -> None:
+        self._post("/register", {"hostname": self.hostname, "port": self.port, "max_workers": self.max_workers})
+        self._registered = True
+        logger.info(f"Registered judge node {self.server_id} at {self.hostname}:{self.port} ({self.max_workers} workers)")
+
+    def send_heartbeat(self) -> None:
+        self._post("/heartbeat", {"current_workers": self.queue.size})
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                # Đăng ký lại nếu lần trước API chưa sẵn sàng
+                if not self._registered:
+                    self.register()
+                else:
+                    self.send_heartbeat()
+            except JudgeNodeError as e:
+                logger.error(f"Cannot reach API: {str(e)}")
+            if self._stop.wait(settings.JUDGE_NODE_HEARTBEAT_SECONDS):
+                break
+
+    def start(self) -> None:
+        self.queue.start()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="judge-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.queue.shutdown(wait=False)
+
+def create_app(node: JudgeNode) -> FastAPI:
+    app = FastAPI(title=f"Judge node {node.server_id}")
+
+    @app.on_event("startup")
+    def start_node():
+        node.start()
+
+    @app.on_event("shutdown")
+    def stop_node():
+        node.stop()
+
+    @app.post("/judge")
+    async def judge(request: Request):
+        body = await request.body()
+        if not verify_request(node.secret, request.url.path, body, request.headers):
+            raise HTTPException(status_code=401, detail="Invalid signature")
+        payload = await request.json()
+        submission_id = payload.get("submission_id")
+        if not submission_id:
+            raise HTTPException(status_code=400, detail="Missing submission_id")
+        queued = node.queue.enqueue(submission_id, payload.get("job_class"))
+        return {"queued": queued, "current_workers": node.queue.size, "max_workers": node.max_workers}
+
+    @app.get("/health")
+    def health():
+        return {
+            "server_id": node.server_id,
+            "current_workers": node.queue.size,
+            "max_workers": node.max_workers,
+            "queue": node.queue.stats()
+        }
+
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a judge node")
+    parser.add_argument("--server-id", required=True)
+    parser.add_argument("--secret", required=True)
+    parser.add_argument("--api-url", default=f"http://localhost:8000{settings.API_V1_STR}")
+    parser.add_argument("--host", default="0.0.0.0", help="Địa chỉ lắng nghe")
+    parser.add_argument("--hostname", default=None, help="Địa chỉ API dùng để gọi tới node (mặc định: tên máy)")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--workers", type=int, default=settings.JUDGE_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    node = JudgeNode(
+        server_id=args.server_id,
+        secret=args.secret,
+        api_url=args.api_url,
+        hostname=args.hostname or socket.gethostname(),
+        port=args.port,
+        max_workers=args.workers
+    )
+    uvicorn.run(create_app(node), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
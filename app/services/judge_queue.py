@@ -0,0 +1,299 @@
+"""
+Hàng đợi chấm bài chạy nền.
+
+POST /submissions/ chỉ lưu bài nộp với trạng thái pending rồi đưa id của nó vào
+hàng đợi và trả về ngay. Một nhóm worker có số lượng giới hạn (JUDGE_WORKERS)
+lấy bài nộp ra chấm, mỗi lần chấm dùng một session database riêng, sau đó cập
+nhật kết quả, thời gian chạy và điểm cuộc thi.
+
+Thứ tự chấm do JudgeScheduler quyết định (xem judge_scheduler.py): mỗi worker
+rảnh lấy bài có ưu tiên cao nhất tại thời điểm đó thay vì theo thứ tự nộp.
+Trong mỗi worker, việc biên dịch và chạy test còn bị giới hạn riêng theo giai
+đoạn (xem judge_stages.py).
+
+Mỗi tiến trình API (worker uvicorn) có hàng đợi riêng, nên một bài nộp có thể
+được nhiều tiến trình đưa vào hàng đợi (ví dụ recover_pending lúc khởi động).
+Trước khi chấm, worker nhận bài bằng một câu UPDATE có điều kiện
+(crud.submissions.claim_pending); tiến trình không nhận được thì bỏ qua bài đó.
+"""
+from typing import Any, Dict, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import threading
+
+from sqlalchemy import or_
+
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.problems import Problem, TestCase
+from app.models.submissions import Submission
+from app.services import judge
+from app.services.checker import get_checker_cache, warm_checkers
+from app.services.custom_runs import get_custom_run_executor
+from app.services.judge_cluster import JudgeDispatcher
+from app.services.judge_scheduler import JudgeJob, JudgeScheduler
+from app.services.judge_stages import get_compile_stage, get_run_stage
+from app.services.verdict_cache import get_verdict_cache
+from app.services.workspace_pool import get_workspace_pool
+from app.services.pch import get_pch_cache
+
+logger = logging.getLogger(__name__)
+
+def update_contest_score(db: Session, submission: Submission) -> None:
+    """
+    Tính lại điểm cuộc thi của người nộp. Tính lại toàn bộ thay vì cộng thêm để
+    kết quả đúng cả khi bài nộp được chấm lại và đổi kết quả.
+    """
+    if not submission.contest_id:
+        return
+    crud.contests.recalculate_score(db, contest_id=submission.contest_id, user_id=submission.user_id)
+
+def process_submission(db: Session, submission_id: str, use_verdict_cache: bool = True) -> Optional[Submission]:
+    """Chấm một bài nộp đang chờ và lưu kết quả chấm"""
+    submission = crud.submissions.get_by_id(db, id=submission_id)
+    if not submission:
+        logger.warning(f"Submission {submission_id} no longer exists, skipping")
+        return None
+    if submission.status != "pending":
+        logger.info(f"Submission {submission_id} already judged ({submission.status}), skipping")
+        return submission
+    if not crud.submissions.claim_pending(
+        db, submission_id=submission_id, stale_seconds=settings.JUDGE_CLAIM_STALE_SECONDS
+    ):
+        logger.info(f"Submission {submission_id} is being judged by another worker, skipping")
+        return submission
+
+    try:
+        judge_result = judge.judge_submission(db, submission, use_verdict_cache=use_verdict_cache)
+
+        # Cập nhật kết quả chấm
+        update_data = schemas.SubmissionUpdate(
+            status=judge_result["status"],
+            execution_time_ms=judge_result["execution_time_ms"],
+            memory_used_kb=judge_result["memory_used_kb"],
+            test_set_version_id=judge_result.get("test_set_version_id"),
+            score=judge_result.get("score"),
+            max_score=judge_result.get("max_score"),
+            judge_claimed_at=None
+        )
+        submission = crud.submissions.update(db, db_obj=submission, obj_in=update_data)
+        crud.submissions.replace_test_results(
+            db, submission_id=submission.id, results=judge_result.get("test_results") or []
+        )
+
+        # Nếu là bài nộp cuộc thi, cập nhật điểm (kể cả điểm một phần theo subtask)
+        update_contest_score(db, submission)
+    except Exception:
+        logger.exception(f"Lỗi khi chấm bài nộp {submission_id}")
+        db.rollback()
+        # rollback làm hết hạn các thuộc tính của submission; crud.submissions.update chỉ
+        # cập nhật các trường đã được tải nên phải tải lại trước
+        db.refresh(submission)
+
+        # Lỗi của hệ thống chấm, không phải của bài nộp: lưu judge_error (có thể chấm lại)
+        # để bài nộp không bị treo ở pending
+        update_data = schemas.SubmissionUpdate(
+            status="judge_error",
+            execution_time_ms=0,
+            memory_used_kb=0,
+            judge_claimed_at=None
+        )
+        submission = crud.submissions.update(db, db_obj=submission, obj_in=update_data)
+
+    logger.info(f"Submission {submission_id} judged: {submission.status}")
+    return submission
+
+def estimate_cost(db: Session, problem_id: str) -> int:
+    """Chi phí ước tính của một lần chấm: số test case x time_limit_ms của bài toán"""
+    time_limit_ms = db.query(Problem.time_limit_ms).filter(Problem.id == problem_id).scalar() or 0
+    test_count = db.query(TestCase.id).filter(TestCase.problem_id == problem_id).count()
+    return test_count * time_limit_ms
+
+def describe_job(db: Session, submission_id: str, job_class: Optional[str] = None,
+                 with_cost: bool = False) -> JudgeJob:
+    """
+    Tạo JudgeJob cho bài nộp: bài trong cuộc thi thuộc lớp contest, còn lại là
+    practice, trừ khi người gọi chỉ định lớp (ví dụ rejudge)
+    """
+    row = db.query(Submission.user_id, Submission.contest_id, Submission.problem_id).filter(
+        Submission.id == submission_id
+    ).first()
+    if not row:
+        return JudgeJob(submission_id, job_class=job_class or "practice")
+    user_id, contest_id, problem_id = row
+    return JudgeJob(
+        submission_id,
+        user_id=user_id,
+        job_class=job_class or ("contest" if contest_id else "practice"),
+        cost=estimate_cost(db, problem_id) if with_cost else 0
+    )
+
+class JudgeQueue:
+    def __init__(self, max_workers: int, policy: Optional[str] = None):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler = JudgeScheduler(
+            policy or settings.JUDGE_SCHEDULING_POLICY, stats_window=settings.JUDGE_QUEUE_STATS_WINDOW
+        )
+        self._queued: Set[str] = set()
+        # Các bài nộp đang được chấm trong tiến trình này
+        self._running: Set[str] = set()
+        self._recheck: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="judge-worker"
+                )
+                logger.info(f"Judge queue started with {self.max_workers} workers")
+                # Tạo sẵn workspace và thu hồi workspace của các worker đã crash
+                get_workspace_pool()
+                # Biên dịch sẵn checker của các bài toán, ngoài đường chấm bài
+                threading.Thread(target=warm_checkers, name="checker-warmup", daemon=True).start()
+                # Build sẵn precompiled header cho C++ và đo thời gian biên dịch có/không có nó
+                threading.Thread(target=judge.warm_precompiled_headers, name="pch-warmup", daemon=True).start()
+
+    def enqueue(self, submission_id: str, job_class: Optional[str] = None) -> bool:
+        """
+        Đưa bài nộp vào hàng đợi; trả về False nếu nó đã có trong hàng đợi.
+        job_class ghi đè lớp ưu tiên suy ra từ bài nộp (contest/practice).
+        """
+        self.start()
+        with self._lock:
+            if submission_id in self._queued:
+                return False
+            self._queued.add(submission_id)
+        db = SessionLocal()
+        try:
+            job = describe_job(db, submission_id, job_class, with_cost=self._scheduler.policy == "sjf")
+        except Exception as e:
+            logger.error(f"Cannot describe submission {submission_id}, queuing as {job_class or 'practice'}: {str(e)}")
+            job = JudgeJob(submission_id, job_class=job_class or "practice")
+        finally:
+            db.close()
+        self._scheduler.push(job)
+        with self._lock:
+            # Mỗi task lấy bài ưu tiên nhất lúc nó bắt đầu chạy, không nhất thiết là bài vừa thêm
+            self._executor.submit(self._run_next)
+        logger.info(f"Queued submission {submission_id} as {job.job_class} ({len(self._queued)} waiting or running)")
+        return True
+
+    def _run_next(self) -> None:
+        job = self._scheduler.pop()
+        if job is None:
+            return
+        with self._lock:
+            self._running.add(job.key)
+        db = SessionLocal()
+        try:
+            # Chấm lại luôn chạy thật, không dùng kết quả đã cache
+            process_submission(db, job.key, use_verdict_cache=job.job_class != "rejudge")
+        except Exception as e:
+            logger.error(f"Judge worker failed on submission {job.key}: {str(e)}", exc_info=True)
+        finally:
+            db.close()
+            with self._lock:
+                self._running.discard(job.key)
+                self._queued.discard(job.key)
+
+    def recover_pending(self) -> int:
+        """
+        Đưa lại vào hàng đợi các bài nộp còn pending (ví dụ khi server khởi động lại giữa chừng)
+        mà chưa worker nào nhận chấm hoặc worker đã nhận bị dừng quá JUDGE_CLAIM_STALE_SECONDS.
+        Nếu còn bài đang được nhận, kiểm tra lại sau chừng ấy giây: worker nhận nó có thể đã
+        crash ngay trước lần khởi động này.
+        """
+        stale = datetime.utcnow() - timedelta(seconds=settings.JUDGE_CLAIM_STALE_SECONDS)
+        db = SessionLocal()
+        try:
+            rows = db.query(Submission.id).filter(
+                Submission.status == "pending",
+                or_(Submission.judge_claimed_at == None, Submission.judge_claimed_at < stale)
+            ).order_by(Submission.submitted_at).all()
+            claimed = db.query(Submission.id).filter(
+                Submission.status == "pending", Submission.judge_claimed_at >= stale
+            ).count()
+        finally:
+            db.close()
+        count = sum(1 for (submission_id,) in rows if self.enqueue(submission_id))
+        if count:
+            logger.info(f"Re-queued {count} pending submissions")
+        if claimed:
+            with self._lock:
+                if self._executor is not None:
+                    self._recheck = threading.Timer(settings.JUDGE_CLAIM_STALE_SECONDS, self.recover_pending)
+                    self._recheck.daemon = True
+                    self._recheck.start()
+        return count
+
+    @property
+    def size(self) -> int:
+        """Số bài nộp đang chờ hoặc đang được chấm"""
+        with self._lock:
+            return len(self._queued)
+
+    def stats(self) -> Dict[str, Any]:
+        """Số bài đang chờ/đang chấm và phân vị thời gian chờ theo lớp ưu tiên"""
+        with self._lock:
+            running = len(self._running)
+        verdict_cache = get_verdict_cache()
+        pch = get_pch_cache()
+        return {
+            "policy": self._scheduler.policy,
+            "workers": self.max_workers,
+            "running": running,
+            "waiting": len(self._scheduler),
+            "classes": self._scheduler.stats(),
+            "stages": {"compile": get_compile_stage().stats(), "run": get_run_stage().stats()},
+            "verdict_cache": verdict_cache.stats() if verdict_cache else None,
+            "checkers": get_checker_cache().stats(),
+            "custom_runs": get_custom_run_executor().stats(),
+            "workspaces": get_workspace_pool().stats(),
+            "pch": pch.stats() if pch else None
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Dừng nhận bài; bài nộp chưa chấm xong vẫn ở pending, được bỏ nhận và được chấm
+        lại lần sau
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            recheck, self._recheck = self._recheck, None
+        if recheck is not None:
+            recheck.cancel()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        with self._lock:
+            running = list(self._running)
+        if running:
+            db = SessionLocal()
+            try:
+                crud.submissions.release_claims(db, submission_ids=running)
+            except Exception as e:
+                logger.error(f"Cannot release claimed submissions: {str(e)}")
+            finally:
+                db.close()
+
+_queue: Optional[JudgeQueue] = None
+_queue_guard = threading.Lock()
+
+def get_judge_queue():
+    """
+    Trả về hàng đợi chấm bài dùng chung của tiến trình API: JudgeQueue chấm ngay
+    trong tiến trình, hoặc JudgeDispatcher gửi bài cho các judge node khi chấm phân tán
+    """
+    global _queue
+    with _queue_guard:
+        if _queue is None:
+            if settings.JUDGE_DISTRIBUTED:
+                _queue = JudgeDispatcher()
+            else:
+                _queue = JudgeQueue(settings.JUDGE_WORKERS)
+        return _queue
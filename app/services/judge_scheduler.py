@@ -0,0 +1,121 @@
+"""
+Chính sách lập lịch cho hàng đợi chấm bài.
+
+Mỗi bài chờ chấm thuộc một lớp ưu tiên: bài nộp trong cuộc thi, bài luyện tập
+và chấm lại hàng loạt (rejudge). Lớp có ưu tiên cao hơn luôn được chấm trước;
+trong một lớp, các người dùng được phục vụ xoay vòng để một người nộp dồn dập
+không chặn những người khác.
+
+Chạy thử (custom run) không đi qua hàng đợi này: client chờ kết quả ngay trong
+request nên nó có executor giới hạn riêng (xem custom_runs.py), không phải xếp
+sau các bài nộp đang chờ chấm.
+
+Các chính sách (JUDGE_SCHEDULING_POLICY):
+- fifo: thứ tự nộp, như trước đây (không phân lớp)
+- fair: phân lớp + xoay vòng theo người dùng
+- sjf: như fair, nhưng trong một lớp chọn bài có chi phí ước tính nhỏ nhất
+  (số test x time_limit_ms của bài toán) trong các bài đứng đầu của mỗi người
+
+Thời gian chờ (từ lúc vào hàng đợi đến lúc bắt đầu chấm) được ghi lại theo lớp
+để xem phân vị p50/p90/p99.
+"""
+from typing import Deque, Dict, List, Optional
+from collections import OrderedDict, deque
+import threading
+import time
+
+JOB_CLASSES = ("contest", "practice", "rejudge")
+SCHEDULING_POLICIES = ("fifo", "fair", "sjf")
+
+class JudgeJob:
+    def __init__(self, key: str, user_id: Optional[str] = None, job_class: str = "practice", cost: int = 0):
+        self.key = key
+        self.user_id = user_id or ""
+        self.job_class = job_class if job_class in JOB_CLASSES else "practice"
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class JudgeScheduler:
+    """Hàng đợi ưu tiên an toàn với thread; pop() trả về bài cần chấm tiếp theo theo chính sách"""
+
+    def __init__(self, policy: str = "fair", stats_window: int = 1000):
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._fifo: Deque[JudgeJob] = deque()
+        # Lớp -> (người dùng -> các bài của người đó theo thứ tự nộp); thứ tự của dict là vòng xoay
+        self._classes: Dict[str, "OrderedDict[str, Deque[JudgeJob]]"] = {
+            job_class: OrderedDict() for job_class in JOB_CLASSES
+        }
+        self._waits: Dict[str, Deque[float]] = {
+            job_class: deque(maxlen=stats_window) for job_class in JOB_CLASSES
+        }
+        self._counts: Dict[str, int] = {job_class: 0 for job_class in JOB_CLASSES}
+
+    def push(self, job: JudgeJob) -> None:
+        with self._lock:
+            self._counts[job.job_class] += 1
+            if self.policy == "fifo":
+                self._fifo.append(job)
+                return
+            users = self._classes[job.job_class]
+            if job.user_id not in users:
+                # Người dùng mới vào cuối vòng xoay
+                users[job.user_id] = deque()
+            users[job.user_id].append(job)
+
+    def pop(self) -> Optional[JudgeJob]:
+        with self._lock:
+            job = self._pop_fifo() if self.policy == "fifo" else self._pop_fair()
+            if job is not None:
+                self._counts[job.job_class] -= 1
+                self._waits[job.job_class].append(time.monotonic() - job.enqueued_at)
+            return job
+
+    def _pop_fifo(self) -> Optional[JudgeJob]:
+        return self._fifo.popleft() if self._fifo else None
+
+    def _pop_fair(self) -> Optional[JudgeJob]:
+        for job_class in JOB_CLASSES:
+            users = self._classes[job_class]
+            if not users:
+                continue
+            if self.policy == "sjf":
+                # Bài rẻ nhất trong các bài đứng đầu; hòa thì theo vòng xoay
+                user_id = min(users, key=lambda u: users[u][0].cost)
+            else:
+                user_id = next(iter(users))
+            jobs = users.pop(user_id)
+            job = jobs.popleft()
+            if jobs:
+                # Người dùng còn bài: xuống cuối vòng xoay
+                users[user_id] = jobs
+            return job
+        return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Số bài đang chờ và phân vị thời gian chờ (ms) của mỗi lớp"""
+        with self._lock:
+            waits = {job_class: sorted(values) for job_class, values in self._waits.items()}
+            counts = dict(self._counts)
+        return {
+            job_class: {
+                "waiting": counts[job_class],
+                "samples": len(values),
+                "wait_p50_ms": round(percentile(values, 0.5) * 1000, 1),
+                "wait_p90_ms": round(percentile(values, 0.9) * 1000, 1),
+                "wait_p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            }
+            for job_class, values in waits.items()
+        }
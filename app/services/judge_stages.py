@@ -0,0 +1,125 @@
+"""
+Hai giai đoạn của việc chấm bài: biên dịch (compile) và chạy test (run).
+
+Biên dịch (g++) tốn nhiều CPU và bộ nhớ, còn chạy test cần thời gian đo ổn định.
+Mỗi giai đoạn có giới hạn đồng thời riêng: một bài nộp giữ một slot compile
+trong lúc trình biên dịch chạy, trả slot đó rồi mang file thực thi sang chờ slot
+run. Vì worker của hàng đợi chấm (JUDGE_WORKERS) nhiều hơn số slot run, bài nộp
+N+1 được biên dịch trong khi các test của bài N đang chạy, nhưng số trình biên
+dịch chạy cùng lúc không bao giờ vượt JUDGE_COMPILE_WORKERS.
+
+Tiến trình của mỗi giai đoạn có thể được ghim vào các core riêng
+(JUDGE_COMPILE_CPUS, JUDGE_RUN_CPUS, ví dụ "0-1" và "2-7") để một loạt bài biên
+dịch cùng lúc không làm lệch thời gian đo của các test đang chạy.
+
+stats() của mỗi giai đoạn cho biết số bài đang chờ (độ sâu hàng đợi), đang chạy,
+thời gian chờ và hiệu suất sử dụng slot trong STATS_WINDOW_SECONDS giây gần nhất.
+"""
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+from collections import deque
+from contextlib import contextmanager
+import itertools
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.services.judge_scheduler import percentile
+
+logger = logging.getLogger(__name__)
+
+STATS_WINDOW_SECONDS = 60
+
+def parse_cpu_list(value: str) -> Optional[Set[int]]:
+    """Đọc danh sách core dạng "0-3,6"; None nếu rỗng (không ghim core)"""
+    cpus = set()
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus or None
+
+class JudgeStage:
+    def __init__(self, name: str, slots: int, cpus: Optional[Set[int]] = None):
+        self.name = name
+        self.slots = max(1, slots)
+        self.cpus = cpus
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self.completed = 0
+        # (thời điểm bắt đầu, thời điểm kết thúc, thời gian chờ) của các lần dùng slot gần đây
+        self._recent: Deque[Tuple[float, float, float]] = deque()
+        self._active: Dict[int, float] = {}
+        self._tokens = itertools.count()
+
+    @contextmanager
+    def slot(self):
+        """Giữ một slot của giai đoạn trong suốt khối with (chờ nếu đã hết slot)"""
+        queued_at = time.monotonic()
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._running >= self.slots:
+                    self._condition.wait()
+            finally:
+                self._waiting -= 1
+            self._running += 1
+            started = time.monotonic()
+            token = next(self._tokens)
+            self._active[token] = started
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            with self._condition:
+                self._running -= 1
+                self.completed += 1
+                del self._active[token]
+                self._recent.append((started, ended, started - queued_at))
+                self._trim(ended)
+                self._condition.notify()
+
+    def _trim(self, now: float) -> None:
+        while self._recent and self._recent[0][1] < now - STATS_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        window_start = now - STATS_WINDOW_SECONDS
+        with self._condition:
+            self._trim(now)
+            busy = sum(end - max(start, window_start) for start, end, _ in self._recent)
+            busy += sum(now - max(start, window_start) for start in self._active.values())
+            waits = sorted(wait for _, _, wait in self._recent)
+            return {
+                "slots": self.slots,
+                "cpus": sorted(self.cpus) if self.cpus else None,
+                "running": self._running,
+                "waiting": self._waiting,
+                "completed": self.completed,
+                "utilization": round(busy / (self.slots * STATS_WINDOW_SECONDS), 3),
+                "wait_p50_ms": round(percentile(waits, 0.5) * 1000, 1),
+                "wait_p90_ms": round(percentile(waits, 0.9) * 1000, 1)
+            }
+
+_stages: Dict[str, JudgeStage] = {}
+_stages_guard = threading.Lock()
+
+def _get_stage(name: str, slots: int, cpus: str) -> JudgeStage:
+    with _stages_guard:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = JudgeStage(name, slots, parse_cpu_list(cpus))
+        return stage
+
+def get_compile_stage() -> JudgeStage:
+    return _get_stage("compile", settings.JUDGE_COMPILE_WORKERS, settings.JUDGE_COMPILE_CPUS)
+
+def get_run_stage() -> JudgeStage:
+    return _get_stage("run", settings.JUDGE_RUN_WORKERS, settings.JUDGE_RUN_CPUS)
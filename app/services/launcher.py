@@ -0,0 +1,282 @@
+"""
+Launcher đặt giới hạn tài nguyên cho chương trình trước exec (chỉ trên Linux/Unix).
+
+Giới hạn không được đặt bằng preexec_fn của subprocess: preexec_fn chạy Python
+trong tiến trình con vừa fork từ một worker nhiều thread (pool chạy test song
+song, các worker chấm, executor chạy thử), nên có thể deadlock, và nó buộc
+subprocess bỏ đường fork nhanh (vfork/posix_spawn). Thay vào đó spawn chạy
+
+    launcher <cpu_seconds> <file_size> <cpus> <report_fd> <chương trình> [tham số...]
+
+launcher là một tiến trình nhỏ chỉ có một thread: nó fork, tiến trình con đặt
+RLIMIT_CPU, RLIMIT_FSIZE, ghim core (cpus là danh sách core cách nhau bởi dấu
+phẩy, "-" nếu không ghim) rồi exec chương trình, còn launcher chờ chương trình
+kết thúc và thoát với cùng trạng thái (cùng exit code hoặc cùng signal).
+
+Qua report_fd launcher gửi một dòng "started" khi exec thành công (hoặc
+"error <errno>" nếu exec thất bại, để spawn báo lỗi như Popen: FileNotFoundError...),
+rồi "exit <status> <utime_us> <stime_us> <maxrss_kb>" là rusage của chính chương
+trình khi nó kết thúc. Không dùng được rusage của tiến trình fork trực tiếp từ
+worker: sau fork/exec, Linux giữ RSS cao nhất của tiến trình cha trong ru_maxrss
+của tiến trình con, nên một chương trình nhỏ chạy từ worker đang dùng 300MB
+cũng bị tính hơn 300MB. Chương trình fork từ launcher chỉ mang theo vài trăm KB.
+
+Chương trình chạy trong nhóm tiến trình riêng. Để dừng nó (quá thời gian, output
+sai...) judge gửi SIGTERM cho launcher, launcher kill cả nhóm của chương trình
+bằng SIGKILL rồi vẫn thu hồi nó và gửi rusage như bình thường.
+
+Launcher được viết bằng C (LAUNCHER_SOURCE) và biên dịch một lần vào
+JUDGE_LAUNCHER_DIR; nếu máy không có trình biên dịch C thì dùng bản Python
+launcher_fallback.py với cùng giao thức.
+"""
+from typing import List, Optional
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launcher_fallback.py")
+C_COMPILERS = (os.environ.get("CC", "cc"), "gcc", "clang")
+BUILD_TIMEOUT_SECONDS = 60
+
+LAUNCHER_SOURCE = r"""
+#define _GNU_SOURCE
+#include <errno.h>
+#include <fcntl.h>
+#include <sched.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+
+static volatile sig_atomic_t child = 0;
+
+static void on_term(int sig) {
+    (void)sig;
+    if (child > 0) {
+        kill(-child, SIGKILL);
+        kill(child, SIGKILL);
+    }
+}
+
+static void set_limit(int resource, rlim_t soft, rlim_t hard) {
+    struct rlimit current, limit;
+    limit.rlim_cur = soft;
+    limit.rlim_max = hard;
+    /* Giới hạn cứng của worker thấp hơn: không vượt quá nó */
+    if (getrlimit(resource, &current) == 0 && current.rlim_max != RLIM_INFINITY && limit.rlim_max > current.rlim_max) {
+        limit.rlim_max = current.rlim_max;
+        if (limit.rlim_cur > limit.rlim_max)
+            limit.rlim_cur = limit.rlim_max;
+    }
+    setrlimit(resource, &limit);
+}
+
+static void set_cpus(const char *list) {
+    cpu_set_t set;
+    char *end;
+    CPU_ZERO(&set);
+    while (*list) {
+        long cpu = strtol(list, &end, 10);
+        if (end == list)
+            return;
+        if (cpu >= 0 && cpu < CPU_SETSIZE)
+            CPU_SET(cpu, &set);
+        if (*end != ',')
+            break;
+        list = end + 1;
+    }
+    if (CPU_COUNT(&set) > 0)
+        sched_setaffinity(0, sizeof set, &set);
+}
+
+static void report(int fd, const char *line) {
+    size_t left = strlen(line);
+    while (left > 0) {
+        ssize_t written = write(fd, line, left);
+        if (written < 0) {
+            if (errno == EINTR)
+                continue;
+            return;
+        }
+        line += written;
+        left -= (size_t)written;
+    }
+}
+
+static int exit_like(int status) {
+    if (WIFSIGNALED(status)) {
+        int sig = WTERMSIG(status);
+        struct rlimit no_core = {0, 0};
+        sigset_t mask;
+        setrlimit(RLIMIT_CORE, &no_core);
+        signal(sig, SIG_DFL);
+        sigemptyset(&mask);
+        sigaddset(&mask, sig);
+        sigprocmask(SIG_UNBLOCK, &mask, NULL);
+        raise(sig);
+        return 128 + sig;
+    }
+    return WIFEXITED(status) ? WEXITSTATUS(status) : 127;
+}
+
+int main(int argc, char **argv) {
+    char line[128];
+    int errpipe[2], error, status;
+    ssize_t got;
+    pid_t pid;
+    siginfo_t info;
+    struct rusage usage;
+    struct sigaction action;
+    sigset_t term, old_mask;
+    if (argc < 6) {
+        fprintf(stderr, "usage: %s <cpu_seconds> <file_size> <cpus> <report_fd> <program> [args...]\n", argv[0]);
+        return 127;
+    }
+    long cpu_seconds = atol(argv[1]);
+    long long file_size = atoll(argv[2]);
+    const char *cpus = argv[3];
+    int report_fd = atoi(argv[4]);
+    fcntl(report_fd, F_SETFD, FD_CLOEXEC);
+    if (pipe2(errpipe, O_CLOEXEC) < 0) {
+        snprintf(line, sizeof line, "error %d\n", errno);
+        report(report_fd, line);
+        return 127;
+    }
+    /* SIGTERM chỉ được xử lý khi đã biết pid của chương trình */
+    memset(&action, 0, sizeof action);
+    action.sa_handler = on_term;
+    sigaction(SIGTERM, &action, NULL);
+    sigemptyset(&term);
+    sigaddset(&term, SIGTERM);
+    sigprocmask(SIG_BLOCK, &term, &old_mask);
+    pid = fork();
+    if (pid < 0) {
+        snprintf(line, sizeof line, "error %d\n", errno);
+        report(report_fd, line);
+        return 127;
+    }
+    if (pid == 0) {
+        setpgid(0, 0);
+        signal(SIGTERM, SIG_DFL);
+        sigprocmask(SIG_SETMASK, &old_mask, NULL);
+        if (cpu_seconds > 0)
+            set_limit(RLIMIT_CPU, (rlim_t)cpu_seconds, (rlim_t)cpu_seconds + 1);
+        if (file_size > 0)
+            set_limit(RLIMIT_FSIZE, (rlim_t)file_size, (rlim_t)file_size);
+        if (strcmp(cpus, "-") != 0)
+            set_cpus(cpus);
+        execvp(argv[5], argv + 5);
+        error = errno;
+        got = write(errpipe[1], &error, sizeof error);
+        _exit(127);
+    }
+    setpgid(pid, pid);
+    child = pid;
+    sigprocmask(SIG_SETMASK, &old_mask, NULL);
+    close(errpipe[1]);
+    do {
+        got = read(errpipe[0], &error, sizeof error);
+    } while (got < 0 && errno == EINTR);
+    close(errpipe[0]);
+    /* Chỉ chương trình giữ stdin/stdout/stderr: pipe đóng ngay khi nó kết thúc */
+    close(0);
+    close(1);
+    close(2);
+    if (got == (ssize_t)sizeof error) {
+        while (waitpid(pid, &status, 0) < 0 && errno == EINTR)
+            ;
+        snprintf(line, sizeof line, "error %d\n", error);
+        report(report_fd, line);
+        return 127;
+    }
+    report(report_fd, "started\n");
+    /* Chờ chương trình kết thúc nhưng chưa thu hồi: SIGTERM đến lúc này vẫn kill đúng tiến trình */
+    while (waitid(P_PID, pid, &info, WEXITED | WNOWAIT) < 0) {
+        if (errno != EINTR)
+            return 127;
+    }
+    sigprocmask(SIG_BLOCK, &term, NULL);
+    while (wait4(pid, &status, 0, &usage) < 0) {
+        if (errno != EINTR)
+            return 127;
+    }
+    child = 0;
+    snprintf(line, sizeof line, "exit %d %lld %lld %ld\n", status,
+             (long long)usage.ru_utime.tv_sec * 1000000 + usage.ru_utime.tv_usec,
+             (long long)usage.ru_stime.tv_sec * 1000000 + usage.ru_stime.tv_usec,
+             usage.ru_maxrss);
+    report(report_fd, line);
+    return exit_like(status);
+}
+"""
+
+_launcher: Optional[List[str]] = None
+_guard = threading.Lock()
+
+def _find_c_compiler() -> Optional[str]:
+    for compiler in C_COMPILERS:
+        path = shutil.which(compiler)
+        if path:
+            return path
+    return None
+
+def _build() -> Optional[str]:
+    """Biên dịch launcher C (nếu chưa có bản ứng với source hiện tại); None nếu không biên dịch được"""
+    compiler = _find_c_compiler()
+    if not compiler:
+        return None
+    digest = hashlib.sha256(LAUNCHER_SOURCE.encode("utf-8")).hexdigest()[:16]
+    binary = os.path.join(settings.JUDGE_LAUNCHER_DIR, f"launcher-{digest}")
+    if os.access(binary, os.X_OK):
+        return binary
+    try:
+        os.makedirs(settings.JUDGE_LAUNCHER_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=settings.JUDGE_LAUNCHER_DIR) as work_dir:
+            source_path = os.path.join(work_dir, "launcher.c")
+            output_path = os.path.join(work_dir, "launcher")
+            with open(source_path, "w") as f:
+                f.write(LAUNCHER_SOURCE)
+            result = subprocess.run(
+                [compiler, "-O2", "-o", output_path, source_path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=BUILD_TIMEOUT_SECONDS
+            )
+            if result.returncode != 0:
+                logger.warning(f"Cannot build judge launcher: {result.stderr.decode('utf-8', errors='replace')[:500]}")
+                return None
+            # Nhiều worker có thể build cùng lúc: đổi tên nguyên tử
+            os.replace(output_path, binary)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Cannot build judge launcher: {str(e)}")
+        return None
+    return binary
+
+def get_launcher() -> Optional[List[str]]:
+    """
+    Phần đầu argv để chạy launcher (build ở lần gọi đầu tiên); None trên hệ điều
+    hành không hỗ trợ giới hạn tài nguyên (Windows).
+    """
+    global _launcher
+    if os.name != "posix":
+        return None
+    with _guard:
+        if _launcher is None:
+            binary = _build()
+            if binary:
+                logger.info(f"Using judge launcher {binary}")
+                _launcher = [binary]
+            else:
+                logger.warning("No C compiler for the judge launcher, using the Python fallback")
+                _launcher = [sys.executable, FALLBACK_SCRIPT]
+        return _launcher
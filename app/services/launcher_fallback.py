@@ -0,0 +1,120 @@
+"""
+Bản Python của launcher (xem app/services/launcher.py), dùng khi máy judge không
+có trình biên dịch C. Cùng tham số và giao thức với LAUNCHER_SOURCE:
+
+    python launcher_fallback.py <cpu_seconds> <file_size> <cpus> <report_fd> <chương trình> [tham số...]
+
+Chỉ dùng thư viện chuẩn. Tiến trình này chỉ có một thread nên fork an toàn.
+Chương trình được fork từ một interpreter nên bộ nhớ đo được gồm thêm khoảng
+vài MB của interpreter (bản C chỉ vài trăm KB).
+"""
+import os
+import resource
+import signal
+import sys
+
+# pid của chương trình khi nó chưa được thu hồi
+_child = 0
+
+def _on_term(signum, frame) -> None:
+    if _child:
+        for kill in (os.killpg, os.kill):
+            try:
+                kill(_child, signal.SIGKILL)
+            except OSError:
+                pass
+
+def _set_limit(limit: int, soft: int, hard: int) -> None:
+    _, current_hard = resource.getrlimit(limit)
+    if current_hard != resource.RLIM_INFINITY and hard > current_hard:
+        # Giới hạn cứng của worker thấp hơn: không vượt quá nó
+        hard = current_hard
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (OSError, ValueError):
+        pass
+
+def _report(fd: int, line: str) -> None:
+    try:
+        os.write(fd, line.encode("ascii"))
+    except OSError:
+        pass
+
+def _exit_like(status: int) -> None:
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        signal.signal(sig, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {sig})
+        os.kill(os.getpid(), sig)
+        os._exit(128 + sig)
+    os._exit(os.WEXITSTATUS(status) if os.WIFEXITED(status) else 127)
+
+def main() -> None:
+    global _child
+    if len(sys.argv) < 6:
+        sys.stderr.write(f"usage: {sys.argv[0]} <cpu_seconds> <file_size> <cpus> <report_fd> <program> [args...]\n")
+        os._exit(127)
+    cpu_seconds, file_size, cpus, report_fd = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+    argv = sys.argv[5:]
+    os.set_inheritable(report_fd, False)
+    # os.pipe tạo fd không kế thừa qua exec: đầu đọc nhận EOF khi exec thành công
+    error_read, error_write = os.pipe()
+    # SIGTERM chỉ được xử lý khi đã biết pid của chương trình
+    signal.signal(signal.SIGTERM, _on_term)
+    old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+    try:
+        pid = os.fork()
+    except OSError as e:
+        _report(report_fd, f"error {e.errno}\n")
+        os._exit(127)
+    if pid == 0:
+        try:
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+            if cpu_seconds > 0:
+                _set_limit(resource.RLIMIT_CPU, cpu_seconds, cpu_seconds + 1)
+            if file_size > 0:
+                _set_limit(resource.RLIMIT_FSIZE, file_size, file_size)
+            if cpus != "-":
+                try:
+                    os.sched_setaffinity(0, {int(cpu) for cpu in cpus.split(",")})
+                except (OSError, ValueError):
+                    pass
+            os.execvp(argv[0], argv)
+        except OSError as e:
+            os.write(error_write, str(e.errno).encode("ascii"))
+        finally:
+            os._exit(127)
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        # Chương trình đã tự đặt nhóm tiến trình hoặc đã exec
+        pass
+    _child = pid
+    signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+    os.close(error_write)
+    error = os.read(error_read, 64)
+    os.close(error_read)
+    # Chỉ chương trình giữ stdin/stdout/stderr: pipe đóng ngay khi nó kết thúc
+    for fd in (0, 1, 2):
+        os.close(fd)
+    if error:
+        os.waitpid(pid, 0)
+        _report(report_fd, f"error {int(error)}\n")
+        os._exit(127)
+    _report(report_fd, "started\n")
+    # Chờ chương trình kết thúc nhưng chưa thu hồi: SIGTERM đến lúc này vẫn kill đúng tiến trình
+    os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+    _, status, usage = os.wait4(pid, 0)
+    _child = 0
+    _report(report_fd, "exit {} {} {} {}\n".format(
+        status, int(usage.ru_utime * 1000000), int(usage.ru_stime * 1000000), usage.ru_maxrss
+    ))
+    _exit_like(status)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Precompiled header (PCH) cho bài nộp C++.
+
+Phần lớn bài nộp C++ bắt đầu bằng #include <bits/stdc++.h>, và việc parse header
+này chiếm phần lớn thời gian biên dịch. Khi worker khởi động, mỗi bộ cờ biên dịch
+C++ của judge được build sẵn một file bits/stdc++.h.gch trong JUDGE_PCH_DIR; bài
+nộp có include header này được biên dịch thêm -I <thư mục PCH>, và GCC dùng file
+.gch thay cho việc parse lại header. Nếu PCH không dùng được (cờ khác, macro
+được define trước khi include...) GCC tự bỏ qua nó và dùng header gốc, nên kết
+quả biên dịch không bao giờ thay đổi.
+
+Thư mục PCH được đặt tên theo hash của (đường dẫn và phiên bản trình biên dịch,
+bộ cờ). Trước mỗi lần dùng, file trình biên dịch được stat lại: nếu nó đã đổi
+(nâng cấp compiler) thì PCH cũ không được dùng nữa và được build lại trong nền.
+Thư mục PCH cũ không bị xóa ngay vì lần biên dịch khác có thể đang đọc nó; các
+thư mục không còn dùng được xóa khi worker khởi động (warm).
+Khi khởi động, thời gian biên dịch trung vị của một bài mẫu có và không có PCH
+được ghi vào log và stats.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+from app.core.config import settings
+from app.services.spawn import spawn
+
+logger = logging.getLogger(__name__)
+
+CPP_COMPILER_PATH = os.environ.get("CPP_COMPILER_PATH", "g++")
+PCH_HEADER = "bits/stdc++.h"
+INCLUDE_PATTERN = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*[<"]bits/stdc\+\+\.h[>"]', re.MULTILINE)
+BUILD_TIMEOUT_SECONDS = 120
+BENCHMARK_SOURCE = """#include <bits/stdc++.h>
+using namespace std;
+int main() {
+    long long a, b;
+    cin >> a >> b;
+    vector<long long> v = {a, b};
+    cout << accumulate(v.begin(), v.end(), 0LL) << endl;
+    return 0;
+}
+"""
+
+def uses_pch_header(source: bytes) -> bool:
+    """Source có include header được precompile không"""
+    return INCLUDE_PATTERN.search(source) is not None
+
+# Output của --version theo (đường dẫn, mtime, kích thước) của trình biên dịch
+_versions: Dict[Tuple[str, int, int], bytes] = {}
+_versions_guard = threading.Lock()
+
+class CompilerIdentity:
+    """Đường dẫn thật, mtime và kích thước của trình biên dịch: đổi khi compiler được nâng cấp"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompilerIdentity) and (self.path, self.mtime_ns, self.size) == (
+            other.path, other.mtime_ns, other.size
+        )
+
+    @property
+    def version(self) -> bytes:
+        """Output của <compiler> --version (chỉ chạy một lần cho mỗi file trình biên dịch)"""
+        key = (self.path, self.mtime_ns, self.size)
+        with _versions_guard:
+            version = _versions.get(key)
+        if version is None:
+            try:
+                version = subprocess.run(
+                    [self.path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30
+                ).stdout
+            except (OSError, subprocess.TimeoutExpired):
+                version = b""
+            with _versions_guard:
+                _versions[key] = version
+        return version
+
+    def fingerprint(self) -> str:
+        """Chuỗi định danh trình biên dịch, dùng trong key của các cache"""
+        digest = hashlib.sha256(self.version).hexdigest()
+        return f"{self.path}:{self.mtime_ns}:{self.size}:{digest}"
+
+def compiler_identity(compiler: str) -> Optional[CompilerIdentity]:
+    """Định danh của trình biên dịch (tên lệnh hoặc đường dẫn); None nếu không tìm thấy"""
+    path = shutil.which(compiler)
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return CompilerIdentity(path, info.st_mtime_ns, info.st_size)
+
+class PrecompiledHeader:
+    def __init__(self, key: str, include_dir: str, flags: Tuple[str, ...], identity: CompilerIdentity):
+        self.key = key
+        self.include_dir = include_dir
+        self.flags = flags
+        self.identity = identity
+
+class PchCache:
+    def __init__(self, root: str, compiler: str):
+        self.root = root
+        self.compiler = compiler
+        os.makedirs(root, exist_ok=True)
+        self._entries: Dict[Tuple[str, ...], PrecompiledHeader] = {}
+        self._building: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.used = 0
+        # Thời gian biên dịch trung vị (ms) của bài mẫu theo bộ cờ: {"without_pch": ..., "with_pch": ...}
+        self.report: Dict[str, Dict[str, float]] = {}
+
+    def _identity(self) -> Optional[CompilerIdentity]:
+        return compiler_identity(self.compiler)
+
+    def include_dir(self, flags: Sequence[str], source: bytes) -> Optional[str]:
+        """
+        Thư mục cần thêm bằng -I để biên dịch source với PCH; None nếu source không
+        include header được precompile hoặc PCH của bộ cờ này chưa sẵn sàng.
+        """
+        if not uses_pch_header(source):
+            return None
+        flags = tuple(flags)
+        entry = self._entries.get(flags)
+        if entry is None:
+            return None
+        if entry.identity != self._identity():
+            with self._lock:
+                # Chỉ thread đầu tiên thấy trình biên dịch đã đổi mới build lại
+                rebuild = self._entries.get(flags) is entry
+                if rebuild:
+                    del self._entries[flags]
+            if rebuild:
+                logger.warning(f"C++ compiler changed, rebuilding precompiled header for {' '.join(flags)}")
+                threading.Thread(target=self._prepare_quietly, args=(flags,), name="pch-build", daemon=True).start()
+            return None
+        with self._lock:
+            self.used += 1
+        return entry.include_dir
+
+    def _prepare_quietly(self, flags: Tuple[str, ...]) -> None:
+        try:
+            self.prepare(flags)
+        except Exception as e:
+            logger.error(f"Cannot build precompiled header for {' '.join(flags)}: {str(e)[:200]}")
+
+    def prepare(self, flags: Sequence[str]) -> Optional[PrecompiledHeader]:
+        """Build PCH cho bộ cờ (nếu chưa có trên đĩa); None nếu không tìm thấy trình biên dịch"""
+        flags = tuple(flags)
+        with self._lock:
+            lock = self._building.setdefault(flags, threading.Lock())
+        with lock:
+            identity = self._identity()
+            if identity is None:
+                logger.warning(f"C++ compiler {self.compiler} not found, precompiled headers disabled")
+                return None
+            entry = self._entries.get(flags)
+            if entry is not None and entry.identity == identity:
+                return entry
+            key = self._make_key(identity, flags)
+            entry_dir = os.path.join(self.root, key)
+            gch_path = os.path.join(entry_dir, "include", PCH_HEADER + ".gch")
+            if not os.path.exists(gch_path):
+                self._build(entry_dir, flags)
+            entry = PrecompiledHeader(key, os.path.join(entry_dir, "include"), flags, identity)
+            with self._lock:
+                self._entries[flags] = entry
+            return entry
+
+    def _make_key(self, identity: CompilerIdentity, flags: Tuple[str, ...]) -> str:
+        digest = hashlib.sha256()
+        for part in (identity.path.encode("utf-8"), identity.version, "\0".join(flags).encode("utf-8"), PCH_HEADER.encode("utf-8")):
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _build(self, entry_dir: str, flags: Tuple[str, ...]) -> None:
+        # Build trong thư mục tạm rồi đổi tên, để process khác không thấy file .gch dở dang
+        work_dir = tempfile.mkdtemp(prefix="pch_", dir=self.root)
+        try:
+            header_path = os.path.join(work_dir, "stdc++.h")
+            with open(header_path, "w") as f:
+                f.write(f"#include <{PCH_HEADER}>\n")
+            gch_path = os.path.join(work_dir, "include", PCH_HEADER + ".gch")
+            os.makedirs(os.path.dirname(gch_path))
+            started = time.time()
+            argv = [self.compiler, *flags, "-x", "c++-header", header_path, "-o", gch_path]
+            process = spawn(argv, cwd=work_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                _, stderr = process.communicate(timeout=BUILD_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise RuntimeError("building the precompiled header timed out")
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode("utf-8", errors="replace"))
+            os.remove(header_path)
+            try:
+                os.rename(work_dir, entry_dir)
+            except OSError:
+                # Process khác đã build xong trước
+                shutil.rmtree(work_dir, ignore_errors=True)
+            with self._lock:
+                self.builds += 1
+            logger.info(f"Built precompiled header for {' '.join(flags)} in {(time.time() - started) * 1000:.0f}ms")
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+    def benchmark(self, flags: Sequence[str], runs: int) -> Optional[Dict[str, float]]:
+        """Thời gian biên dịch trung vị (ms) của bài mẫu khi không dùng và khi dùng PCH"""
+        entry = self._entries.get(tuple(flags))
+        if entry is None or runs <= 0:
+            return None
+        work_dir = tempfile.mkdtemp(prefix="pch_bench_", dir=self.root)
+        try:
+            source_path = os.path.join(work_dir, "main.cpp")
+            with open(source_path, "w") as f:
+                f.write(BENCHMARK_SOURCE)
+            timings = {}
+            for name, extra in (("without_pch", []), ("with_pch", ["-I", entry.include_dir])):
+                samples = []
+                for _ in range(runs):
+                    argv = [self.compiler, *extra, *flags, "-o", os.path.join(work_dir, "main"), source_path]
+                    started = time.time()
+                    process = spawn(argv, cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    process.wait(timeout=BUILD_TIMEOUT_SECONDS)
+                    samples.append((time.time() - started) * 1000)
+                timings[name] = round(statistics.median(samples), 1)
+            return timings
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def remove_stale(self) -> None:
+        """
+        Xóa các thư mục PCH không ứng với bộ cờ nào đang dùng (build bằng trình biên
+        dịch cũ) và các thư mục build dở dang đã quá hạn. Một lần biên dịch còn dùng thư
+        mục cũ vẫn đúng: file .gch đã mở vẫn đọc được, còn nếu không tìm thấy file .gch
+        thì GCC dùng header gốc.
+        """
+        with self._lock:
+            keep = {entry.key for entry in self._entries.values()}
+        expired = time.time() - BUILD_TIMEOUT_SECONDS * 2
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            if name in keep:
+                continue
+            if name.startswith("pch_"):
+                # Thư mục build (hoặc benchmark) của process khác có thể đang dùng
+                try:
+                    if os.stat(path).st_mtime > expired:
+                        continue
+                except OSError:
+                    continue
+            logger.info(f"Removing stale precompiled header directory {name}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    def warm(self, flag_sets: List[Sequence[str]]) -> None:
+        """
+        Build PCH cho từng bộ cờ và đo thời gian biên dịch có/không có PCH, rồi xóa các
+        thư mục PCH cũ (khi worker khởi động)
+        """
+        for flags in flag_sets:
+            label = " ".join(flags)
+            try:
+                if not self.prepare(flags):
+                    return
+                timings = self.benchmark(flags, settings.JUDGE_PCH_BENCHMARK_RUNS)
+            except Exception as e:
+                logger.error(f"Cannot build precompiled header for {label}: {str(e)[:200]}")
+                continue
+            if timings:
+                self.report[label] = timings
+                logger.info(
+                    f"Precompiled header for {label}: median compile {timings['without_pch']:.0f}ms without, "
+                    f"{timings['with_pch']:.0f}ms with"
+                )
+        self.remove_stale()
+
+    def stats(self) -> Dict[str, object]:
+        return {"entries": len(self._entries), "builds": self.builds, "used": self.used, "compile_ms": self.report}
+
+_cache: Optional[PchCache] = None
+_cache_guard = threading.Lock()
+
+def get_pch_cache() -> Optional[PchCache]:
+    """Trả về PCH cache dùng chung của worker, None nếu bị tắt"""
+    global _cache
+    if not settings.JUDGE_PCH_ENABLED:
+        return None
+    with _cache_guard:
+        if _cache is None:
+            _cache = PchCache(settings.JUDGE_PCH_DIR, CPP_COMPILER_PATH)
+        return _cache
@@ -0,0 +1,263 @@
+"""
+Chấm lại hàng loạt (rejudge) theo bài toán, cuộc thi hoặc một tập bài nộp.
+
+Job được lưu trong bảng rejudge_jobs và chạy nền bởi RejudgeManager:
+
+- Bài nộp được xử lý theo từng lô, sắp theo id. Sau mỗi lô, id cuối cùng được
+  lưu làm checkpoint (cursor), nên job bị dừng giữa chừng (server khởi động
+  lại) tiếp tục từ lô chưa xong thay vì chấm lại từ đầu.
+- Trong một lô, mỗi cặp (hash của code, ngôn ngữ) chỉ được biên dịch một lần
+  vào compile cache; các bài nộp trùng code được xếp cạnh nhau và lấy file thực
+  thi từ cache.
+- Bài nộp được đưa vào hàng đợi chấm với lớp rejudge (ưu tiên thấp nhất, xem
+  judge_scheduler.py) và không quá JUDGE_REJUDGE_CONCURRENCY bài cùng lúc, nên
+  bài nộp của người dùng vẫn được chấm ngay.
+- Bài nộp chưa chấm lại xong sau JUDGE_REJUDGE_TIMEOUT_SECONDS được đưa lại vào
+  hàng đợi; quá JUDGE_REJUDGE_MAX_ATTEMPTS lần thì job bỏ qua nó và ghi id vào
+  failed_submission_ids của job.
+
+Mặc định job chấm lại theo delta (filters.delta): với mỗi bài nộp, judge chỉ
+chạy các test case đã thêm hoặc đã sửa so với phiên bản bộ test bài nộp đã được
+chấm, còn lại lấy kết quả từng test đã lưu (xem judge.run_judging). Với
+delta=False, kết quả từng test cũ bị xóa trước khi chấm nên mọi test được chạy lại.
+
+Kết quả được ghi qua process_submission (crud.submissions.update) và điểm cuộc
+thi được tính lại như khi chấm bình thường.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+import hashlib
+import logging
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.rejudge_jobs import RejudgeJob
+from app.models.submissions import Submission
+from app.services import judge
+from app.services.judge_queue import get_judge_queue
+
+logger = logging.getLogger(__name__)
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+class JobCancelled(Exception):
+    pass
+
+class RejudgeManager:
+    def __init__(self, concurrency: int, batch_size: int):
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="rejudge", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Báo có job mới để không phải chờ tới lần kiểm tra kế tiếp"""
+        self.start()
+        self._wake.set()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._thread = None
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                job = crud.rejudge_jobs.claim_next(db, stale_seconds=settings.JUDGE_REJUDGE_STALE_SECONDS)
+                if job is not None:
+                    self._run_job(db, job)
+                    continue
+            except Exception as e:
+                logger.error(f"Rejudge manager error: {str(e)}", exc_info=True)
+                db.rollback()
+            finally:
+                db.close()
+            self._wake.wait(settings.JUDGE_REJUDGE_POLL_SECONDS * 5)
+            self._wake.clear()
+
+    def _run_job(self, db: Session, job: RejudgeJob) -> None:
+        logger.info(f"Rejudge job {job.id} started at cursor {job.cursor} ({job.processed}/{job.total})")
+        try:
+            query = crud.rejudge_jobs.submissions_query(db, job)
+            if not job.cursor:
+                job.total = query.count()
+                db.commit()
+            compiled: Set[Tuple[str, str]] = set()
+            while not self._stop.is_set():
+                db.refresh(job)
+                if job.status == "cancelled":
+                    raise JobCancelled()
+                batch_query = query.with_entities(Submission.id, Submission.code, Submission.language)
+                if job.cursor:
+                    batch_query = batch_query.filter(Submission.id > job.cursor)
+                batch = batch_query.limit(self.batch_size).all()
+                if not batch:
+                    job.status = "completed"
+                    job.finished_at = datetime.utcnow()
+                    db.commit()
+                    logger.info(
+                        f"Rejudge job {job.id} completed: {job.processed} submissions, {job.compiled} compiles, "
+                        f"{len(job.failed_submission_ids or [])} timed out"
+                    )
+                    return
+                ordered = self._precompile(db, job, batch, compiled)
+                self._rejudge(db, job, ordered)
+                job.cursor = batch[-1].id
+                job.processed += len(batch)
+                job.heartbeat_at = datetime.utcnow()
+                db.commit()
+        except JobCancelled:
+            logger.info(f"Rejudge job {job.id} cancelled at {job.processed}/{job.total}")
+        except Exception as e:
+            logger.error(f"Rejudge job {job.id} failed: {str(e)}", exc_info=True)
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+
+    def _precompile(self, db: Session, job: RejudgeJob, batch, compiled: Set[Tuple[str, str]]) -> List[str]:
+        """
+        Biên dịch mỗi (code, ngôn ngữ) khác nhau của lô một lần; trả về id các bài nộp
+        xếp theo nhóm code để bài trùng code được chấm liền nhau
+        """
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        sources: Dict[Tuple[str, str], str] = {}
+        for submission_id, code, language in batch:
+            key = (code_hash(code), language)
+            groups.setdefault(key, []).append(submission_id)
+            sources.setdefault(key, code)
+        # Khi chấm phân tán, mỗi judge node tự biên dịch (một lần nhờ compile cache của node)
+        if not settings.JUDGE_DISTRIBUTED:
+            for key, code in sources.items():
+                if key in compiled:
+                    continue
+                language_config = judge.get_language_config(db, key[1])
+                if language_config and judge.precompile(code, language_config):
+                    job.compiled += 1
+                compiled.add(key)
+            db.commit()
+        return [submission_id for ids in groups.values() for submission_id in ids]
+
+    def _rejudge(self, db: Session, job: RejudgeJob, submission_ids: List[str]) -> None:
+        """Chấm lại các bài nộp, không quá self.concurrency bài cùng lúc"""
+        queue = get_judge_queue()
+        # Bài đang chấm lại -> (hạn chờ, số lần đã đưa vào hàng đợi)
+        in_flight: Dict[str, Tuple[float, int]] = {}
+        # Bài hàng đợi chưa nhận (đã có trong hàng đợi), được đưa lại ở các lần kiểm tra sau
+        refused: Set[str] = set()
+        for submission_id in submission_ids:
+            while len(in_flight) >= self.concurrency:
+                self._wait(db, job, queue, in_flight, refused)
+            submission = crud.submissions.get_by_id(db, id=submission_id)
+            if not submission:
+                continue
+            if not (job.filters or {}).get("delta", True):
+                crud.submissions.delete_test_results(db, submission_id=submission_id)
+            self._enqueue(db, queue, submission_id, 1, in_flight, refused)
+        while in_flight:
+            self._wait(db, job, queue, in_flight, refused)
+
+    def _enqueue(self, db: Session, queue, submission_id: str, attempt: int,
+                 in_flight: Dict[str, Tuple[float, int]], refused: Set[str]) -> None:
+        """
+        Đặt lại bài nộp về pending và đưa vào hàng đợi với lớp rejudge. Hàng đợi từ chối
+        bài đã có trong nó (recover_pending vừa đưa vào, hoặc một lần chấm trước còn đang
+        chạy với bộ test cũ): bài được đưa lại sau, khi lần chấm đó đã xong.
+        """
+        submission = crud.submissions.get_by_id(db, id=submission_id)
+        if not submission:
+            in_flight.pop(submission_id, None)
+            refused.discard(submission_id)
+            return
+        if submission.status != "pending":
+            crud.submissions.update(db, db_obj=submission, obj_in={
+                "status": "pending", "execution_time_ms": None, "memory_used_kb": None, "score": None, "max_score": None,
+                "judge_claimed_at": None
+            })
+        deadline = time.monotonic() + settings.JUDGE_REJUDGE_TIMEOUT_SECONDS
+        if queue.enqueue(submission_id, job_class="rejudge"):
+            refused.discard(submission_id)
+            in_flight[submission_id] = (deadline, attempt)
+        elif submission_id not in refused:
+            logger.info(f"Submission {submission_id} is already queued, rejudging it once that run finishes")
+            refused.add(submission_id)
+            in_flight[submission_id] = (deadline, attempt)
+
+    def _wait(self, db: Session, job: RejudgeJob, queue, in_flight: Dict[str, Tuple[float, int]],
+              refused: Set[str]) -> None:
+        """
+        Chờ ít nhất một bài đang chấm xong hoặc bị bỏ qua, đồng thời đưa lại các bài bị
+        hàng đợi từ chối hoặc quá hạn, cập nhật heartbeat và kiểm tra job bị hủy.
+
+        Bài chưa chấm xong sau JUDGE_REJUDGE_TIMEOUT_SECONDS được đưa lại vào hàng đợi,
+        tối đa JUDGE_REJUDGE_MAX_ATTEMPTS lần; sau đó job không chờ nó nữa và ghi id của
+        nó vào job.failed_submission_ids (bài nộp vẫn pending và được chấm khi tới lượt).
+        """
+        while True:
+            time.sleep(settings.JUDGE_REJUDGE_POLL_SECONDS)
+            still_pending = {
+                submission_id for (submission_id,) in db.query(Submission.id).filter(
+                    Submission.id.in_(list(in_flight)), Submission.status == "pending"
+                ).all()
+            }
+            db.refresh(job)
+            if job.status == "cancelled":
+                raise JobCancelled()
+            count = len(in_flight)
+            now = time.monotonic()
+            for submission_id, (deadline, attempt) in list(in_flight.items()):
+                if submission_id in refused:
+                    if now < deadline:
+                        self._enqueue(db, queue, submission_id, attempt, in_flight, refused)
+                    else:
+                        self._give_up(job, submission_id, in_flight, refused)
+                elif submission_id not in still_pending:
+                    del in_flight[submission_id]
+                elif now >= deadline:
+                    if attempt < settings.JUDGE_REJUDGE_MAX_ATTEMPTS:
+                        logger.warning(f"Rejudge of submission {submission_id} timed out, queuing it again")
+                        crud.submissions.release_claims(db, submission_ids=[submission_id])
+                        self._enqueue(db, queue, submission_id, attempt + 1, in_flight, refused)
+                    else:
+                        self._give_up(job, submission_id, in_flight, refused)
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+            if len(in_flight) < count:
+                return
+
+    def _give_up(self, job: RejudgeJob, submission_id: str, in_flight: Dict[str, Tuple[float, int]],
+                 refused: Set[str]) -> None:
+        """Ngừng chờ một bài nộp; ghi vào job, được lưu cùng heartbeat kế tiếp"""
+        logger.error(f"Rejudge job {job.id} gave up waiting for submission {submission_id}")
+        del in_flight[submission_id]
+        refused.discard(submission_id)
+        # Gán list mới để SQLAlchemy nhận ra cột JSON đã thay đổi
+        job.failed_submission_ids = (job.failed_submission_ids or []) + [submission_id]
+
+_manager: Optional[RejudgeManager] = None
+_manager_guard = threading.Lock()
+
+def get_rejudge_manager() -> RejudgeManager:
+    global _manager
+    with _manager_guard:
+        if _manager is None:
+            _manager = RejudgeManager(settings.JUDGE_REJUDGE_CONCURRENCY, settings.JUDGE_REJUDGE_BATCH_SIZE)
+        return _manager
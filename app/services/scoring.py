@@ -0,0 +1,77 @@
+"""
+Chấm điểm theo subtask (kiểu IOI).
+
+Các test case có cùng TestCase.subtask tạo thành một nhóm; điểm của nhóm là tổng
+score của các test trong nhóm và chỉ được tính khi mọi test của nhóm đều đúng.
+Các test không thuộc subtask nào (subtask = None) được gộp chung vào một nhóm, nên
+bài toán không chia subtask được chấm như trước: đúng hết thì được toàn bộ điểm.
+
+Khi một test sai, các test đứng sau nó trong cùng nhóm bị bỏ qua (nhóm đã mất
+điểm). Các nhóm khác vẫn được chấm tiếp, trừ khi những nhóm chưa sai không còn
+điểm nào để lấy: khi đó mọi test đứng sau test sai đều bị bỏ qua, giống chế độ
+dừng ở test sai đầu tiên. Test đứng trước một test sai vẫn được chạy, vì kết quả
+chấm là kết quả của test sai có thứ tự nhỏ nhất. Vì vậy kết quả và điểm không phụ
+thuộc thứ tự các test chạy xong (khi chạy song song).
+"""
+from typing import Any, Dict, Iterable, Optional
+
+class Subtask:
+    def __init__(self, key: Optional[int]):
+        self.key = key
+        self.points = 0
+        # Thứ tự nhỏ nhất của test sai đã biết trong nhóm
+        self.failed_order: Optional[int] = None
+
+class ScoringPlan:
+    """Các nhóm test của một lần chấm và test sai đã biết của từng nhóm"""
+
+    def __init__(self, test_cases: Iterable[Any]):
+        self._subtasks: Dict[Optional[int], Subtask] = {}
+        self._test_subtasks: Dict[str, Subtask] = {}
+        # Thứ tự nhỏ nhất của test sai đã biết trong mọi nhóm
+        self.first_failed_order: Optional[int] = None
+        for test_case in test_cases:
+            key = getattr(test_case, "subtask", None)
+            subtask = self._subtasks.get(key)
+            if subtask is None:
+                subtask = self._subtasks[key] = Subtask(key)
+            subtask.points += test_case.score or 0
+            self._test_subtasks[test_case.id] = subtask
+
+    @property
+    def max_score(self) -> int:
+        return sum(subtask.points for subtask in self._subtasks.values())
+
+    @property
+    def score(self) -> int:
+        """Điểm đạt được: tổng điểm các nhóm chưa có test sai"""
+        return sum(subtask.points for subtask in self._subtasks.values() if subtask.failed_order is None)
+
+    def record(self, test_case_id: str, order: int, status: str) -> None:
+        """Ghi nhận kết quả của một test case (đã chạy hoặc lấy lại từ lần chấm trước)"""
+        if status in ("accepted", "cancelled"):
+            return
+        subtask = self._test_subtasks.get(test_case_id)
+        if subtask is not None and (subtask.failed_order is None or order < subtask.failed_order):
+            subtask.failed_order = order
+        if self.first_failed_order is None or order < self.first_failed_order:
+            self.first_failed_order = order
+
+    def points_reachable(self) -> bool:
+        """Còn nhóm chưa có test sai nào có điểm không"""
+        return any(subtask.points > 0 for subtask in self._subtasks.values() if subtask.failed_order is None)
+
+    def failed_before(self, test_case: Any) -> bool:
+        """Đã có test sai đứng trước test case này trong cùng subtask không"""
+        subtask = self._test_subtasks.get(test_case.id)
+        return subtask is not None and subtask.failed_order is not None and test_case.order > subtask.failed_order
+
+    def should_skip(self, test_case: Any) -> bool:
+        """Test case không còn ảnh hưởng tới kết quả lẫn điểm (không cần chạy) không"""
+        if self.failed_before(test_case):
+            return True
+        return (
+            self.first_failed_order is not None
+            and test_case.order > self.first_failed_order
+            and not self.points_reachable()
+        )
@@ -0,0 +1,242 @@
+"""
+Tầng khởi chạy tiến trình cho judge: chạy thẳng file thực thi, không qua /bin/sh.
+
+Template lệnh của Language (compile_command, run_command) được tách thành
+danh sách argv một lần rồi cache lại; mỗi lần chạy chỉ thay các placeholder
+{file_path}, {exe_path}, {dir_path} trong từng phần tử. stdin/stdout/stderr
+là file descriptor đã mở sẵn và output được giữ nguyên dạng bytes.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache
+import logging
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from app.services.launcher import get_launcher
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=256)
+def parse_command_template(template: str) -> Tuple[str, ...]:
+    """Tách template lệnh thành các phần tử argv (giữ nguyên placeholder)"""
+    return tuple(shlex.split(template, posix=os.name != "nt"))
+
+def render_argv(template: str, **paths: str) -> List[str]:
+    """Tạo argv từ template, thay placeholder trong từng phần tử"""
+    argv = []
+    for part in parse_command_template(template):
+        for name, value in paths.items():
+            part = part.replace("{" + name + "}", value)
+        argv.append(part)
+    return argv
+
+def cpu_limit_seconds(time_limit_ms: int) -> int:
+    """RLIMIT_CPU (giây) ứng với giới hạn thời gian: dư 1 giây so với giới hạn"""
+    return int(time_limit_ms / 1000) + 1
+
+def _wait_started(process: subprocess.Popen, report, program: str) -> None:
+    """Chờ launcher exec xong chương trình; exec thất bại được báo lại như Popen"""
+    line = report.readline().split()
+    if line and line[0] == b"started":
+        return
+    process.wait()
+    report.close()
+    if len(line) == 2 and line[0] == b"error":
+        error = int(line[1])
+        raise OSError(error, os.strerror(error), program)
+    raise OSError(f"Judge launcher exited with code {process.returncode} before starting {program}")
+
+def spawn(argv: List[str], cwd: str, stdin=None, stdout=None, stderr=None, cpu_time_limit_ms: Optional[int] = None,
+          file_size_limit: Optional[int] = None, cpus=None) -> subprocess.Popen:
+    """
+    Chạy trực tiếp argv[0] với các file descriptor đã mở sẵn.
+    Tiến trình được đặt trong session riêng để kill được cả các tiến trình con của nó.
+    
+    Nếu có giới hạn CPU, dung lượng file (ghi file vượt quá sẽ nhận SIGXFSZ) hoặc
+    danh sách core để ghim, chương trình được chạy qua launcher (xem launcher.py) để
+    chúng được đặt trước exec: chương trình không bao giờ chạy dù chỉ một lúc mà
+    không có giới hạn hoặc trên core khác. Khi đó wait_for_process lấy rusage của
+    chính chương trình từ launcher.
+    """
+    if resource is None or not hasattr(os, "sched_setaffinity"):
+        cpus = None
+    launcher = get_launcher() if resource is not None and (cpu_time_limit_ms or file_size_limit or cpus) else None
+    run_argv = argv
+    report_read = report_write = None
+    if launcher:
+        report_read, report_write = os.pipe()
+        cpu_seconds = cpu_limit_seconds(cpu_time_limit_ms) if cpu_time_limit_ms else 0
+        cpu_list = ",".join(str(cpu) for cpu in sorted(cpus)) if cpus else "-"
+        run_argv = launcher + [str(cpu_seconds), str(file_size_limit or 0), cpu_list, str(report_write)] + list(argv)
+    try:
+        process = subprocess.Popen(
+            run_argv,
+            cwd=cwd,
+            stdin=stdin if stdin is not None else subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr,
+            close_fds=True,
+            pass_fds=(report_write,) if launcher else (),
+            start_new_session=os.name == "posix"
+        )
+    except BaseException:
+        if launcher:
+            os.close(report_read)
+        raise
+    finally:
+        if launcher:
+            os.close(report_write)
+    if launcher:
+        process.launcher_report = os.fdopen(report_read, "rb")
+        _wait_started(process, process.launcher_report, argv[0])
+    return process
+
+class CappedPipeReader:
+    """Đọc hết một pipe trong thread riêng nhưng chỉ giữ lại tối đa limit byte đầu tiên"""
+
+    def __init__(self, pipe, limit: int):
+        self._pipe = pipe
+        self._limit = limit
+        self._chunks = bytearray()
+        self.truncated = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        fd = self._pipe.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            room = self._limit - len(self._chunks)
+            if room > 0:
+                self._chunks += chunk[:room]
+            if len(chunk) > room:
+                self.truncated = True
+
+    def read(self) -> bytes:
+        """Chờ pipe đóng và trả về phần dữ liệu đã giữ lại"""
+        self._thread.join()
+        self._pipe.close()
+        return bytes(self._chunks)
+
+def _read_launcher_exit(report) -> Optional[Tuple[int, int, int]]:
+    """(wait status, cpu_time_ms, memory_used_kb) của chương trình do launcher gửi lại"""
+    try:
+        line = report.read().split()
+    finally:
+        report.close()
+    if len(line) != 5 or line[0] != b"exit":
+        return None
+    status, utime_us, stime_us, maxrss_kb = (int(value) for value in line[1:])
+    return status, (utime_us + stime_us) // 1000, maxrss_kb
+
+def wait_for_process(process, wall_timeout: Optional[float], on_running: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Chờ tiến trình kết thúc và lấy tài nguyên thực tế từ rusage của nó:
+    thời gian CPU (user + system) và bộ nhớ RSS cao nhất.
+    Tiến trình bị kill nếu vượt quá wall_timeout giây thời gian thực.
+    
+    Bộ nhớ chỉ đo đúng với chương trình chạy qua launcher (spawn có giới hạn) hoặc
+    zygote: ru_maxrss của tiến trình fork trực tiếp từ worker gồm cả RSS của worker.
+    
+    on_running (nếu có) được gọi trong lúc tiến trình đang chạy, dưới sự giám sát
+    của giới hạn thời gian thực, ví dụ để đọc stdout theo luồng.
+    """
+    state = {"reaped": False, "timed_out": False}
+    lock = threading.Lock()
+
+    def on_timeout():
+        with lock:
+            if state["reaped"]:
+                return
+            state["timed_out"] = True
+            kill_process(process)
+
+    timer = None
+    if wall_timeout is not None:
+        timer = threading.Timer(wall_timeout, on_timeout)
+        timer.daemon = True
+    start_time = time.time()
+    if timer:
+        timer.start()
+    try:
+        if on_running:
+            on_running()
+        if hasattr(process, "wait_rusage"):
+            # Tiến trình do zygote fork ra (xem zygote.py): zygote thu hồi nó và gửi lại rusage
+            _, cpu_time_ms, memory_used_kb = process.wait_rusage()
+            with lock:
+                state["reaped"] = True
+        elif hasattr(os, "wait4"):
+            _, status, rusage = os.wait4(process.pid, 0)
+            with lock:
+                state["reaped"] = True
+            # Báo cho Popen biết tiến trình đã được thu hồi
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_time_ms = int((rusage.ru_utime + rusage.ru_stime) * 1000)
+            memory_used_kb = rusage.ru_maxrss
+            if sys.platform == "darwin":
+                # macOS trả về ru_maxrss theo byte
+                memory_used_kb //= 1024
+            report = getattr(process, "launcher_report", None)
+            launched = _read_launcher_exit(report) if report is not None else None
+            if launched:
+                # rusage của chính chương trình, không gồm RSS mà launcher thừa hưởng từ worker
+                status, cpu_time_ms, memory_used_kb = launched
+                process.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            process.wait()
+            with lock:
+                state["reaped"] = True
+            cpu_time_ms = int((time.time() - start_time) * 1000)
+            memory_used_kb = 0
+    finally:
+        if timer:
+            timer.cancel()
+
+    return {
+        "cpu_time_ms": cpu_time_ms,
+        "wall_time_ms": int((time.time() - start_time) * 1000),
+        "memory_used_kb": memory_used_kb,
+        "timed_out": state["timed_out"]
+    }
+
+def kill_process(process) -> None:
+    """
+    Kill tiến trình bằng os.kill thay vì Popen.kill, vì Popen.kill gọi poll()
+    và có thể thu hồi tiến trình trước wait4, làm mất thông tin rusage.
+    """
+    if not isinstance(process, subprocess.Popen):
+        # Tiến trình do zygote fork ra tự kill an toàn qua socket của nó
+        process.kill()
+        return
+    if getattr(process, "launcher_report", None) is not None:
+        # Launcher kill nhóm tiến trình của chương trình rồi vẫn gửi lại rusage của nó
+        try:
+            os.kill(process.pid, signal.SIGTERM)
+        except OSError:
+            pass
+        return
+    if hasattr(signal, "SIGKILL"):
+        # Kill cả nhóm tiến trình (xem spawn), sau đó kill riêng tiến trình chính
+        for kill in (os.killpg, os.kill):
+            try:
+                kill(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError, OSError):
+                pass
+    else:
+        try:
+            process.kill()
+        except OSError:
+            pass
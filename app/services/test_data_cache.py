@@ -0,0 +1,253 @@
+"""
+Cache dữ liệu test (input + output mong đợi) cho mỗi worker chấm bài.
+
+Entry được định danh bằng (test_case_id, content_hash) nên dữ liệu cũ không bao
+giờ được dùng lại sau khi test case thay đổi. Có hai tầng:
+
+- Test nhỏ nằm trong một LRU trên RAM với giới hạn tổng số byte; input đủ nhỏ
+  để ghi thẳng vào pipe stdin của chương trình.
+- Test lớn được ghi một lần ra thư mục trên đĩa (đặt tên theo content_hash);
+  input được mở trực tiếp làm stdin, output mong đợi được đọc qua mmap.
+
+File trên đĩa có thể đang được một lần chạy khác (của worker này hoặc worker khác
+dùng chung thư mục) mở làm stdin, nên chúng không bị xóa khi test case bị sửa (tên
+file theo content_hash nên dữ liệu cũ không bao giờ bị dùng nhầm) mà chỉ bị xóa
+khi vượt quá dung lượng cho phép. Mỗi TestData ở tầng đĩa giữ một flock chia sẻ
+trên file input cho tới khi được close(); entry đang được đọc không bị evict.
+"""
+from typing import Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import logging
+import mmap
+import os
+import threading
+import uuid
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có file lock, mỗi thư mục cache chỉ dùng cho một process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Dung lượng mặc định của pipe trên Linux: input nhỏ hơn mức này ghi được vào pipe mà không bị block
+PIPE_INPUT_LIMIT = 65536
+
+class TestDataMissing(Exception):
+    """File dữ liệu test trên đĩa không còn khi chương trình được chạy"""
+
+class TestData:
+    """Dữ liệu của một test case đã được cache"""
+
+    def __init__(self, input_bytes: Optional[bytes] = None, input_path: Optional[str] = None,
+                 expected_output=None, size: int = 0, expected_path: Optional[str] = None,
+                 lock_fd: Optional[int] = None):
+        # Chỉ một trong input_bytes (tầng RAM) và input_path (tầng đĩa) được đặt
+        self.input_bytes = input_bytes
+        self.input_path = input_path
+        # bytes (tầng RAM) hoặc mmap chỉ đọc (tầng đĩa)
+        self.expected_output = expected_output
+        # Đường dẫn file expected output (chỉ ở tầng đĩa), dùng cho checker
+        self.expected_path = expected_path
+        self.size = size
+        # File input đang mở với flock chia sẻ (chỉ ở tầng đĩa): entry không bị evict khi đang dùng
+        self._lock_fd = lock_fd
+
+    def close(self) -> None:
+        """Thôi dùng entry trên đĩa; từ đây nó có thể bị evict"""
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is not None:
+            os.close(fd)
+
+    def __enter__(self) -> "TestData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        self.close()
+
+class TestDataCache:
+    def __init__(self, memory_budget: int, small_limit: int, disk_dir: str, disk_budget: int):
+        self.memory_budget = memory_budget
+        self.small_limit = min(small_limit, PIPE_INPUT_LIMIT)
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+        os.makedirs(disk_dir, exist_ok=True)
+        self._memory: "OrderedDict[Tuple[str, str], TestData]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_paths(self, content_hash: str) -> Tuple[str, str]:
+        base = os.path.join(self.disk_dir, content_hash)
+        return base + ".in", base + ".out"
+
+    def get(self, test_case_id: str, content_hash: str) -> Optional[TestData]:
+        """Lấy dữ liệu test từ cache, None nếu chưa có"""
+        key = (test_case_id, content_hash)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._open_disk_entry(content_hash)
+        with self._lock:
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return data
+
+    def put(self, test_case_id: str, content_hash: str, input_text: str, expected_output: str) -> TestData:
+        """Đưa dữ liệu test vào tầng phù hợp với kích thước của nó"""
+        input_bytes = input_text.encode("utf-8")
+        expected_bytes = expected_output.encode("utf-8")
+        size = len(input_bytes) + len(expected_bytes)
+        if size <= self.small_limit:
+            data = TestData(input_bytes=input_bytes, expected_output=expected_bytes, size=size)
+            key = (test_case_id, content_hash)
+            with self._lock:
+                old = self._memory.pop(key, None)
+                if old is not None:
+                    self._memory_bytes -= old.size
+                self._memory[key] = data
+                self._memory_bytes += size
+                while self._memory_bytes > self.memory_budget and len(self._memory) > 1:
+                    _, evicted = self._memory.popitem(last=False)
+                    self._memory_bytes -= evicted.size
+            return data
+
+        input_path, output_path = self._disk_paths(content_hash)
+        for path, content in ((input_path, input_bytes), (output_path, expected_bytes)):
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+        self._evict_disk()
+        data = self._open_disk_entry(content_hash)
+        if data is None:
+            # Vừa bị evict bởi worker khác: dùng trực tiếp dữ liệu trong bộ nhớ
+            data = TestData(input_bytes=input_bytes, expected_output=expected_bytes, size=size)
+        return data
+
+    def get_or_load(self, test_case_id: str, content_hash: str, loader: Callable[[], Tuple[str, str]]) -> TestData:
+        """Lấy dữ liệu từ cache, nếu chưa có thì gọi loader() -> (input, expected_output)"""
+        data = self.get(test_case_id, content_hash)
+        if data is not None:
+            return data
+        input_text, expected_output = loader()
+        return self.put(test_case_id, content_hash, input_text, expected_output)
+
+    def _open_disk_entry(self, content_hash: str) -> Optional[TestData]:
+        input_path, output_path = self._disk_paths(content_hash)
+        try:
+            lock_fd = os.open(input_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_SH)
+                # Entry bị evict giữa lúc mở và lúc khóa: file đã bị xóa khỏi thư mục
+                if os.stat(input_path).st_ino != os.fstat(lock_fd).st_ino:
+                    raise FileNotFoundError(input_path)
+            with open(output_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                expected = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            input_size = os.fstat(lock_fd).st_size
+            # Đánh dấu entry vừa được dùng (LRU)
+            os.utime(input_path)
+            os.utime(output_path)
+        except FileNotFoundError:
+            os.close(lock_fd)
+            return None
+        except BaseException:
+            os.close(lock_fd)
+            raise
+        return TestData(
+            input_path=input_path, expected_output=expected, size=size + input_size,
+            expected_path=output_path, lock_fd=lock_fd
+        )
+
+    def _remove_disk_entry(self, content_hash: str) -> bool:
+        """Xóa một entry trên đĩa nếu không có lần chạy nào đang dùng nó"""
+        input_path, output_path = self._disk_paths(content_hash)
+        lock_fd = None
+        if fcntl is not None:
+            try:
+                lock_fd = os.open(input_path, os.O_RDONLY)
+            except FileNotFoundError:
+                # Chỉ còn file output: không ai mở được entry này
+                pass
+            else:
+                try:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(lock_fd)
+                    return False
+        try:
+            for path in (input_path, output_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            if lock_fd is not None:
+                os.close(lock_fd)
+        return True
+
+    def _evict_disk(self) -> None:
+        # content_hash -> [lần dùng gần nhất, dung lượng của cả input và output]
+        entries: Dict[str, list] = {}
+        total = 0
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue
+                item = entries.setdefault(os.path.splitext(entry.name)[0], [0.0, 0])
+                item[0] = max(item[0], info.st_mtime)
+                item[1] += info.st_size
+                total += info.st_size
+        if total <= self.disk_budget:
+            return
+        for content_hash, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.disk_budget:
+                break
+            if self._remove_disk_entry(content_hash):
+                total -= size
+
+    def invalidate(self, test_case_id: str) -> None:
+        """
+        Bỏ dữ liệu đã cache trên RAM của một test case (khi test case bị sửa hoặc xóa).
+        File trên đĩa được giữ lại cho các lần chạy đang dùng nó và bị dọn bởi _evict_disk.
+        """
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == test_case_id]:
+                self._memory_bytes -= self._memory.pop(key).size
+        logger.info(f"Invalidated cached test data for test case {test_case_id}")
+
+_cache: Optional[TestDataCache] = None
+_cache_guard = threading.Lock()
+
+def get_test_data_cache() -> TestDataCache:
+    """Trả về cache dữ liệu test dùng chung của worker"""
+    global _cache
+    with _cache_guard:
+        if _cache is None:
+            _cache = TestDataCache(
+                memory_budget=settings.TEST_DATA_CACHE_MEMORY_MB * 1024 * 1024,
+                small_limit=settings.TEST_DATA_CACHE_SMALL_KB * 1024,
+                disk_dir=settings.TEST_DATA_CACHE_DIR,
+                disk_budget=settings.TEST_DATA_CACHE_DISK_MB * 1024 * 1024
+            )
+        return _cache
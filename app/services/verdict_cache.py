@@ -0,0 +1,97 @@
+"""
+Cache kết quả chấm cho các bài nộp giống hệt nhau.
+
+Key là sha256 của (code đã chuẩn hóa, ngôn ngữ cùng lệnh biên dịch/chạy, dấu vân
+tay của bộ test). Dấu vân tay gồm giới hạn thời gian/bộ nhớ của bài toán và id,
+thứ tự, giới hạn, content_hash của từng test case, nên mọi thay đổi test case
+hoặc giới hạn đều cho key mới: kết quả cũ không bao giờ được dùng lại.
+
+Code được chuẩn hóa bằng cách bỏ whitespace cuối dòng, đổi CRLF thành LF và bỏ
+các dòng trống ở cuối, vì các khác biệt này không làm đổi kết quả chấm.
+
+Cache nằm trên RAM của worker (LRU theo số entry).
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Không cache lỗi hệ thống và kết quả phụ thuộc vào tải của máy chấm
+UNCACHEABLE_STATUSES = frozenset(["judge_error", "time_limit_exceeded"])
+
+def normalize_code(code: str) -> bytes:
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip("\n").encode("utf-8")
+
+def make_key(code: str, language_config, fingerprint: str) -> str:
+    digest = hashlib.sha256()
+    parts = (
+        normalize_code(code),
+        language_config.identifier.encode("utf-8"),
+        (language_config.compile_command or "").encode("utf-8"),
+        (language_config.run_command or "").encode("utf-8"),
+        fingerprint.encode("utf-8"),
+    )
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+class VerdictCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Tổng thời gian chấm (ms) của các lần chấm được thay bằng kết quả trong cache
+        self.saved_ms = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_ms += entry["judge_time_ms"]
+            return dict(entry["result"])
+
+    def put(self, key: str, result: Dict[str, Any], judge_time_ms: int) -> None:
+        if result.get("status") in UNCACHEABLE_STATUSES:
+            return
+        with self._lock:
+            self._entries[key] = {"result": dict(result), "judge_time_ms": judge_time_ms}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_judge_ms": self.saved_ms
+            }
+
+_cache: Optional[VerdictCache] = None
+_cache_guard = threading.Lock()
+
+def get_verdict_cache() -> Optional[VerdictCache]:
+    """Trả về cache dùng chung của worker, None nếu cache bị tắt"""
+    global _cache
+    if not settings.VERDICT_CACHE_ENABLED:
+        return None
+    with _cache_guard:
+        if _cache is None:
+            _cache = VerdictCache(settings.VERDICT_CACHE_MAX_ENTRIES)
+        return _cache
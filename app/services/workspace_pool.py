@@ -0,0 +1,188 @@
+"""
+Pool thư mục làm việc (workspace) cho việc chấm bài và chạy thử.
+
+Thay vì tempfile.mkdtemp + shutil.rmtree cho mỗi lần chấm, mỗi worker giữ sẵn
+JUDGE_WORKSPACE_POOL_SIZE thư mục đã tạo và phân quyền trong JUDGE_WORKSPACE_DIR
+(mặc định trên tmpfs /dev/shm nếu có, để file code, file thực thi và input của
+bài chấm không ghi xuống đĩa dùng chung với database). Một workspace được lấy ra
+cho mỗi bài nộp và được dọn khi trả lại: chỉ xóa các file bên trong và giữ lại
+thư mục của từng test (test_0, test_1, ...) để lần sau dùng tiếp.
+
+Mỗi file chương trình ghi ra bị giới hạn JUDGE_WORKSPACE_MAX_MB (RLIMIT_FSIZE,
+đặt trước exec, xem launcher.py) để một bài nộp không thể làm đầy tmpfs.
+
+Nhiều process có thể dùng chung thư mục gốc: mỗi slot có một file lock (flock)
+được giữ suốt thời gian process sống. Khi process bị crash, kernel tự nhả lock;
+process khởi động sau lấy lại slot đó và dọn những gì còn sót lại. Khi pool hết
+slot, workspace tạm được tạo trong overflow/ với tên chứa pid của process, và
+các workspace tạm của process đã chết cũng được thu hồi khi khởi động.
+"""
+from typing import Dict, List, Optional
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có file lock, mỗi thư mục gốc chỉ dùng cho một process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Số slot tối đa được thử khi tìm slot chưa bị process khác giữ
+MAX_SLOT_SCAN = 1024
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def _force_remove(path: str) -> None:
+    """Xóa một cây thư mục, kể cả khi chương trình đã bỏ quyền ghi của các thư mục con"""
+    def on_error(function, failed_path, _):
+        try:
+            os.chmod(os.path.dirname(failed_path), stat.S_IRWXU)
+            os.chmod(failed_path, stat.S_IRWXU)
+            function(failed_path)
+        except OSError:
+            pass
+    shutil.rmtree(path, onerror=on_error)
+
+class WorkspacePool:
+    def __init__(self, root: str, size: int, max_bytes: int):
+        self.root = root
+        self.size = size
+        self.max_bytes = max_bytes
+        self.overflow_dir = os.path.join(root, "overflow")
+        os.makedirs(self.overflow_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._free: List[str] = []
+        self._lock_files: Dict[str, int] = {}
+        self.checkouts = 0
+        self.overflows = 0
+        self.reclaimed = 0
+        self._acquire_slots()
+        self._reclaim_overflow()
+        logger.info(f"Workspace pool: {len(self._free)} workspaces in {root}")
+
+    def _acquire_slots(self) -> None:
+        """Giữ lock của size slot đầu tiên chưa có process nào dùng và dọn sạch chúng"""
+        index = 0
+        while len(self._free) < self.size and index < MAX_SLOT_SCAN:
+            path = os.path.join(self.root, f"ws_{index}")
+            index += 1
+            if fcntl is not None:
+                fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Slot của một process khác đang chạy
+                    os.close(fd)
+                    continue
+                self._lock_files[path] = fd
+            if os.path.isdir(path) and os.listdir(path):
+                # Còn sót lại từ process đã chết
+                self.reclaimed += 1
+                self._reset(path)
+            os.makedirs(path, exist_ok=True)
+            os.chmod(path, stat.S_IRWXU)
+            self._free.append(path)
+
+    def _reclaim_overflow(self) -> None:
+        """Xóa workspace tạm của các process không còn sống"""
+        for entry in os.scandir(self.overflow_dir):
+            try:
+                pid = int(entry.name.split("_")[1])
+            except (IndexError, ValueError):
+                continue
+            if pid != os.getpid() and not _pid_alive(pid):
+                self.reclaimed += 1
+                _force_remove(entry.path)
+
+    def checkout(self) -> str:
+        """Lấy một workspace trống; tạo workspace tạm nếu pool đã hết"""
+        with self._lock:
+            self.checkouts += 1
+            if self._free:
+                return self._free.pop()
+            self.overflows += 1
+        logger.warning("Workspace pool exhausted, using a temporary workspace")
+        return tempfile.mkdtemp(prefix=f"tmp_{os.getpid()}_", dir=self.overflow_dir)
+
+    def release(self, path: str) -> None:
+        """Trả workspace về pool sau khi dọn sạch (workspace tạm thì bị xóa hẳn)"""
+        if os.path.dirname(path) == self.overflow_dir:
+            _force_remove(path)
+            return
+        used = self._reset(path)
+        if used >= self.max_bytes:
+            logger.warning(f"Workspace {path} reached the {self.max_bytes // (1024 * 1024)}MB cap")
+        with self._lock:
+            self._free.append(path)
+
+    def _reset(self, path: str) -> int:
+        """
+        Xóa các file trong workspace, giữ lại thư mục của từng test (chỉ xóa file bên trong).
+        Trả về tổng dung lượng đã xóa.
+        """
+        used = 0
+        try:
+            for entry in os.scandir(path):
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith(("test_", "run_")):
+                        used += self._reset_files(entry.path)
+                    else:
+                        _force_remove(entry.path)
+                else:
+                    used += entry.stat(follow_symlinks=False).st_size
+                    os.unlink(entry.path)
+        except OSError as e:
+            # Chương trình đã đổi quyền hoặc tạo cây thư mục lạ: xóa hẳn rồi tạo lại
+            logger.warning(f"Cannot reset workspace {path}: {str(e)}, recreating it")
+            _force_remove(path)
+            os.makedirs(path, exist_ok=True)
+            os.chmod(path, stat.S_IRWXU)
+        return used
+
+    def _reset_files(self, path: str) -> int:
+        used = 0
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                _force_remove(entry.path)
+            else:
+                used += entry.stat(follow_symlinks=False).st_size
+                os.unlink(entry.path)
+        return used
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "free": len(self._free),
+                "checkouts": self.checkouts,
+                "overflows": self.overflows,
+                "reclaimed": self.reclaimed
+            }
+
+_pool: Optional[WorkspacePool] = None
+_pool_guard = threading.Lock()
+
+def get_workspace_pool() -> WorkspacePool:
+    global _pool
+    with _pool_guard:
+        if _pool is None:
+            _pool = WorkspacePool(
+                settings.JUDGE_WORKSPACE_DIR,
+                settings.JUDGE_WORKSPACE_POOL_SIZE,
+                settings.JUDGE_WORKSPACE_MAX_MB * 1024 * 1024
+            )
+        return _pool
@@ -0,0 +1,238 @@
+"""
+Client của zygote Python (xem zygote_server.py).
+
+Thay vì khởi động "python main.py" cho mỗi test case, judge gửi yêu cầu tới một
+interpreter đã khởi động sẵn, zygote fork một tiến trình con sạch để chạy
+bytecode đã biên dịch trước của bài nộp. Thời gian khởi động interpreter không
+còn bị tính vào giới hạn thời gian của bài.
+
+ZygoteProcess có giao diện giống Popen ở những chỗ judge cần (pid, stdout,
+stderr, returncode, kill) nên dùng chung được với wait_for_process,
+kill_process và CancelToken.
+"""
+from typing import Optional, Tuple
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+
+from app.core.config import settings
+from app.services.spawn import spawn, cpu_limit_seconds, wait_for_process, CappedPipeReader
+
+logger = logging.getLogger(__name__)
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote_server.py")
+BYTECODE_SUFFIX = ".marshal"
+COMPILE_ERROR_SUFFIX = ".error"
+COMPILE_TIMEOUT = 20
+
+class ZygoteError(Exception):
+    """Zygote không khởi động được hoặc đã dừng giữa chừng"""
+
+class ZygoteProcess:
+    """Tiến trình do zygote fork ra; zygote thu hồi nó và gửi lại rusage"""
+
+    def __init__(self, run_sock: socket.socket, pid: int, stdout, stderr):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._run_sock = run_sock
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def kill(self) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            try:
+                self._run_sock.send(b"kill")
+            except OSError:
+                # Zygote đã dừng: tiến trình con không còn ai thu hồi, kill trực tiếp
+                for kill in (os.killpg, os.kill):
+                    try:
+                        kill(self.pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+
+    def wait_rusage(self) -> Tuple[int, int, int]:
+        """Chờ tiến trình kết thúc, trả về (returncode, cpu_time_ms, memory_used_kb)"""
+        try:
+            data = self._run_sock.recv(4096)
+        finally:
+            with self._lock:
+                self._finished = True
+                self._run_sock.close()
+        if not data:
+            raise ZygoteError("Python zygote exited while a program was running")
+        result = json.loads(data)
+        self.returncode = result["returncode"]
+        return result["returncode"], result["cpu_time_ms"], result["memory_used_kb"]
+
+class PythonZygote:
+    def __init__(self, interpreter: str):
+        self.interpreter = interpreter
+        self._process = None
+        self._control: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._compile_lock = threading.Lock()
+
+    def _start(self) -> None:
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self._process = spawn(
+                [self.interpreter, SERVER_SCRIPT],
+                cwd=os.path.dirname(SERVER_SCRIPT),
+                stdin=child.fileno(),
+                stdout=subprocess.DEVNULL
+            )
+        except Exception:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        self._control = parent
+        logger.info(f"Started Python zygote (pid {self._process.pid})")
+
+    def _send_request(self, request, fds) -> None:
+        message = json.dumps(request).encode("utf-8")
+        with self._lock:
+            for attempt in range(2):
+                if self._process is None or self._process.poll() is not None:
+                    if self._process is not None:
+                        logger.warning(f"Python zygote exited with code {self._process.returncode}, restarting")
+                        self._control.close()
+                    self._start()
+                try:
+                    socket.send_fds(self._control, [message], fds)
+                    return
+                except OSError as e:
+                    if attempt:
+                        raise ZygoteError(f"Cannot send request to Python zygote: {e}")
+                    # Zygote vừa dừng: khởi động lại và thử lại một lần
+                    self._process.kill()
+                    self._process.wait()
+
+    def start(self, request, stdin_fd: int, stdout_fd: int, stderr_fd: int) -> Tuple[int, socket.socket]:
+        """Gửi yêu cầu cho zygote, trả về (pid, socket của lần chạy) khi tiến trình con đã được fork"""
+        run_parent, run_child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self._send_request(request, [run_child.fileno(), stdin_fd, stdout_fd, stderr_fd])
+        except Exception:
+            run_parent.close()
+            raise
+        finally:
+            run_child.close()
+        data = run_parent.recv(4096)
+        reply = json.loads(data) if data else {"error": "zygote exited"}
+        if "pid" not in reply:
+            run_parent.close()
+            raise ZygoteError(f"Python zygote could not fork: {reply.get('error')}")
+        return reply["pid"], run_parent
+
+    def run(self, file_path: str, bytecode_path: str, cwd: str, stdin_fd: int, time_limit_ms: int,
+            file_size_limit: Optional[int] = None, cpus=None) -> ZygoteProcess:
+        """
+        Chạy bytecode của bài nộp với stdin cho trước; stdout và stderr là pipe.
+        Các giới hạn được tiến trình con đặt ngay sau fork, trước khi chạy code của bài nộp.
+        """
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            pid, run_sock = self.start({
+                "mode": "run",
+                "path": file_path,
+                "bytecode": bytecode_path,
+                "cwd": cwd,
+                "cpu_limit_s": cpu_limit_seconds(time_limit_ms),
+                "fsize_limit": file_size_limit,
+                "cpus": sorted(cpus) if cpus else None
+            }, stdin_fd, stdout_w, stderr_w)
+        except Exception:
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise
+        finally:
+            os.close(stdout_w)
+            os.close(stderr_w)
+        return ZygoteProcess(run_sock, pid, os.fdopen(stdout_r, "rb", buffering=0), os.fdopen(stderr_r, "rb", buffering=0))
+
+    def ensure_bytecode(self, file_path: str) -> Tuple[str, Optional[str]]:
+        """
+        Biên dịch source thành bytecode một lần cho mỗi bài nộp (các test case sau
+        dùng lại file đã có). Trả về (đường dẫn bytecode, thông báo lỗi cú pháp hoặc None).
+        """
+        bytecode_path = os.path.splitext(file_path)[0] + BYTECODE_SUFFIX
+        error_path = bytecode_path + COMPILE_ERROR_SUFFIX
+        with self._compile_lock:
+            if os.path.exists(bytecode_path):
+                return bytecode_path, None
+            if os.path.exists(error_path):
+                with open(error_path, "r", encoding="utf-8") as f:
+                    return bytecode_path, f.read()
+
+            stderr_r, stderr_w = os.pipe()
+            stdin_fd = os.open(os.devnull, os.O_RDONLY)
+            stdout_fd = os.open(os.devnull, os.O_WRONLY)
+            try:
+                pid, run_sock = self.start({
+                    "mode": "compile",
+                    "path": file_path,
+                    "target": bytecode_path,
+                    "cwd": os.path.dirname(file_path),
+                    "cpu_limit_s": COMPILE_TIMEOUT
+                }, stdin_fd, stdout_fd, stderr_w)
+            except Exception:
+                os.close(stderr_r)
+                raise
+            finally:
+                for fd in (stdin_fd, stdout_fd, stderr_w):
+                    os.close(fd)
+            process = ZygoteProcess(run_sock, pid, None, os.fdopen(stderr_r, "rb", buffering=0))
+            stderr_reader = CappedPipeReader(process.stderr, settings.JUDGE_STDERR_LIMIT_KB * 1024)
+            usage = wait_for_process(process, COMPILE_TIMEOUT)
+            stderr = stderr_reader.read().decode("utf-8", errors="replace")
+
+            if process.returncode == 0 and os.path.exists(bytecode_path):
+                logger.info(f"Compiled Python bytecode in {usage['wall_time_ms']}ms: {bytecode_path}")
+                return bytecode_path, None
+            if usage["timed_out"]:
+                raise ZygoteError("Compiling Python bytecode timed out")
+            error = stderr or "Unknown syntax error"
+            with open(error_path, "w", encoding="utf-8") as f:
+                f.write(error)
+            return bytecode_path, error
+
+    def close(self) -> None:
+        with self._lock:
+            if self._control is not None:
+                # Zygote tự kill các tiến trình con và thoát khi kênh điều khiển bị đóng
+                self._control.close()
+                self._control = None
+            if self._process is not None:
+                self._process.wait()
+                self._process = None
+
+_zygote: Optional[PythonZygote] = None
+_zygote_guard = threading.Lock()
+
+def zygote_supported() -> bool:
+    return (
+        sys.platform.startswith("linux")
+        and hasattr(socket, "send_fds")
+        and hasattr(socket, "SOCK_SEQPACKET")
+    )
+
+def get_python_zygote(interpreter: str) -> Optional[PythonZygote]:
+    """Trả về zygote dùng chung của worker, None nếu bị tắt hoặc hệ điều hành không hỗ trợ"""
+    global _zygote
+    if not settings.PYTHON_ZYGOTE_ENABLED or not zygote_supported():
+        return None
+    with _zygote_guard:
+        if _zygote is None:
+            _zygote = PythonZygote(interpreter)
+        return _zygote
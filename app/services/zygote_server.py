@@ -0,0 +1,305 @@
+"""
+Zygote cho các bài nộp Python: một interpreter đã khởi động sẵn và fork ra một
+tiến trình con sạch cho mỗi lần chạy test.
+
+File này được app/services/zygote.py chạy như một script độc lập, với stdin là
+một socket SOCK_SEQPACKET dùng làm kênh điều khiển. Chỉ dùng thư viện chuẩn để
+interpreter của zygote (và vì thế mọi tiến trình con) gọn nhẹ nhất có thể.
+
+Giao thức:
+- Mỗi yêu cầu là một message JSON kèm 4 file descriptor: socket riêng của lần
+  chạy, stdin, stdout và stderr cho tiến trình con.
+- Zygote fork tiến trình con rồi gửi {"pid": ...} qua socket của lần chạy.
+- Khi tiến trình con kết thúc, zygote thu hồi nó bằng wait4 và gửi lại
+  returncode cùng rusage. Thời gian CPU vì vậy được tính từ lúc fork, không
+  gồm thời gian khởi động interpreter.
+- Gửi b"kill" qua socket của lần chạy (hoặc đóng socket đó) sẽ kill tiến trình con.
+
+Có hai loại yêu cầu: "compile" biên dịch source thành bytecode (dạng marshal),
+"run" nạp bytecode đó và chạy như module __main__.
+"""
+import builtins
+import gc
+import io
+import json
+import marshal
+import os
+import resource
+import selectors
+import signal
+import socket
+import sys
+import traceback
+import types
+
+# Các module hay dùng trong bài nộp được import sẵn trước khi fork
+PRELOAD_MODULES = (
+    "math", "collections", "heapq", "bisect", "itertools", "functools",
+    "operator", "string", "re", "io", "array", "typing", "atexit", "threading"
+)
+
+# Socket của lần chạy, stdin, stdout, stderr
+REQUEST_FDS = 4
+
+try:
+    MAX_FD = os.sysconf("SC_OPEN_MAX")
+except (AttributeError, ValueError, OSError):
+    MAX_FD = 256
+
+def _send(sock: socket.socket, message) -> None:
+    try:
+        sock.send(json.dumps(message).encode("utf-8"))
+    except OSError:
+        # Phía judge đã đóng socket, không còn ai chờ kết quả
+        pass
+
+def _reopen_std_streams() -> None:
+    """
+    Tạo lại sys.stdin/stdout/stderr trên fd 0, 1, 2 vừa được dup2, giữ cấu hình
+    buffer của interpreter (ví dụ PYTHONUNBUFFERED) như khi chạy "python main.py"
+    """
+    original = sys.__stdout__
+    encoding = original.encoding if original else "utf-8"
+    write_through = bool(getattr(original, "write_through", False))
+    sys.stdin = open(0, "r", encoding=encoding, closefd=False)
+    sys.stdout = io.TextIOWrapper(
+        open(1, "wb", buffering=0 if write_through else -1, closefd=False),
+        encoding=encoding,
+        line_buffering=os.isatty(1),
+        write_through=write_through
+    )
+    sys.stderr = io.TextIOWrapper(
+        open(2, "wb", buffering=0, closefd=False),
+        encoding=encoding,
+        errors="backslashreplace",
+        line_buffering=True,
+        write_through=True
+    )
+    sys.__stdin__, sys.__stdout__, sys.__stderr__ = sys.stdin, sys.stdout, sys.stderr
+
+def _exit_code(exc: SystemExit) -> int:
+    """Mã thoát tương ứng với SystemExit, giống cách interpreter xử lý"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code & 0xFF
+    print(exc.code, file=sys.stderr)
+    return 1
+
+def _shutdown(code: int) -> int:
+    """Các bước interpreter làm khi kết thúc: chờ thread, chạy atexit, flush output"""
+    import atexit
+    import threading
+    try:
+        # Bài nộp hay chạy main() trong thread riêng để tăng stack mà không join
+        threading._shutdown()
+    except BaseException:
+        traceback.print_exc()
+        code = code or 1
+    atexit._run_exitfuncs()
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except BaseException:
+            # Interpreter trả về 120 khi không flush được output lúc thoát
+            code = code or 120
+    return code
+
+def _compile(request) -> int:
+    try:
+        with open(request["path"], "rb") as f:
+            source = f.read()
+        program = compile(source, request["path"], "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        traceback.print_exception(type(e), e, None)
+        return 1
+    tmp_path = request["target"] + ".tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(program, f)
+    os.replace(tmp_path, request["target"])
+    return 0
+
+def _run(request) -> int:
+    path = request["path"]
+    sys.argv = [path]
+    sys.path.insert(0, os.path.dirname(path))
+    main = types.ModuleType("__main__")
+    main.__file__ = path
+    main.__builtins__ = builtins
+    sys.modules["__main__"] = main
+    try:
+        with open(request["bytecode"], "rb") as f:
+            program = marshal.load(f)
+        exec(program, main.__dict__)
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e)
+    except BaseException as e:
+        # Bỏ frame của zygote để traceback giống khi chạy "python main.py"
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        code = 1
+    return _shutdown(code)
+
+def _child(request, fds) -> None:
+    """Chạy trong tiến trình con ngay sau fork; không bao giờ quay lại vòng lặp của zygote"""
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.setsid()
+        _, stdin_fd, stdout_fd, stderr_fd = fds
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        # Đóng kênh điều khiển, socket và pipe của các lần chạy khác
+        os.closerange(3, MAX_FD)
+        _reopen_std_streams()
+        os.chdir(request["cwd"])
+        cpu_limit = request.get("cpu_limit_s")
+        if cpu_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        fsize_limit = request.get("fsize_limit")
+        if fsize_limit:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (fsize_limit, fsize_limit))
+        cpus = request.get("cpus")
+        if cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass
+        if request.get("mode") == "compile":
+            code = _compile(request)
+        else:
+            code = _run(request)
+    except BaseException:
+        try:
+            traceback.print_exc()
+        except BaseException:
+            pass
+    finally:
+        os._exit(code)
+
+class Zygote:
+    def __init__(self, control: socket.socket):
+        self.control = control
+        self.selector = selectors.DefaultSelector()
+        self.runs = {}
+        self.wakeup_r, wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(wakeup_w, False)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.set_wakeup_fd(wakeup_w)
+        self.selector.register(control, selectors.EVENT_READ, "control")
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, "sigchld")
+
+    def serve(self) -> None:
+        while True:
+            for key, _ in self.selector.select():
+                if key.data == "control":
+                    if not self._handle_request():
+                        self._kill_all()
+                        return
+                elif key.data == "sigchld":
+                    try:
+                        while os.read(self.wakeup_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self._reap()
+                else:
+                    self._handle_run_message(key.data, key.fileobj)
+
+    def _handle_request(self) -> bool:
+        message, fds, _, _ = socket.recv_fds(self.control, 65536, REQUEST_FDS)
+        if not message:
+            # Tiến trình judge đã thoát
+            return False
+        if len(fds) != REQUEST_FDS:
+            for fd in fds:
+                os.close(fd)
+            return True
+        run_sock = socket.socket(fileno=fds[0])
+        try:
+            request = json.loads(message)
+            pid = os.fork()
+        except Exception as e:
+            _send(run_sock, {"error": str(e)})
+            run_sock.close()
+            pid = None
+        if pid == 0:
+            _child(request, fds)
+        for fd in fds[1:]:
+            os.close(fd)
+        if pid:
+            self.runs[pid] = run_sock
+            self.selector.register(run_sock, selectors.EVENT_READ, pid)
+            _send(run_sock, {"pid": pid})
+        return True
+
+    def _handle_run_message(self, pid: int, run_sock: socket.socket) -> None:
+        if self.runs.get(pid) is not run_sock:
+            # Tiến trình con vừa được thu hồi trong cùng lượt select
+            return
+        try:
+            data = run_sock.recv(64)
+        except OSError:
+            data = b""
+        # Có thông báo kill, hoặc phía judge đã đóng socket: kill tiến trình con
+        self._kill(pid)
+        if not data:
+            self.selector.unregister(run_sock)
+            run_sock.close()
+            self.runs[pid] = None
+
+    def _kill(self, pid: int) -> None:
+        for kill in (os.killpg, os.kill):
+            try:
+                kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def _kill_all(self) -> None:
+        for pid in list(self.runs):
+            self._kill(pid)
+        self._reap()
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            # Dọn các tiến trình cháu còn sót lại (có thể đang giữ pipe stdout)
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            run_sock = self.runs.pop(pid, None)
+            if run_sock is None:
+                continue
+            _send(run_sock, {
+                "returncode": os.waitstatus_to_exitcode(status),
+                "cpu_time_ms": int((rusage.ru_utime + rusage.ru_stime) * 1000),
+                "memory_used_kb": rusage.ru_maxrss
+            })
+            self.selector.unregister(run_sock)
+            run_sock.close()
+
+def main() -> None:
+    # Thư mục chứa script này không thuộc sys.path của bài nộp
+    del sys.path[0]
+    # Giữ fd 0 bị chiếm (bởi /dev/null) để các fd nhận được luôn >= 3
+    control = socket.socket(fileno=os.dup(0))
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    for name in PRELOAD_MODULES:
+        __import__(name)
+    # Không để GC chạm vào các object có sẵn, giữ bộ nhớ dùng chung sau fork
+    gc.freeze()
+    Zygote(control).serve()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark so sánh output lớn.
+
+So sánh cách cũ (tách cả hai output thành danh sách dòng rồi rstrip từng dòng)
+với comparator trên bytes (app/services/comparator.py) ở cả ba chế độ, trên
+output khoảng 100MB: output đúng, output có whitespace thừa ở cuối mỗi dòng,
+output sai ở gần cuối. Comparator được đo cả khi so sánh một lần (compare) và
+khi nhận output theo chunk 64KB như lúc judge đọc stdout.
+
+Chế độ float được đo trên output 2 triệu số thực (in với độ chính xác khác
+output mong đợi, có và không có một số sai), so với so sánh từng token bằng
+Python (khi không có NumPy).
+
+Chạy: python bench_comparator.py [kích thước MB] [số lượng số thực]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+import app.services.comparator as comparator
+from app.services.comparator import StreamingComparator, compare
+
+CHUNK_SIZE = 65536
+
+def old_is_output_correct(expected: bytes, actual: bytes) -> bool:
+    expected_lines = expected.rstrip().split(b"\n")
+    actual_lines = actual.rstrip().split(b"\n")
+    if len(expected_lines) != len(actual_lines):
+        return False
+    for i in range(len(expected_lines)):
+        if expected_lines[i].rstrip() != actual_lines[i].rstrip():
+            return False
+    return True
+
+def streaming(expected: bytes, actual: bytes, mode: str) -> bool:
+    comparator = StreamingComparator(expected, mode)
+    view = memoryview(actual)
+    for start in range(0, len(actual), CHUNK_SIZE):
+        # Giống judge: mỗi chunk đọc từ pipe là một bytes mới
+        if not comparator.feed(bytes(view[start:start + CHUNK_SIZE])):
+            return False
+    return comparator.finish()
+
+def measure(label, fn, expected_result):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert bool(result) == expected_result, (label, result)
+    print(f"  {label:<26} {elapsed:9.1f}ms  peak {peak / 1024 / 1024:8.1f}MB")
+    return elapsed
+
+def make_output(size_mb: int) -> bytes:
+    rng = random.Random(1)
+    numbers = [b"%d %d" % (rng.randrange(10 ** 9), rng.randrange(10 ** 9)) for _ in range(4096)]
+    block = b"\n".join(numbers) + b"\n"
+    return block * (size_mb * 1024 * 1024 // len(block))
+
+def without_numpy(fn):
+    numpy = comparator.np
+    comparator.np = None
+    try:
+        return fn()
+    finally:
+        comparator.np = numpy
+
+def bench_floats(count: int):
+    rng = random.Random(2)
+    values = [rng.uniform(-1e6, 1e6) for _ in range(count)]
+    expected = "".join(f"{value:.9f}\n" for value in values).encode()
+    # Cùng giá trị nhưng in ít chữ số hơn: phải đọc số, không so sánh byte được
+    actual = "".join(f"{value:.8f}\n" for value in values).encode()
+    wrong_values = list(values)
+    wrong_values[count * 3 // 4] += 1
+    wrong = "".join(f"{value:.8f}\n" for value in wrong_values).encode()
+    print(f"float: {count} numbers, {len(expected) / 1024 / 1024:.0f}MB")
+    for name, output, expected_result in (("identical", expected, True), ("reformatted", actual, True),
+                                           ("one wrong number", wrong, False)):
+        print(name)
+        measure("numpy", lambda: compare(expected, output, "float"), expected_result)
+        measure("python tokens", lambda: without_numpy(lambda: compare(expected, output, "float")), expected_result)
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    float_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+    expected = make_output(size_mb)
+    trailing = expected.replace(b"\n", b" \n")
+    wrong = bytearray(expected)
+    wrong[-100] = ord("x") if wrong[-100] != ord("x") else ord("y")
+    wrong = bytes(wrong)
+    reflowed = expected.replace(b" ", b"\n")
+    lines = expected.count(b"\n")
+    print(f"Output {len(expected) / 1024 / 1024:.0f}MB, {lines} lines")
+
+    cases = [
+        ("identical", expected, {"exact": True, "lines": True, "tokens": True}),
+        ("trailing spaces", trailing, {"lines": True, "tokens": True}),
+        ("wrong near the end", wrong, {"exact": False, "lines": False, "tokens": False}),
+        ("one token per line", reflowed, {"tokens": True}),
+    ]
+    for name, actual, modes in cases:
+        print(name)
+        if "lines" in modes:
+            measure("old split lines", lambda: old_is_output_correct(expected, actual), modes["lines"])
+        for mode, expected_result in modes.items():
+            measure(f"compare {mode}", lambda: compare(expected, actual, mode), expected_result)
+            measure(f"stream 64KB {mode}", lambda: streaming(expected, actual, mode), expected_result)
+    bench_floats(float_count)
+
+if __name__ == "__main__":
+    main()
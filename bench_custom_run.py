@@ -0,0 +1,105 @@
+"""
+Đo độ trễ của các request khác trong lúc có nhiều lượt chạy thử.
+
+Gửi liên tục GET / tới server, trước và trong khi nhiều lượt chạy thử
+(POST /submissions/test với chương trình C++ khác nhau, nên lần nào cũng phải
+biên dịch) đang được xử lý. Nếu chạy thử chặn event loop, độ trễ của GET / tăng
+lên cỡ thời gian biên dịch; khi chạy thử nằm trong executor riêng thì độ trễ gần
+như không đổi.
+
+Chạy (server đang chạy sẵn):
+    python bench_custom_run.py <base_url> <access_token> <problem_id> [số lượt chạy thử đồng thời]
+Ví dụ: python bench_custom_run.py http://localhost:8000 eyJhbGciOi... 0b4c... 16
+"""
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+PROGRAM = """
+#include <bits/stdc++.h>
+using namespace std;
+// run %d
+int main() { long long a, b; cin >> a >> b; cout << a + b << endl; return 0; }
+"""
+
+def request(url, data=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=headers, method="POST" if body else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+def ping_latencies(base_url, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        request(f"{base_url}/")
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.02)
+
+def summary(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} n={len(samples):<4} p50 {statistics.median(samples):8.1f}ms  "
+          f"p99 {p99:8.1f}ms  max {samples[-1]:8.1f}ms")
+
+def main():
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+    base_url, token, problem_id = sys.argv[1].rstrip("/"), sys.argv[2], sys.argv[3]
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+    api_url = f"{base_url}/api/v1"
+
+    stop = threading.Event()
+    idle = []
+    pinger = threading.Thread(target=ping_latencies, args=(base_url, stop, idle))
+    pinger.start()
+    time.sleep(2)
+    stop.set()
+    pinger.join()
+
+    stop = threading.Event()
+    loaded = []
+    pinger = threading.Thread(target=ping_latencies, args=(base_url, stop, loaded))
+    statuses = []
+    run_times = []
+
+    def custom_run(index):
+        started = time.perf_counter()
+        status, body = request(f"{api_url}/submissions/test", {
+            "problem_id": problem_id,
+            "code": PROGRAM % (index + int(time.time() * 1000)),
+            "language": "cpp",
+            "input": "1 2\n"
+        }, token)
+        run_times.append((time.perf_counter() - started) * 1000)
+        statuses.append(f"{status} {body.get('status') if body else ''}".strip())
+
+    runners = [threading.Thread(target=custom_run, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    pinger.start()
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    pinger.join()
+
+    summary("GET / idle", idle)
+    summary(f"GET / with {concurrency} custom runs", loaded)
+    summary("custom runs", run_times)
+    print(f"custom runs finished in {elapsed:.1f}s: " +
+          ", ".join(f"{status} x{statuses.count(status)}" for status in sorted(set(statuses))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Mô phỏng thời gian chờ theo lớp với các chính sách lập lịch của hàng đợi chấm.
+
+Một đợt rejudge lớn và một người dùng nộp dồn dập được đưa vào hàng đợi trước,
+sau đó các bài nộp cuộc thi và luyện tập đến đều đặn. Mỗi bài "chấm" mất một
+khoảng thời gian mô phỏng (tỉ lệ với chi phí), không chạy code thật.
+
+Chạy: python bench_scheduler.py [số bài rejudge]
+"""
+import random
+import sys
+import time
+
+from app.services.judge_scheduler import JudgeJob, JudgeScheduler, SCHEDULING_POLICIES
+
+WORKERS = 4
+
+def simulate(policy, rejudge_count):
+    random.seed(1)
+    scheduler = JudgeScheduler(policy)
+    clock = [0.0]
+    # Thời gian chờ tính theo đồng hồ mô phỏng thay cho time.monotonic
+    real_monotonic = time.monotonic
+    time.monotonic = lambda: clock[0]
+    try:
+        for i in range(rejudge_count):
+            scheduler.push(JudgeJob(f"r{i}", user_id=f"u{i % 50}", job_class="rejudge", cost=random.choice([1, 5, 20])))
+        for i in range(200):
+            scheduler.push(JudgeJob(f"burst{i}", user_id="spammer", job_class="practice", cost=5))
+        arrivals = []
+        for i in range(300):
+            job_class = "contest" if i % 3 else "practice"
+            arrivals.append((i * 0.5, JudgeJob(f"{job_class}{i}", user_id=f"c{i % 40}", job_class=job_class,
+                                               cost=random.choice([1, 5, 20]))))
+        workers = [0.0] * WORKERS
+        while len(scheduler) or arrivals:
+            worker = min(range(WORKERS), key=lambda w: workers[w])
+            clock[0] = workers[worker]
+            while arrivals and arrivals[0][0] <= clock[0]:
+                arrival_time, job = arrivals.pop(0)
+                job.enqueued_at = arrival_time
+                scheduler.push(job)
+            job = scheduler.pop()
+            if job is None:
+                workers[worker] = arrivals[0][0]
+                continue
+            workers[worker] = clock[0] + job.cost * 0.01
+        return scheduler.stats()
+    finally:
+        time.monotonic = real_monotonic
+
+def main():
+    rejudge_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"Simulated queue wait with {rejudge_count} queued rejudges and a 200-submission burst ({WORKERS} workers)")
+    for policy in SCHEDULING_POLICIES:
+        stats = simulate(policy, rejudge_count)
+        line = "  ".join(
+            f"{job_class} p50 {s['wait_p50_ms'] / 1000:7.1f}s p99 {s['wait_p99_ms'] / 1000:7.1f}s"
+            for job_class, s in stats.items() if s["samples"]
+        )
+        print(f"{policy:<5} {line}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark chi phí khởi chạy một test case của judge.
+
+So sánh cách chạy cũ (Popen shell=True, universal_newlines, communicate)
+với tầng spawn mới (exec trực tiếp, fd mở sẵn, output dạng bytes) trên một
+chương trình C++ rất nhỏ, để thấy chi phí spawn cho mỗi test.
+
+Chạy: python bench_spawn.py [số lần chạy]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.spawn import render_argv, spawn, wait_for_process
+
+TINY_PROGRAM = """
+#include <cstdio>
+int main() { int a, b; if (scanf("%d %d", &a, &b) == 2) printf("%d\\n", a + b); return 0; }
+"""
+
+def run_shell(exe_path, work_dir, input_file):
+    with open(input_file, "r", encoding="utf-8") as f:
+        process = subprocess.Popen(
+            f'"{exe_path}"',
+            shell=True,
+            cwd=work_dir,
+            stdin=f,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            errors='replace'
+        )
+        stdout, _ = process.communicate(timeout=5)
+    return stdout.encode("utf-8")
+
+def run_direct(argv, work_dir, input_file):
+    output_file = os.path.join(work_dir, "output.txt")
+    with open(input_file, "rb") as f, open(output_file, "wb") as out:
+        process = spawn(argv, cwd=work_dir, stdin=f, stdout=out, stderr=subprocess.DEVNULL)
+        wait_for_process(process, 5)
+    with open(output_file, "rb") as f:
+        return f.read()
+
+def measure(label, fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    assert output.strip() == b"3", output
+    print(
+        f"{label:<32} median {statistics.median(samples):7.3f}ms  "
+        f"mean {statistics.mean(samples):7.3f}ms  p90 {sorted(samples)[int(runs * 0.9) - 1]:7.3f}ms"
+    )
+    return statistics.median(samples)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    work_dir = tempfile.mkdtemp(prefix="bench_spawn_")
+    try:
+        source = os.path.join(work_dir, "main.cpp")
+        exe_path = os.path.join(work_dir, "main")
+        with open(source, "w") as f:
+            f.write(TINY_PROGRAM)
+        subprocess.run(["g++", "-O2", "-o", exe_path, source], check=True)
+        input_file = os.path.join(work_dir, "input.txt")
+        with open(input_file, "w") as f:
+            f.write("1 2\n")
+
+        argv = render_argv('"{exe_path}"', exe_path=exe_path)
+        print(f"Spawn overhead per test ({runs} runs)")
+        before = measure("shell=True + communicate", lambda: run_shell(exe_path, work_dir, input_file), runs)
+        after = measure("direct exec + wait4", lambda: run_direct(argv, work_dir, input_file), runs)
+        print(f"Saved {before - after:.3f}ms per test (x{before / after:.2f})")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+So sánh chạy bài Python bằng "python main.py" cho mỗi test với chạy qua zygote.
+
+Đo thời gian chờ của mỗi test (wall) và thời gian CPU bị tính cho bài nộp trên
+một chương trình Python rất nhỏ, để thấy chi phí khởi động interpreter.
+
+Chạy: python bench_zygote.py [số lần chạy]
+"""
+import shutil
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.services.judge import prepare_code_file, run_code_with_input
+
+TINY_PROGRAM = """
+a, b = map(int, input().split())
+print(a + b)
+"""
+
+PYTHON = SimpleNamespace(
+    identifier="python", name="Python", compile_command=None,
+    run_command="python {file_path}", file_extension="py"
+)
+
+def measure(label, code_info, runs):
+    wall = []
+    cpu = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_code_with_input(code_info, PYTHON, "1 2\n", 1000)
+        wall.append((time.perf_counter() - start) * 1000)
+        cpu.append(result["execution_time_ms"])
+        assert result["output"].strip() == b"3", result
+    print(
+        f"{label:<24} wall median {statistics.median(wall):7.2f}ms  p90 {sorted(wall)[int(runs * 0.9) - 1]:7.2f}ms  "
+        f"charged CPU median {statistics.median(cpu):5.1f}ms"
+    )
+    return statistics.median(wall)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    code_info = prepare_code_file(TINY_PROGRAM, PYTHON)
+    try:
+        print(f"Python run overhead per test ({runs} runs)")
+        settings.PYTHON_ZYGOTE_ENABLED = False
+        before = measure("python main.py", code_info, runs)
+        settings.PYTHON_ZYGOTE_ENABLED = True
+        # Lần chạy đầu khởi động zygote và biên dịch bytecode
+        run_code_with_input(code_info, PYTHON, "1 2\n", 1000)
+        after = measure("zygote fork + bytecode", code_info, runs)
+        print(f"Saved {before - after:.2f}ms per test (x{before / after:.2f})")
+    finally:
+        shutil.rmtree(code_info["dir"], ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
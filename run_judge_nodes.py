@@ -0,0 +1,56 @@
+"""
+Chạy nhiều judge node trên cùng một máy để thử chấm phân tán.
+
+Tạo (hoặc dùng lại) các bản ghi judge_servers tên local-node-1..N rồi khởi động
+mỗi node trong một tiến trình riêng trên các port liên tiếp. API cần chạy với
+JUDGE_DISTRIBUTED=true.
+
+Chạy: python run_judge_nodes.py [số node] [port đầu tiên] [số worker mỗi node]
+"""
+import subprocess
+import sys
+
+from app import crud, schemas
+from app.core.config import settings
+from app.database import SessionLocal
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    first_port = int(sys.argv[2]) if len(sys.argv) > 2 else 9001
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else settings.JUDGE_WORKERS
+
+    db = SessionLocal()
+    nodes = []
+    try:
+        for i in range(count):
+            name = f"local-node-{i + 1}"
+            port = first_port + i
+            server = crud.judge_servers.get_by_name(db, name=name)
+            if not server:
+                server = crud.judge_servers.create(db, obj_in=schemas.JudgeServerCreate(
+                    name=name, hostname="127.0.0.1", port=port, max_workers=workers
+                ))
+            nodes.append((name, server.id, server.secret_key, port))
+    finally:
+        db.close()
+
+    processes = []
+    for name, server_id, secret, port in nodes:
+        print(f"Starting {name} on port {port} ({server_id})")
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "app.services.judge_node",
+            "--server-id", server_id, "--secret", secret,
+            "--host", "127.0.0.1", "--hostname", "127.0.0.1",
+            "--port", str(port), "--workers", str(workers)
+        ]))
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cấu hình chung cho các test: database SQLite trong RAM thay cho MySQL, tắt các
+cache của judge để mỗi test chấm thật từ đầu.
+"""
+import os
+import sys
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.update(
+    COMPILE_CACHE_ENABLED="false",
+    JUDGE_PCH_ENABLED="false",
+    VERDICT_CACHE_ENABLED="false",
+    PYTHON_ZYGOTE_ENABLED="false",
+    JUDGE_RECOVER_PENDING="false"
+)
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import app.database as database
+import app.db.session as db_session
+from app import models
+from app.db.base_class import Base
+from app.crud.problems import compute_test_case_hash
+
+PY_SUM = "a, b = map(int, input().split())\nprint(a + b)\n"
+
+@pytest.fixture
+def db():
+    """Session trên một database SQLite mới; SessionLocal của app cũng dùng database này"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.SessionLocal.configure(bind=engine)
+    db_session.SessionLocal.configure(bind=engine)
+    database.Base.metadata.create_all(engine)
+    Base.metadata.create_all(engine)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def user(db):
+    user = models.User(username="judge-test", email="judge-test@example.com", hashed_password="x", is_admin=True)
+    db.add(user)
+    db.add(models.Language(
+        name="Python", identifier="python", compile_command=None,
+        run_command=f"{sys.executable} {{file_path}}", file_extension="py"
+    ))
+    db.commit()
+    return user
+
+def make_problem(db, tests, **fields):
+    """
+    Bài toán A+B với các test case cho trước: mỗi test là (a, b), (a, b, score) hoặc
+    (a, b, score, subtask); test đầu tiên là test mẫu
+    """
+    problem = models.Problem(
+        title="A+B", description="Tính a + b", difficulty="easy", example_input="1 2", example_output="3",
+        constraints="0 <= a, b <= 10^9", time_limit_ms=2000, memory_limit_kb=262144, **fields
+    )
+    db.add(problem)
+    db.commit()
+    for order, test in enumerate(tests, start=1):
+        a, b = test[:2]
+        score = test[2] if len(test) > 2 else 100
+        subtask = test[3] if len(test) > 3 else None
+        input_text, expected_output = f"{a} {b}\n", f"{a + b}\n"
+        db.add(models.TestCase(
+            id=str(uuid.uuid4()), problem_id=problem.id, input=input_text, expected_output=expected_output,
+            order=order, is_sample=order == 1, score=score, subtask=subtask,
+            content_hash=compute_test_case_hash(input_text, expected_output)
+        ))
+    db.commit()
+    return problem
+
+def submit(db, user, problem, code, language="python"):
+    submission = models.Submission(user_id=user.id, problem_id=problem.id, code=code, language=language)
+    db.add(submission)
+    db.commit()
+    return submission
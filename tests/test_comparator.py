@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.comparator import StreamingComparator, compare
+
+EXPECTED = b"1 2\n3\n"
+
+def test_lines_ignores_trailing_whitespace_and_blank_lines():
+    assert compare(EXPECTED, b"1 2   \n3\n\n\n")
+    assert not compare(EXPECTED, b"1 2\n4\n")
+
+def test_lines_keeps_line_breaks():
+    result = compare(EXPECTED, b"1\n2 3\n")
+    assert not result
+    assert (result.line, result.position) == (1, 1)
+
+def test_mismatch_reports_first_wrong_line():
+    result = compare(b"a\nb\nc\n", b"a\nb\nd\n")
+    assert (result.line, result.position) == (3, 4)
+
+def test_exact_compares_every_byte():
+    assert compare(EXPECTED, EXPECTED, "exact")
+    result = compare(EXPECTED, b"1 2 \n3\n", "exact")
+    assert not result
+    assert result.position == 3
+
+def test_tokens_treats_all_whitespace_alike():
+    assert compare(EXPECTED, b"1\n2 3", "tokens")
+    assert not compare(EXPECTED, b"1 2 4", "tokens")
+    assert not compare(EXPECTED, b"1 2 3 4", "tokens")
+
+def test_float_default_tolerance():
+    assert compare(b"0.5 x\n", b"0.5000001 x\n", "float")
+    assert not compare(b"0.5\n", b"0.51\n", "float")
+
+def test_float_absolute_tolerance():
+    assert compare(b"0.5\n", b"0.51\n", "float", abs_tolerance=0.1)
+    assert not compare(b"0.5\n", b"0.7\n", "float", abs_tolerance=0.1)
+
+def test_float_relative_tolerance():
+    assert compare(b"1000000\n", b"1000100\n", "float", abs_tolerance=0, rel_tolerance=1e-3)
+    result = compare(b"1000000\n", b"1000100\n", "float", abs_tolerance=0, rel_tolerance=1e-5)
+    assert not result
+    assert "token thứ 1" in result.detail
+
+def test_float_non_numeric_tokens_must_match():
+    assert not compare(b"0.5 yes\n", b"0.5 no\n", "float")
+    assert not compare(b"1 2\n", b"1 2 3\n", "float")
+
+@pytest.mark.parametrize("mode", ["exact", "lines", "tokens"])
+def test_streaming_matches_compare(mode):
+    actual = b"1 2\n3\n"
+    comparator = StreamingComparator(EXPECTED, mode)
+    for index in range(len(actual)):
+        comparator.feed(actual[index:index + 1])
+    comparator.finish()
+    assert bool(comparator.result()) == bool(compare(EXPECTED, actual, mode))
+
+def test_streaming_stops_at_first_mismatch():
+    comparator = StreamingComparator(EXPECTED, "lines")
+    assert not comparator.feed(b"9 2\n")
+    assert comparator.failed
+    assert not comparator.feed(b"3\n")
+    assert comparator.result().line == 1
+
+def test_float_cannot_be_streamed():
+    with pytest.raises(ValueError):
+        StreamingComparator(EXPECTED, "float")
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.api import api_router
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services import judge
+
+from tests.conftest import PY_SUM, make_problem
+
+# Thời gian một lần chạy thử giả chiếm thread của nó
+BLOCK_SECONDS = 2.0
+
+def make_client() -> TestClient:
+    """App chỉ gồm các API, không có sự kiện startup (hàng đợi chấm, chấm lại)"""
+    app = FastAPI()
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+    return TestClient(app)
+
+def test_custom_run_does_not_block_other_requests(db, user, monkeypatch):
+    problem = make_problem(db, [(1, 2)])
+    started = threading.Event()
+
+    def blocking_test_code(**kwargs):
+        # Như judge.test_code: biên dịch và chạy là thao tác blocking
+        started.set()
+        time.sleep(BLOCK_SECONDS)
+        return {"output": "3\n", "status": "success", "execution_time_ms": 1, "memory_used_kb": 1}
+
+    monkeypatch.setattr(judge, "test_code", blocking_test_code)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id)}"}
+    responses = []
+    with make_client() as client:
+        runner = threading.Thread(target=lambda: responses.append(client.post(
+            f"{settings.API_V1_STR}/submissions/test",
+            json={"problem_id": problem.id, "code": PY_SUM, "language": "python", "input": "1 2\n"},
+            headers=headers
+        )))
+        runner.start()
+        assert started.wait(5)
+        request_started = time.monotonic()
+        listing = client.get(f"{settings.API_V1_STR}/problems/", headers=headers)
+        elapsed = time.monotonic() - request_started
+        runner.join()
+
+    assert listing.status_code == 200
+    assert elapsed < BLOCK_SECONDS / 4
+    assert responses[0].status_code == 200
+    assert responses[0].json()["output"] == "3\n"
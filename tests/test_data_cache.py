@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from app.services import judge, test_data_cache
+from app.services.judge_queue import process_submission
+
+from tests.conftest import PY_SUM, make_problem, submit
+
+# Dữ liệu lớn hơn small_limit nên được ghi ra đĩa
+BIG_INPUT = "1 2\n" + " " * 100
+
+@pytest.fixture
+def cache(tmp_path):
+    return test_data_cache.TestDataCache(memory_budget=1 << 20, small_limit=16, disk_dir=str(tmp_path), disk_budget=300)
+
+def test_invalidate_keeps_files_of_running_tests(cache):
+    data = cache.put("t1", "hash1", BIG_INPUT, "3\n")
+    cache.invalidate("t1")
+    with open(data.input_path) as f:
+        assert f.read() == BIG_INPUT
+    data.close()
+
+def test_eviction_skips_entries_in_use(cache):
+    in_use = cache.put("t1", "hash1", BIG_INPUT, "3\n")
+    cache.put("t2", "hash2", BIG_INPUT, "3\n").close()
+    cache.put("t3", "hash3", BIG_INPUT, "3\n").close()
+    assert os.path.exists(in_use.input_path) and os.path.exists(in_use.expected_path)
+    in_use.close()
+    cache.put("t4", "hash4", BIG_INPUT, "3\n").close()
+    assert not os.path.exists(in_use.input_path)
+
+def test_missing_input_file_falls_back_to_database(db, user, cache, monkeypatch):
+    problem = make_problem(db, [(1, 2), (3, 4)])
+    monkeypatch.setattr(judge, "get_test_data_cache", lambda: cache)
+    monkeypatch.setattr(cache, "small_limit", 0)
+    original_load = judge.TestDataLoader.load
+
+    def load_then_delete(self, test_case):
+        # File của cache bị xóa từ bên ngoài ngay trước khi chương trình chạy
+        data = original_load(self, test_case)
+        os.remove(data.input_path)
+        return data
+
+    monkeypatch.setattr(judge.TestDataLoader, "load", load_then_delete)
+    submission = process_submission(db, submit(db, user, problem, PY_SUM).id)
+    assert submission.status == "accepted"
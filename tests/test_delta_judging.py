@@ -0,0 +1,133 @@
+from app import crud, models
+from app.services import judge
+from app.services.judge_queue import process_submission
+
+from tests.conftest import PY_SUM, make_problem, submit
+
+def problem_tests(db, problem):
+    return db.query(models.TestCase).filter(models.TestCase.problem_id == problem.id).order_by(models.TestCase.order).all()
+
+def judged_submission(db, user, problem, statuses):
+    """Bài nộp đã chấm trên phiên bản bộ test hiện tại, với status của từng test theo thứ tự"""
+    test_cases = problem_tests(db, problem)
+    version = crud.problems.get_or_create_test_set_version(db, problem=problem, test_cases=test_cases)
+    submission = submit(db, user, problem, PY_SUM)
+    submission.test_set_version_id = version.id
+    submission.status = "accepted"
+    db.commit()
+    crud.submissions.replace_test_results(db, submission_id=submission.id, results=[
+        {"test_case_id": test_case.id, "status": status, "execution_time_ms": 5, "memory_used_kb": 100}
+        for test_case, status in zip(test_cases, statuses)
+    ])
+    return submission, test_cases
+
+def current_version(db, problem):
+    test_cases = problem_tests(db, problem)
+    return crud.problems.get_or_create_test_set_version(db, problem=problem, test_cases=test_cases)
+
+def test_reuses_unchanged_tests_only(db, user):
+    problem = make_problem(db, [(1, 2), (3, 4), (5, 6)])
+    submission, test_cases = judged_submission(db, user, problem, ["accepted"] * 3)
+    test_cases[1].input, test_cases[1].expected_output = "10 20\n", "30\n"
+    test_cases[1].content_hash = crud.problems.compute_test_case_hash("10 20\n", "30\n")
+    test_cases[2].time_limit_ms = 5000
+    db.commit()
+    reused = judge.reusable_test_results(db, submission, current_version(db, problem))
+    assert set(reused) == {test_cases[0].id}
+
+def test_compare_mode_change_drops_reuse(db, user):
+    problem = make_problem(db, [(1, 2), (3, 4)])
+    submission, _ = judged_submission(db, user, problem, ["accepted", "wrong_answer"])
+    problem.compare_mode = "tokens"
+    db.commit()
+    assert judge.reusable_test_results(db, submission, current_version(db, problem)) == {}
+
+def test_float_tolerance_change_drops_reuse(db, user):
+    problem = make_problem(db, [(1, 2), (3, 4)], compare_mode="float", float_abs_tolerance=0.1)
+    submission, _ = judged_submission(db, user, problem, ["accepted", "accepted"])
+    assert len(judge.reusable_test_results(db, submission, current_version(db, problem))) == 2
+    problem.float_abs_tolerance = 0.001
+    db.commit()
+    assert judge.reusable_test_results(db, submission, current_version(db, problem)) == {}
+
+def fake_run_test_cases(ran, failing=()):
+    """Thay judge.run_test_cases: ghi lại các test được chạy, test trong failing bị sai"""
+    def run_test_cases(db, submission, problem, language_config, test_cases, plan=None):
+        results, first_failure = [], None
+        for test_case in test_cases:
+            if plan.should_skip(test_case):
+                continue
+            ran.append(test_case.order)
+            status = "wrong_answer" if test_case.order in failing else "accepted"
+            result = {
+                "test_case_id": test_case.id, "test_case_order": test_case.order, "status": status,
+                "execution_time_ms": 1, "memory_used_kb": 1, "message": ""
+            }
+            results.append(result)
+            if status != "accepted":
+                plan.record(test_case.id, test_case.order, status)
+                if first_failure is None or test_case.order < first_failure["test_case_order"]:
+                    first_failure = result
+        return results, first_failure
+    return run_test_cases
+
+def reused_result(test_case, status):
+    return {
+        "test_case_id": test_case.id, "test_case_order": test_case.order, "status": status,
+        "execution_time_ms": 1, "memory_used_kb": 1, "message": ""
+    }
+
+def test_reused_failure_skips_rest_of_its_subtask(db, monkeypatch):
+    problem = make_problem(db, [(0, 0, 0, 0), (1, 1, 30, 1), (2, 2, 30, 1), (3, 3, 40, 2), (4, 4, 40, 2)])
+    test_cases = problem_tests(db, problem)
+    ran = []
+    monkeypatch.setattr(judge, "run_test_cases", fake_run_test_cases(ran))
+    reused = {test_cases[1].id: reused_result(test_cases[1], "wrong_answer")}
+    result = judge.run_judging(db, None, problem, None, test_cases, reused=reused)
+    assert ran == [1, 4, 5]
+    assert result["status"] == "wrong_answer"
+    assert (result["score"], result["max_score"]) == (80, 140)
+    assert [r["test_case_order"] for r in result["test_results"]] == [1, 2, 4, 5]
+
+def test_new_failure_drops_later_reused_results(db, monkeypatch):
+    problem = make_problem(db, [(0, 0, 0, 1), (1, 1, 50, 1), (2, 2, 50, 1)])
+    test_cases = problem_tests(db, problem)
+    ran = []
+    monkeypatch.setattr(judge, "run_test_cases", fake_run_test_cases(ran, failing={2}))
+    reused = {test_cases[2].id: reused_result(test_cases[2], "accepted")}
+    result = judge.run_judging(db, None, problem, None, test_cases, reused=reused)
+    assert ran == [1, 2]
+    assert [r["test_case_order"] for r in result["test_results"]] == [1, 2]
+    assert (result["status"], result["score"]) == ("wrong_answer", 0)
+
+def test_subtask_scoring_end_to_end(db, user):
+    # Bài nộp sai khi a == 3: mất điểm subtask 2, giữ điểm subtask 1
+    problem = make_problem(db, [(0, 0, 0, None), (1, 2, 40, 1), (2, 2, 40, 1), (3, 1, 60, 2), (4, 1, 60, 2)])
+    code = "a, b = map(int, input().split())\nprint(a + b + (a == 3))\n"
+    submission = process_submission(db, submit(db, user, problem, code).id)
+    assert submission.status == "wrong_answer"
+    assert (submission.score, submission.max_score) == (80, 200)
+    details = crud.submissions.get_details(db, submission=submission)
+    assert [(r["test_case_order"], r["status"]) for r in details["test_results"]] == [
+        (1, "accepted"), (2, "accepted"), (3, "accepted"), (4, "wrong_answer")
+    ]
+
+def test_rejudge_runs_only_new_tests(db, user, monkeypatch):
+    problem = make_problem(db, [(1, 2), (3, 4)])
+    submission = process_submission(db, submit(db, user, problem, PY_SUM).id)
+    assert submission.status == "accepted"
+    added = models.TestCase(
+        id="added", problem_id=problem.id, input="5 6\n", expected_output="11\n", order=3, score=100,
+        content_hash=crud.problems.compute_test_case_hash("5 6\n", "11\n")
+    )
+    db.add(added)
+    crud.submissions.update(db, db_obj=submission, obj_in={"status": "pending", "judge_claimed_at": None})
+    ran = []
+    original = judge.run_test_cases
+    def spy(db, submission, problem, language_config, test_cases, plan=None):
+        ran.extend(test_case.order for test_case in test_cases)
+        return original(db, submission, problem, language_config, test_cases, plan=plan)
+    monkeypatch.setattr(judge, "run_test_cases", spy)
+    submission = process_submission(db, submission.id, use_verdict_cache=False)
+    assert ran == [3]
+    assert (submission.status, submission.score, submission.max_score) == ("accepted", 300, 300)
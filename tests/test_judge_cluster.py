@@ -0,0 +1,51 @@
+import threading
+import time
+
+from app.crud import judge_servers as judge_servers_crud
+from app.schemas.judge_servers import JudgeServerCreate, JudgeServerRegister
+from app.services import judge_cluster
+
+def make_node(db, name="node-1"):
+    server = judge_servers_crud.create(db, obj_in=JudgeServerCreate(name=name, hostname="127.0.0.1", port=9000))
+    return judge_servers_crud.register(
+        db, db_obj=server, obj_in=JudgeServerRegister(hostname="127.0.0.1", port=9000, max_workers=4)
+    )
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_enqueue_does_not_wait_for_the_node(db, monkeypatch):
+    make_node(db)
+    release = threading.Event()
+    def slow_post(*args, **kwargs):
+        release.wait(5)
+        return {}
+    monkeypatch.setattr(judge_cluster, "post_signed", slow_post)
+    dispatcher = judge_cluster.JudgeDispatcher()
+    try:
+        started = time.monotonic()
+        assert dispatcher.enqueue("submission-1")
+        assert not dispatcher.enqueue("submission-1")
+        assert time.monotonic() - started < 1
+        release.set()
+        wait_until(lambda: dispatcher.stats()["assigned"] == 1)
+    finally:
+        release.set()
+        dispatcher.shutdown()
+
+def test_node_is_taken_out_only_after_consecutive_failures(db, monkeypatch):
+    server = make_node(db)
+    def failing_post(*args, **kwargs):
+        raise judge_cluster.JudgeNodeError("connection refused")
+    monkeypatch.setattr(judge_cluster, "post_signed", failing_post)
+    dispatcher = judge_cluster.JudgeDispatcher()
+    for _ in range(judge_cluster.settings.JUDGE_NODE_MAX_FAILURES - 1):
+        assert not dispatcher._dispatch(db, "submission-1")
+        db.refresh(server)
+        assert server.is_active
+    assert not dispatcher._dispatch(db, "submission-1")
+    db.refresh(server)
+    assert not server.is_active
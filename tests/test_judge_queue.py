@@ -0,0 +1,51 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app import crud
+from app.services import judge
+from app.services.judge_queue import process_submission
+
+from tests.conftest import PY_SUM, make_problem, submit
+
+def test_only_one_claim_wins(db, user):
+    submission = submit(db, user, make_problem(db, [(1, 2)]), PY_SUM)
+    claims = [crud.submissions.claim_pending(db, submission_id=submission.id, stale_seconds=600) for _ in range(3)]
+    assert claims == [True, False, False]
+
+def test_stale_claim_can_be_taken_again(db, user):
+    submission = submit(db, user, make_problem(db, [(1, 2)]), PY_SUM)
+    submission.judge_claimed_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    assert crud.submissions.claim_pending(db, submission_id=submission.id, stale_seconds=600)
+
+def test_released_claim_can_be_taken_again(db, user):
+    submission = submit(db, user, make_problem(db, [(1, 2)]), PY_SUM)
+    assert crud.submissions.claim_pending(db, submission_id=submission.id, stale_seconds=600)
+    crud.submissions.release_claims(db, submission_ids=[submission.id])
+    assert crud.submissions.claim_pending(db, submission_id=submission.id, stale_seconds=600)
+
+def test_submission_queued_twice_is_judged_once(db, user, monkeypatch):
+    submission = submit(db, user, make_problem(db, [(1, 2), (3, 4)]), PY_SUM)
+    calls = Counter()
+    original = judge.judge_submission
+    def counting(db, submission, **kwargs):
+        calls[submission.id] += 1
+        return original(db, submission, **kwargs)
+    monkeypatch.setattr(judge, "judge_submission", counting)
+    # Như hai worker uvicorn cùng đưa bài vào hàng đợi khi khởi động: worker kia đã nhận bài
+    assert crud.submissions.claim_pending(db, submission_id=submission.id, stale_seconds=600)
+    assert process_submission(db, submission.id).status == "pending"
+    assert calls[submission.id] == 0
+    crud.submissions.release_claims(db, submission_ids=[submission.id])
+    assert process_submission(db, submission.id).status == "accepted"
+    assert process_submission(db, submission.id).status == "accepted"
+    assert calls[submission.id] == 1
+
+def test_judge_failure_is_saved_as_judge_error(db, user, monkeypatch):
+    submission = submit(db, user, make_problem(db, [(1, 2)]), PY_SUM)
+    def broken(db, submission, **kwargs):
+        raise RuntimeError("judge crashed")
+    monkeypatch.setattr(judge, "judge_submission", broken)
+    submission = process_submission(db, submission.id)
+    assert submission.status == "judge_error"
+    assert submission.judge_claimed_at is None
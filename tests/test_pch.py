@@ -0,0 +1,42 @@
+import os
+import threading
+
+from app.services import pch
+
+SOURCE = b"#include <bits/stdc++.h>\nint main() {}\n"
+FLAGS = ("-O2", "-std=c++17")
+
+def make_entry(cache, key, identity):
+    include_dir = os.path.join(cache.root, key, "include")
+    os.makedirs(include_dir)
+    entry = pch.PrecompiledHeader(key, include_dir, FLAGS, identity)
+    cache._entries[FLAGS] = entry
+    return entry
+
+def test_compiler_change_keeps_old_directory(tmp_path, monkeypatch):
+    cache = pch.PchCache(str(tmp_path), "g++")
+    old = pch.CompilerIdentity("/usr/bin/g++", 1, 100)
+    entry = make_entry(cache, "old", old)
+    monkeypatch.setattr(cache, "_identity", lambda: old)
+    assert cache.include_dir(FLAGS, SOURCE) == entry.include_dir
+    rebuilt = []
+    done = threading.Event()
+    def prepare_quietly(flags):
+        rebuilt.append(flags)
+        done.set()
+    monkeypatch.setattr(cache, "_prepare_quietly", prepare_quietly)
+    monkeypatch.setattr(cache, "_identity", lambda: pch.CompilerIdentity("/usr/bin/g++", 2, 100))
+    assert cache.include_dir(FLAGS, SOURCE) is None
+    assert cache.include_dir(FLAGS, SOURCE) is None
+    assert done.wait(5)
+    assert rebuilt == [FLAGS]
+    # Lần biên dịch khác có thể vẫn đang đọc PCH cũ
+    assert os.path.isdir(entry.include_dir)
+
+def test_remove_stale_keeps_current_and_in_progress_builds(tmp_path):
+    cache = pch.PchCache(str(tmp_path), "g++")
+    make_entry(cache, "current", pch.CompilerIdentity("/usr/bin/g++", 1, 100))
+    os.makedirs(tmp_path / "old" / "include")
+    os.makedirs(tmp_path / "pch_building")
+    cache.remove_stale()
+    assert sorted(os.listdir(tmp_path)) == ["current", "pch_building"]
@@ -0,0 +1,57 @@
+from app import crud
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.rejudge_jobs import RejudgeJob
+from app.services import rejudge
+from app.services.judge_queue import process_submission
+
+from tests.conftest import PY_SUM, make_problem, submit
+
+class FakeQueue:
+    """Hàng đợi chấm từ chối `refuse` lần đầu, sau đó chấm ngay (hoặc không bao giờ chấm)"""
+
+    def __init__(self, refuse=0, judge=True):
+        self.refuse = refuse
+        self.judge = judge
+        self.calls = []
+
+    def enqueue(self, submission_id, job_class=None):
+        self.calls.append(submission_id)
+        if len(self.calls) <= self.refuse:
+            return False
+        if self.judge:
+            db = SessionLocal()
+            try:
+                process_submission(db, submission_id, use_verdict_cache=False)
+            finally:
+                db.close()
+        return True
+
+def rejudge_with(db, monkeypatch, queue, submission_id):
+    monkeypatch.setattr(rejudge, "get_judge_queue", lambda: queue)
+    monkeypatch.setattr(settings, "JUDGE_REJUDGE_POLL_SECONDS", 0.01)
+    job = RejudgeJob(status="running", filters={"submission_ids": [submission_id]})
+    db.add(job)
+    db.commit()
+    rejudge.RejudgeManager(concurrency=2, batch_size=10)._rejudge(db, job, [submission_id])
+    db.commit()
+    return job
+
+def test_refused_enqueue_is_retried(db, user, monkeypatch):
+    submission = process_submission(db, submit(db, user, make_problem(db, [(1, 2)]), PY_SUM).id)
+    queue = FakeQueue(refuse=2)
+    job = rejudge_with(db, monkeypatch, queue, submission.id)
+    assert queue.calls == [submission.id] * 3
+    db.refresh(submission)
+    assert submission.status == "accepted"
+    assert not job.failed_submission_ids
+
+def test_stuck_submission_is_requeued_then_recorded(db, user, monkeypatch):
+    submission = process_submission(db, submit(db, user, make_problem(db, [(1, 2)]), PY_SUM).id)
+    monkeypatch.setattr(settings, "JUDGE_REJUDGE_TIMEOUT_SECONDS", 0.05)
+    queue = FakeQueue(judge=False)
+    job = rejudge_with(db, monkeypatch, queue, submission.id)
+    assert queue.calls == [submission.id] * settings.JUDGE_REJUDGE_MAX_ATTEMPTS
+    db.refresh(job)
+    assert job.failed_submission_ids == [submission.id]
+    assert crud.submissions.get_by_id(db, id=submission.id).status == "pending"
@@ -0,0 +1,79 @@
+import random
+from types import SimpleNamespace
+
+from app.services.scoring import ScoringPlan
+
+def make_tests(*groups):
+    """Test case giả: mỗi phần tử là (score, subtask), thứ tự theo vị trí"""
+    return [
+        SimpleNamespace(id=f"t{order}", order=order, score=score, subtask=subtask)
+        for order, (score, subtask) in enumerate(groups, start=1)
+    ]
+
+def judge(plan, test_cases, failing):
+    """Chạy các test như run_test_cases_sequential; trả về thứ tự các test đã chạy"""
+    ran = []
+    for test_case in test_cases:
+        if plan.should_skip(test_case):
+            continue
+        ran.append(test_case.order)
+        if test_case.id in failing:
+            plan.record(test_case.id, test_case.order, "wrong_answer")
+    return ran
+
+def test_score_counts_groups_without_failures():
+    tests = make_tests((10, 1), (10, 1), (20, 2), (20, 2))
+    plan = ScoringPlan(tests)
+    assert (plan.score, plan.max_score) == (60, 60)
+    plan.record("t2", 2, "wrong_answer")
+    assert (plan.score, plan.max_score) == (40, 60)
+
+def test_ungrouped_tests_form_one_group():
+    plan = ScoringPlan(make_tests((10, None), (10, None), (10, None)))
+    plan.record("t3", 3, "time_limit_exceeded")
+    assert plan.score == 0
+
+def test_accepted_and_cancelled_are_not_failures():
+    plan = ScoringPlan(make_tests((10, 1), (10, 1)))
+    plan.record("t1", 1, "accepted")
+    plan.record("t2", 2, "cancelled")
+    assert plan.score == 20
+    assert plan.first_failed_order is None
+
+def test_skips_rest_of_failed_subtask_only():
+    tests = make_tests((10, 1), (10, 1), (10, 1), (20, 2), (20, 2))
+    plan = ScoringPlan(tests)
+    assert judge(plan, tests, {"t2"}) == [1, 2, 4, 5]
+    assert plan.score == 40
+
+def test_skips_everything_after_failure_when_no_points_left():
+    # Nhóm 0 (test mẫu) không có điểm: sai ở nhóm 1 thì không còn điểm nào để lấy
+    tests = make_tests((0, 0), (10, 1), (10, 1), (0, 0))
+    plan = ScoringPlan(tests)
+    assert judge(plan, tests, {"t2"}) == [1, 2]
+    assert plan.score == 0
+
+def test_tests_before_a_failure_still_run():
+    tests = make_tests((10, 1), (10, 1), (10, 1), (10, 1))
+    plan = ScoringPlan(tests)
+    plan.record("t4", 4, "wrong_answer")
+    assert not plan.should_skip(tests[1])
+    assert not plan.failed_before(tests[2])
+    assert plan.failed_before(SimpleNamespace(id="t4", order=5))
+
+def test_verdict_and_score_do_not_depend_on_run_order():
+    rng = random.Random(7)
+    for _ in range(300):
+        tests = make_tests(*[(rng.choice([0, 10, 25]), rng.choice([None, 1, 2, 3])) for _ in range(rng.randint(1, 12))])
+        failing = {test.id for test in tests if rng.random() < 0.25}
+        in_order = ScoringPlan(tests)
+        judge(in_order, tests, failing)
+        shuffled = tests[:]
+        rng.shuffle(shuffled)
+        reordered = ScoringPlan(tests)
+        judge(reordered, shuffled, failing)
+        assert reordered.first_failed_order == in_order.first_failed_order
+        assert reordered.score == in_order.score
+        if failing:
+            # Test sai có thứ tự nhỏ nhất luôn được chạy
+            assert in_order.first_failed_order == min(int(test_id[1:]) for test_id in failing)
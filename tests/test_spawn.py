@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from app.services.spawn import spawn, wait_for_process
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="resource limits and affinity are Linux-only")
+
+def child_limits(**limits):
+    """Giới hạn mà chính chương trình con nhìn thấy ngay khi bắt đầu chạy"""
+    code = (
+        "import os, resource\n"
+        "print(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_FSIZE)[0],"
+        " sorted(os.sched_getaffinity(0)))\n"
+    )
+    process = spawn([sys.executable, "-c", code], cwd=".", stdout=subprocess.PIPE, **limits)
+    output, _ = process.communicate(timeout=30)
+    return output.decode().split(" ", 2)
+
+def test_limits_are_set_before_exec():
+    cpu, fsize, _ = child_limits(cpu_time_limit_ms=2500, file_size_limit=1 << 20)
+    assert (int(cpu), int(fsize)) == (3, 1 << 20)
+
+def test_cpu_affinity_is_set_before_exec():
+    cpu = min(os.sched_getaffinity(0))
+    assert child_limits(cpus={cpu})[2].strip() == f"[{cpu}]"
+
+def test_no_limits_by_default():
+    cpu, _, _ = child_limits()
+    assert int(cpu) == resource.getrlimit(resource.RLIMIT_CPU)[0]
+
+def test_concurrent_spawns_from_many_threads():
+    # Như pool chạy test song song, các worker chấm và executor chạy thử gọi spawn cùng lúc
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda _: child_limits(cpu_time_limit_ms=1500, file_size_limit=1 << 16), range(64)))
+    assert all((int(cpu), int(fsize)) == (2, 1 << 16) for cpu, fsize, _ in results)
+
+def test_exec_failure_is_raised():
+    with pytest.raises(FileNotFoundError):
+        spawn(["/nonexistent/program"], cwd=".", cpu_time_limit_ms=1000)
+
+def test_child_memory_excludes_parent_memory():
+    # Worker đang giữ nhiều bộ nhớ: chương trình nhỏ vẫn phải được tính ít bộ nhớ
+    ballast = b"x" * (256 << 20)
+    process = spawn([sys.executable, "-c", "pass"], cwd=".", cpu_time_limit_ms=1000)
+    usage = wait_for_process(process, 10)
+    assert len(ballast) and process.returncode == 0
+    assert 0 < usage["memory_used_kb"] < 64 * 1024
+
+def test_killed_program_still_reports_its_usage():
+    process = spawn([sys.executable, "-c", "while True: pass"], cwd=".", cpu_time_limit_ms=10000)
+    usage = wait_for_process(process, 1)
+    assert usage["timed_out"] and process.returncode == -signal.SIGKILL
+    assert usage["cpu_time_ms"] > 100